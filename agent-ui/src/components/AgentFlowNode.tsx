@@ -5,7 +5,7 @@ interface AgentNodeData {
   label: string;
   selected: boolean;
   hasConnections: boolean;
-  status?: 'stopped' | 'starting' | 'running' | 'error' | 'stopping';
+  status?: 'stopped' | 'starting' | 'running' | 'error' | 'stopping' | 'hibernated';
   error?: string;
 }
 
@@ -24,6 +24,7 @@ const AgentFlowNode: React.FC<NodeProps> = ({ data, selected }) => {
       case 'stopping': return 'text-yellow-500';
       case 'error': return 'text-red-500';
       case 'stopped': return 'text-gray-500';
+      case 'hibernated': return 'text-blue-400';
       default: return 'text-gray-400';
     }
   };
@@ -35,6 +36,7 @@ const AgentFlowNode: React.FC<NodeProps> = ({ data, selected }) => {
       case 'stopping': return '◑';
       case 'error': return '⚠'; // Use warning symbol instead of dot for better visibility
       case 'stopped': return '○';
+      case 'hibernated': return '◌';
       default: return '?';
     }
   };
@@ -47,6 +49,7 @@ const AgentFlowNode: React.FC<NodeProps> = ({ data, selected }) => {
       case 'stopping': return 'border-yellow-400';
       case 'error': return 'border-red-400';
       case 'stopped': return 'border-gray-300';
+      case 'hibernated': return 'border-blue-200';
       default: return 'border-gray-300';
     }
   };
@@ -124,7 +127,8 @@ const AgentFlowNode: React.FC<NodeProps> = ({ data, selected }) => {
                status === 'stopped' ? '⏹' : 
                status === 'error' ? '⚠' : 
                status === 'starting' ? '⏳' : 
-               status === 'stopping' ? '⏸' : '?'}
+               status === 'stopping' ? '⏸' : 
+               status === 'hibernated' ? '💤' : '?'}
             </span>
           )}
         </div>
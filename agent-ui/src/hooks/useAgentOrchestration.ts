@@ -95,6 +95,37 @@ export const useAgentOrchestration = () => {
             }),
           };
 
+        case 'agents_updated': {
+          // Coalesced update for several agents (e.g. a batch create)
+          const updatedById = new Map<string, ApiAgent>(
+            (data.agents || []).map((apiAgent: ApiAgent): [string, ApiAgent] => [apiAgent.id, apiAgent])
+          );
+
+          const mergedAgents = currentState.agents.map(agent => {
+            const apiAgent = updatedById.get(agent.id);
+            if (!apiAgent) {
+              return agent;
+            }
+            updatedById.delete(agent.id);
+            const updatedAgent = apiService.apiAgentToUIAgent(apiAgent);
+            // Preserve UI position
+            updatedAgent.x = agent.x;
+            updatedAgent.y = agent.y;
+            updatedAgent.selected = agent.selected;
+            return updatedAgent;
+          });
+
+          // Agents we haven't seen yet are added
+          updatedById.forEach(apiAgent => {
+            mergedAgents.push(apiService.apiAgentToUIAgent(apiAgent));
+          });
+
+          return {
+            ...currentState,
+            agents: mergedAgents,
+          };
+        }
+
         case 'agent_deleted':
           return {
             ...currentState,
@@ -16,7 +16,7 @@ export interface ApiAgent {
     prompt?: string;
     openai_api_key: string;
   };
-  status: 'stopped' | 'starting' | 'running' | 'error' | 'stopping';
+  status: 'stopped' | 'starting' | 'running' | 'error' | 'stopping' | 'hibernated';
   pid?: number;
   url?: string;
   error_message?: string;
@@ -8,7 +8,7 @@ export interface Agent {
   selected: boolean;
   model: string;
   prompt: string;
-  status?: 'stopped' | 'starting' | 'running' | 'error' | 'stopping';
+  status?: 'stopped' | 'starting' | 'running' | 'error' | 'stopping' | 'hibernated';
   url?: string;
   error?: string;
 }
@@ -0,0 +1,107 @@
+"""
+CPU affinity benchmark: tail latency of many busy agent-like processes, pinned vs unpinned
+
+Starts N stand-in agent processes that each answer requests over a pipe by
+walking a private working set (to have something in cache to lose) and
+burning a little CPU, then drives all of them at once with jittered think
+times - the shape of dozens of agents sharing a box. The same load runs
+twice: once left to the scheduler and once pinned with the manager's
+CpuPlacer (round-robin over cores, connected agents grouped per socket).
+Stand-ins keep the numbers about scheduling rather than HTTP or OpenAI.
+
+Usage (from the integration/ directory):
+    python benchmarks/bench_cpu_affinity.py --agents 32 --requests 200 --work-us 2000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from cpu_affinity import CpuPlacer, AFFINITY_ROUND_ROBIN
+from metrics import Histogram
+
+# A stand-in agent: one request per input line, answered after touching its working set and spinning
+WORKER = """
+import sys, time
+working_set = bytearray({working_set})
+work = {work_us} / 1e6
+for line in sys.stdin:
+    started = time.perf_counter()
+    total = 0
+    while time.perf_counter() - started < work:
+        for i in range(0, len(working_set), 64):
+            total += working_set[i]
+    sys.stdout.write("ok\\n")
+    sys.stdout.flush()
+"""
+
+async def start_workers(count: int, working_set_kb: int, work_us: int) -> list:
+    code = WORKER.format(working_set=working_set_kb * 1024, work_us=work_us)
+    return [
+        await asyncio.create_subprocess_exec(
+            sys.executable, "-c", code, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE
+        )
+        for _ in range(count)
+    ]
+
+async def drive(workers: list, requests: int, think_ms: float) -> Histogram:
+    """Every worker gets `requests` requests, one at a time, with a random pause between them"""
+    latency = Histogram(window=len(workers) * requests)
+    
+    async def client(worker):
+        for _ in range(requests):
+            await asyncio.sleep(random.expovariate(1000 / think_ms))
+            started = time.perf_counter()
+            worker.stdin.write(b"q\n")
+            await worker.stdin.drain()
+            await worker.stdout.readline()
+            latency.observe(time.perf_counter() - started)
+    
+    await asyncio.gather(*(client(worker) for worker in workers))
+    return latency
+
+async def run(pinned: bool, args) -> dict:
+    workers = await start_workers(args.agents, args.working_set_kb, args.work_us)
+    try:
+        if pinned:
+            placer = CpuPlacer(policy=AFFINITY_ROUND_ROBIN, cpus_per_agent=1, group_connected=True)
+            for index, worker in enumerate(workers):
+                # Pairs of agents talk to each other - keep each pair on one socket
+                peers = [f"agent-{index ^ 1}"]
+                placer.place(f"agent-{index}", worker.pid, peers=peers)
+        await drive(workers, 5, args.think_ms)  # Warm-up
+        latency = await drive(workers, args.requests, args.think_ms)
+    finally:
+        for worker in workers:
+            worker.kill()
+            await worker.wait()
+    
+    return {name: latency.percentile(q) * 1000 for name, q in (("p50", 50), ("p99", 99), ("p99.9", 99.9), ("max", 100))}
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=2 * os.cpu_count(), help="stand-in agent processes")
+    parser.add_argument("--requests", type=int, default=200, help="requests per agent")
+    parser.add_argument("--work-us", type=int, default=2000, help="CPU time per request (microseconds)")
+    parser.add_argument("--working-set-kb", type=int, default=512, help="memory each agent walks per request")
+    parser.add_argument("--think-ms", type=float, default=5.0, help="mean pause between an agent's requests")
+    args = parser.parse_args()
+    
+    placer = CpuPlacer()
+    print(f"{len(placer.socket_of)} CPUs in {len(placer.sockets)} socket(s), {args.agents} agents")
+    print()
+    print(f"{'placement':<12} {'p50 ms':>8} {'p99 ms':>8} {'p99.9 ms':>9} {'max ms':>8}")
+    for pinned in (False, True):
+        result = await run(pinned, args)
+        name = "round-robin" if pinned else "unpinned"
+        print(f"{name:<12} {result['p50']:>8.2f} {result['p99']:>8.2f} {result['p99.9']:>9.2f} {result['max']:>8.2f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""
+Registry benchmark: persisting agent changes and recovering after a restart
+
+Starts N stand-in processes (`sleep`) in place of agents, records them in a
+fresh registry file as running agents - timing each incremental write - then
+starts a new AgentManager on that file and times how long it takes to
+re-adopt all of them. Re-adoption never talks to the agents, so stand-ins are
+enough and no agent (or OpenAI key) is needed.
+
+Usage (from the integration/ directory):
+    python benchmarks/bench_registry_recovery.py --agents 500 --transport tcp
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from config import settings
+from agent_manager import AgentManager
+from agent_registry import AgentRegistryStore
+from metrics import Histogram
+from models import AgentConfig, AgentInstance, AgentStatus
+
+def populate(path: str, pids: list, transport: str) -> Histogram:
+    """Write one running agent per pid, the way the manager does on every change"""
+    store = AgentRegistryStore(path)
+    writes = Histogram()
+    try:
+        for index, pid in enumerate(pids):
+            agent_id = f"bench-{index}"
+            port = 20000 + index
+            agent = AgentInstance(
+                id=agent_id,
+                config=AgentConfig(id=agent_id, name=f"Bench{index}", port=0 if transport == "uds" else port,
+                                   openai_api_key="sk-benchmark-placeholder"),
+                status=AgentStatus.RUNNING,
+                pid=pid,
+                url=f"http://agent-{agent_id}" if transport == "uds" else f"http://localhost:{port}",
+                socket_path=os.path.join(settings.AGENT_SOCKET_DIR, f"{agent_id}.sock") if transport == "uds" else None
+            )
+            started = time.perf_counter()
+            store.save_agent(agent)
+            writes.observe(time.perf_counter() - started)
+    finally:
+        store.close()
+    return writes
+
+async def recover(path: str) -> tuple:
+    """Start a manager on the registry; returns (seconds, agents re-adopted)"""
+    manager = AgentManager(registry_path=path)
+    started = time.perf_counter()
+    await manager.start()
+    elapsed = time.perf_counter() - started
+    adopted = sum(1 for agent in manager.agents.values() if agent.status == AgentStatus.RUNNING)
+    await manager.close()  # Leaves the processes alone, like a server restart
+    return elapsed, adopted
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=500, help="agents to record and recover")
+    parser.add_argument("--transport", default="tcp", help="transport the recorded agents use (tcp or uds)")
+    args = parser.parse_args()
+    
+    settings.AGENT_TRANSPORT = args.transport
+    settings.AGENT_SPAWNER = "exec"
+    settings.AGENT_WARM_POOL_SIZE = 0
+    settings.AGENT_NODES = ""
+    
+    print(f"Starting {args.agents} stand-in processes...")
+    processes = [subprocess.Popen(["sleep", "600"]) for _ in range(args.agents)]
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "agent_registry.db")
+            writes = populate(path, [p.pid for p in processes], args.transport)
+            elapsed, adopted = await recover(path)
+            size_kb = os.path.getsize(path) / 1024
+    finally:
+        for process in processes:
+            process.kill()
+            process.wait()
+    
+    print()
+    print(f"writes      p50 {writes.percentile(50) * 1e6:.0f}us  p99 {writes.percentile(99) * 1e6:.0f}us per agent change")
+    print(f"recovery    {elapsed * 1000:.1f}ms for {args.agents} agents ({adopted} re-adopted, {args.transport})")
+    print(f"registry    {size_kb:.0f} KB")
+
+if __name__ == "__main__":
+    asyncio.run(main())
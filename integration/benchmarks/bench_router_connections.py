@@ -0,0 +1,112 @@
+"""
+Message router benchmark: connection lookups on a large agent graph, indexed vs linear scan
+
+Builds a MessageRouter holding N random connections between M agents (a
+share of them duplicate edges) and times the lookups made on every routed
+message and workflow step - the (from, to) lookup and the outbound and
+inbound lists - against the linear scans they replaced, then times removing
+every connection of one agent the way agent deletion does. Nothing is
+routed, so no agent (or OpenAI key) is needed.
+
+Usage (from the integration/ directory):
+    python benchmarks/bench_router_connections.py --connections 10000 --agents 1000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from message_router import MessageRouter
+from models import AgentConnection
+
+class StandInManager:
+    """Just what MessageRouter touches on an AgentManager when connections change"""
+    store = None
+    
+    def colocate_agents(self, agent_id: str, peer_id: str):
+        pass
+
+# The lookups as they were before the indexes
+def scan_find(router, from_agent, to_agent):
+    for connection in router.connections.values():
+        if connection.from_agent == from_agent and connection.to_agent == to_agent:
+            return connection
+    return None
+
+def scan_from(router, agent_id):
+    return [conn for conn in router.connections.values() if conn.from_agent == agent_id and conn.enabled]
+
+def scan_to(router, agent_id):
+    return [conn for conn in router.connections.values() if conn.to_agent == agent_id and conn.enabled]
+
+def build(connections: int, agents: int, duplicates: float) -> MessageRouter:
+    router = MessageRouter(StandInManager())
+    edges = []
+    for index in range(connections):
+        if edges and random.random() < duplicates:
+            from_agent, to_agent = random.choice(edges)
+        else:
+            from_agent, to_agent = random.sample(range(agents), 2)
+            edges.append((from_agent, to_agent))
+        router.add_connection(AgentConnection(
+            id=f"conn-{index}", from_agent=f"agent-{from_agent}", to_agent=f"agent-{to_agent}",
+            from_handle="output", to_handle="input", enabled=random.random() > 0.1
+        ))
+    return router
+
+def per_call_us(fn, calls: list) -> float:
+    started = time.perf_counter()
+    for args in calls:
+        fn(*args)
+    return (time.perf_counter() - started) / len(calls) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=10000, help="connections in the graph")
+    parser.add_argument("--agents", type=int, default=1000, help="agents the connections link")
+    parser.add_argument("--duplicates", type=float, default=0.05, help="share of connections repeating an existing edge")
+    parser.add_argument("--lookups", type=int, default=2000, help="lookups timed per operation")
+    args = parser.parse_args()
+    
+    random.seed(1)
+    started = time.perf_counter()
+    router = build(args.connections, args.agents, args.duplicates)
+    build_ms = (time.perf_counter() - started) * 1000
+    print(f"{len(router.connections)} connections between {args.agents} agents, built in {build_ms:.1f} ms")
+    
+    existing = [(conn.from_agent, conn.to_agent) for conn in random.choices(list(router.connections.values()), k=args.lookups)]
+    agent_ids = [(f"agent-{random.randrange(args.agents)}",) for _ in range(args.lookups)]
+    for (from_agent, to_agent) in existing[:100]:
+        assert router._find_connection(from_agent, to_agent) is scan_find(router, from_agent, to_agent)
+    for (agent_id,) in agent_ids[:100]:
+        assert router.get_connections_from_agent(agent_id) == scan_from(router, agent_id)
+        assert router.get_connections_to_agent(agent_id) == scan_to(router, agent_id)
+    
+    print()
+    print(f"{'lookup':<28} {'scan us':>10} {'indexed us':>11} {'speedup':>9}")
+    for name, scan, indexed, calls in (
+        ("find_connection", lambda *a: scan_find(router, *a), router._find_connection, existing),
+        ("get_connections_from_agent", lambda *a: scan_from(router, *a), router.get_connections_from_agent, agent_ids),
+        ("get_connections_to_agent", lambda *a: scan_to(router, *a), router.get_connections_to_agent, agent_ids)
+    ):
+        scan_us = per_call_us(scan, calls)
+        indexed_us = per_call_us(indexed, calls)
+        print(f"{name:<28} {scan_us:>10.2f} {indexed_us:>11.2f} {scan_us / indexed_us:>8.0f}x")
+    
+    # Agent deletion: drop every connection of the busiest agent
+    busiest = max(router._outbound, key=lambda agent_id: len(router.get_connected_agents(agent_id)))
+    started = time.perf_counter()
+    removed = router.remove_agent_connections(busiest)
+    remove_us = (time.perf_counter() - started) * 1e6
+    assert not any(busiest in (conn.from_agent, conn.to_agent) for conn in router.connections.values())
+    print()
+    print(f"removed the {len(removed)} connections of {busiest} in {remove_us:.0f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Spawner benchmark: memory per agent and startup latency
+
+Starts N agents with each spawner ("exec" = one fresh interpreter per agent,
+"zygote" = forked from a pre-imported fork-server, "host" = all N agents
+served by one multi-tenant host process), then samples RSS, PSS and USS of
+every agent process and divides the total by the number of agents. PSS splits shared pages between the processes
+sharing them, so it is the honest per-agent cost when memory is shared
+copy-on-write.
+
+No OpenAI request is made - agents only need a syntactically valid key.
+
+Usage (from the integration/ directory):
+    python benchmarks/bench_spawner_memory.py --agents 10
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import psutil
+
+from config import settings
+from agent_manager import AgentManager
+from models import AgentConfig, AgentStatus
+
+def memory_of(pid: int) -> dict:
+    """RSS/PSS/USS of one process in MiB (PSS/USS need Linux)"""
+    info = psutil.Process(pid).memory_full_info()
+    return {
+        "rss": info.rss / 2 ** 20,
+        "pss": getattr(info, "pss", 0) / 2 ** 20,
+        "uss": getattr(info, "uss", 0) / 2 ** 20
+    }
+
+async def run(spawner: str, agent_count: int, base_port: int) -> dict:
+    settings.AGENT_SPAWNER = "exec" if spawner == "host" else spawner
+    settings.AGENT_HOST_CAPACITY = agent_count if spawner == "host" else 0
+    settings.AGENT_WARM_POOL_SIZE = 0
+    manager = AgentManager()
+    manager.next_port = base_port
+    await manager.start()
+
+    startup_times = []
+    try:
+        for i in range(agent_count):
+            config = AgentConfig(
+                id=f"bench-{spawner}-{i}",
+                name=f"Bench{i}",
+                port=0,
+                openai_api_key="sk-benchmark-placeholder"
+            )
+            started = time.perf_counter()
+            agent = await manager.create_agent(config)
+            startup_times.append(time.perf_counter() - started)
+            if agent.status != AgentStatus.RUNNING:
+                raise RuntimeError(f"Agent failed to start: {agent.error_message}")
+
+        # Let the agents settle before sampling
+        await asyncio.sleep(2)
+        samples = [memory_of(pid) for pid in {agent.pid for agent in manager.agents.values()}]
+        overhead = memory_of(manager.zygote.process.pid) if manager.zygote else None
+    finally:
+        for agent_id in list(manager.agents):
+            await manager.delete_agent(agent_id)
+        await manager.close()
+
+    return {
+        "spawner": spawner,
+        "agents": agent_count,
+        "startup_mean": statistics.mean(startup_times),
+        "startup_max": max(startup_times),
+        "rss": sum(s["rss"] for s in samples) / agent_count,
+        "pss": sum(s["pss"] for s in samples) / agent_count,
+        "uss": sum(s["uss"] for s in samples) / agent_count,
+        "total_pss": sum(s["pss"] for s in samples) + (overhead["pss"] if overhead else 0),
+        "overhead_pss": overhead["pss"] if overhead else 0.0
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=5, help="agents to start per spawner")
+    parser.add_argument("--spawners", default="exec,zygote,host", help="comma-separated spawners to compare")
+    parser.add_argument("--base-port", type=int, default=8101, help="first agent port")
+    args = parser.parse_args()
+
+    results = []
+    for i, spawner in enumerate(args.spawners.split(",")):
+        print(f"Starting {args.agents} agents with the {spawner} spawner...")
+        results.append(await run(spawner, args.agents, args.base_port + i * args.agents))
+
+    print()
+    print(f"{'spawner':<8} {'agents':>6} {'start avg s':>11} {'start max s':>11} "
+          f"{'RSS MiB':>8} {'PSS MiB':>8} {'USS MiB':>8} {'total PSS':>10}")
+    for r in results:
+        print(f"{r['spawner']:<8} {r['agents']:>6} {r['startup_mean']:>11.2f} {r['startup_max']:>11.2f} "
+              f"{r['rss']:>8.1f} {r['pss']:>8.1f} {r['uss']:>8.1f} {r['total_pss']:>10.1f}")
+    print()
+    print("RSS/PSS/USS are per agent; total PSS includes the zygote itself.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
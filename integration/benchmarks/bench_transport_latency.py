@@ -0,0 +1,107 @@
+"""
+Transport benchmark: per-request latency over loopback TCP vs a Unix domain socket
+
+Starts one agent per transport ("tcp" = http://localhost:{port}, "uds" = the
+agent serves on a Unix domain socket) and sends GET /health through the
+manager's shared HTTP pool - first one request at a time, then with several
+requests in flight. /health does almost no work, so the numbers are dominated
+by the transport and the HTTP stack.
+
+No OpenAI request is made - agents only need a syntactically valid key.
+
+Usage (from the integration/ directory):
+    python benchmarks/bench_transport_latency.py --requests 2000 --concurrency 10
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from config import settings
+from agent_manager import AgentManager
+from metrics import Histogram
+from models import AgentConfig, AgentStatus
+
+async def measure(manager: AgentManager, url: str, requests: int, concurrency: int) -> dict:
+    """Send requests GET /health calls, concurrency at a time"""
+    latency = Histogram()
+    remaining = iter(range(requests))
+    
+    async def client():
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await manager.http.get(url, "/health")
+            latency.observe(time.perf_counter() - started)
+            response.raise_for_status()
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    
+    return {
+        "concurrency": concurrency,
+        "p50": latency.percentile(50) * 1000,
+        "p95": latency.percentile(95) * 1000,
+        "p99": latency.percentile(99) * 1000,
+        "rps": requests / elapsed
+    }
+
+async def run(transport: str, spawner: str, requests: int, concurrency: int) -> list:
+    settings.AGENT_TRANSPORT = transport
+    settings.AGENT_SPAWNER = spawner
+    settings.AGENT_WARM_POOL_SIZE = 0
+    settings.AGENT_POOL_MAX_CONNECTIONS_PER_AGENT = max(settings.AGENT_POOL_MAX_CONNECTIONS_PER_AGENT, concurrency)
+    manager = AgentManager()
+    await manager.start()
+    
+    try:
+        config = AgentConfig(
+            id=f"bench-{transport}",
+            name=f"Bench{transport.upper()}",
+            port=0,
+            openai_api_key="sk-benchmark-placeholder"
+        )
+        agent = await manager.create_agent(config)
+        if agent.status != AgentStatus.RUNNING:
+            raise RuntimeError(f"Agent failed to start: {agent.error_message}")
+        
+        # Warm the connections up before measuring
+        await measure(manager, agent.url, 200, concurrency)
+        
+        results = []
+        for level in (1, concurrency):
+            result = await measure(manager, agent.url, requests, level)
+            result["transport"] = transport
+            results.append(result)
+        return results
+    finally:
+        for agent_id in list(manager.agents):
+            await manager.delete_agent(agent_id)
+        await manager.close()
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per measurement")
+    parser.add_argument("--concurrency", type=int, default=10, help="requests in flight for the concurrent run")
+    parser.add_argument("--transports", default="tcp,uds", help="comma-separated transports to compare")
+    parser.add_argument("--spawner", default="zygote", help="spawner used to start the agents")
+    args = parser.parse_args()
+    
+    results = []
+    for transport in args.transports.split(","):
+        print(f"Measuring {args.requests} requests over {transport}...")
+        results.extend(await run(transport, args.spawner, args.requests, args.concurrency))
+    
+    print()
+    print(f"{'transport':<9} {'in flight':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>9}")
+    for r in results:
+        print(f"{r['transport']:<9} {r['concurrency']:>9} {r['p50']:>8.3f} {r['p95']:>8.3f} {r['p99']:>8.3f} {r['rps']:>9.0f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from typing import Optional
 
 class Settings:
@@ -7,8 +8,90 @@ class Settings:
     PORT: int = int(os.getenv("PORT", "8000"))
     
     # Agent configuration
-    BASE_AGENT_PORT: int = 8001
-    AGENT_TIMEOUT: float = 30.0
+    BASE_AGENT_PORT: int = int(os.getenv("BASE_AGENT_PORT", "8001"))  # First port handed to agents
+    AGENT_TIMEOUT: float = float(os.getenv("AGENT_TIMEOUT", "30.0"))  # Longest a query may take (adaptive timeouts stay below it)
+    AGENT_TIMEOUT_MIN: float = float(os.getenv("AGENT_TIMEOUT_MIN", "10.0"))  # Shortest adaptive query timeout
+    AGENT_TIMEOUT_P99_FACTOR: float = float(os.getenv("AGENT_TIMEOUT_P99_FACTOR", "3"))  # Adaptive timeout = this x the agent's recent p99
+    AGENT_HEDGE_REQUESTS: bool = os.getenv("AGENT_HEDGE_REQUESTS", "true").lower() == "true"  # Race a copy on another replica once a query exceeds p95
+    AGENT_MAX_RETRIES: int = int(os.getenv("AGENT_MAX_RETRIES", "2"))  # Retries of a query whose process crashed or connection failed
+    AGENT_RETRY_BUDGET: float = float(os.getenv("AGENT_RETRY_BUDGET", "0.1"))  # Retries + hedges allowed per query, on average
+    AGENT_RETRY_BACKOFF: float = float(os.getenv("AGENT_RETRY_BACKOFF", "0.1"))  # Base of the jittered exponential backoff between retries (seconds)
+    AGENT_STARTUP_TIMEOUT: float = float(os.getenv("AGENT_STARTUP_TIMEOUT", "60.0"))
+    HEALTH_CHECK_INTERVAL: float = float(os.getenv("HEALTH_CHECK_INTERVAL", "10.0"))  # Seconds between probes of a healthy agent
+    HEALTH_CHECK_TIMEOUT: float = float(os.getenv("HEALTH_CHECK_TIMEOUT", "5.0"))
+    HEALTH_CHECK_MAX_BACKOFF: float = float(os.getenv("HEALTH_CHECK_MAX_BACKOFF", "60.0"))  # Longest gap between probes of a failing agent
+    HEALTH_CHECK_CONCURRENCY: int = int(os.getenv("HEALTH_CHECK_CONCURRENCY", "50"))
+    HEARTBEAT_INTERVAL: float = float(os.getenv("HEARTBEAT_INTERVAL", "0"))  # Seconds between agent heartbeats (0 = pull health checks instead)
+    HEARTBEAT_MISSED_LIMIT: int = int(os.getenv("HEARTBEAT_MISSED_LIMIT", "3"))  # Missed heartbeats before an agent is unhealthy
+    INTEGRATION_URL: str = os.getenv("INTEGRATION_URL", f"http://localhost:{PORT}")  # How agents reach this server
+    AGENT_STOP_TIMEOUT: float = float(os.getenv("AGENT_STOP_TIMEOUT", "5"))  # Seconds between SIGTERM and SIGKILL when stopping an agent
+    AGENT_LOG_BUFFER_LINES: int = int(os.getenv("AGENT_LOG_BUFFER_LINES", "1000"))  # Output lines kept per agent
+    AGENT_LOG_MAX_LINE_LENGTH: int = int(os.getenv("AGENT_LOG_MAX_LINE_LENGTH", "2000"))  # Longer lines are truncated
+    RESOURCE_SAMPLE_INTERVAL: float = float(os.getenv("RESOURCE_SAMPLE_INTERVAL", "5"))  # Seconds between resource samples (0 = disabled)
+    RESOURCE_HISTORY: int = int(os.getenv("RESOURCE_HISTORY", "120"))  # Raw samples kept per agent
+    RESOURCE_DOWNSAMPLE: int = int(os.getenv("RESOURCE_DOWNSAMPLE", "12"))  # Raw samples folded into one coarse point
+    RESOURCE_COARSE_HISTORY: int = int(os.getenv("RESOURCE_COARSE_HISTORY", "288"))  # Coarse points kept per agent
+    AGENT_RESTART_POLICY: str = os.getenv("AGENT_RESTART_POLICY", "on-failure")  # "always", "on-failure" or "never"
+    AGENT_RESTART_BACKOFF: float = float(os.getenv("AGENT_RESTART_BACKOFF", "1"))  # Delay before the first restart, doubled per recent crash
+    AGENT_RESTART_BACKOFF_MAX: float = float(os.getenv("AGENT_RESTART_BACKOFF_MAX", "60"))  # Longest delay between restarts
+    AGENT_CRASH_LOOP_LIMIT: int = int(os.getenv("AGENT_CRASH_LOOP_LIMIT", "5"))  # Crashes within the window that stop restarts
+    AGENT_CRASH_LOOP_WINDOW: float = float(os.getenv("AGENT_CRASH_LOOP_WINDOW", "300"))  # Seconds
+    AGENT_DRAIN_TIMEOUT: float = float(os.getenv("AGENT_DRAIN_TIMEOUT", "30"))  # Seconds a replaced agent process gets to finish in-flight requests
+    AGENT_AUTOSCALE_INTERVAL: float = float(os.getenv("AGENT_AUTOSCALE_INTERVAL", "5"))  # Seconds between replica autoscaling decisions (0 disables)
+    AGENT_AUTOSCALE_QUEUE_DEPTH: float = float(os.getenv("AGENT_AUTOSCALE_QUEUE_DEPTH", "4"))  # Outstanding requests per replica to scale for
+    AGENT_SCALE_DOWN_DELAY: float = float(os.getenv("AGENT_SCALE_DOWN_DELAY", "60"))  # Seconds of low load before a replica is removed
+    AGENT_MAX_CONCURRENCY: int = int(os.getenv("AGENT_MAX_CONCURRENCY", "8"))  # Queries in flight per agent process (0 = unlimited, no queue)
+    AGENT_MAX_QUEUE: int = int(os.getenv("AGENT_MAX_QUEUE", "32"))  # Queries waiting per agent before new ones get HTTP 429
+    AGENT_QUEUE_TIMEOUT: float = float(os.getenv("AGENT_QUEUE_TIMEOUT", "10"))  # Seconds a query may wait in the queue before HTTP 503
+    AGENT_BREAKER_WINDOW: int = int(os.getenv("AGENT_BREAKER_WINDOW", "20"))  # Recent queries per agent the circuit breaker judges (0 disables breakers)
+    AGENT_BREAKER_MIN_CALLS: int = int(os.getenv("AGENT_BREAKER_MIN_CALLS", "5"))  # Queries needed before the circuit can open
+    AGENT_BREAKER_FAILURE_RATE: float = float(os.getenv("AGENT_BREAKER_FAILURE_RATE", "0.5"))  # Share of failed queries that opens the circuit
+    AGENT_BREAKER_SLOW_CALL_SECONDS: float = float(os.getenv("AGENT_BREAKER_SLOW_CALL_SECONDS", "20"))  # Queries slower than this count as slow
+    AGENT_BREAKER_SLOW_CALL_RATE: float = float(os.getenv("AGENT_BREAKER_SLOW_CALL_RATE", "0.8"))  # Share of slow queries that opens the circuit
+    AGENT_BREAKER_OPEN_SECONDS: float = float(os.getenv("AGENT_BREAKER_OPEN_SECONDS", "30"))  # Seconds an open circuit fails fast before a trial query
+    AGENT_IDLE_TTL: float = float(os.getenv("AGENT_IDLE_TTL", "0"))  # Idle seconds before an agent is hibernated (0 = never)
+    AGENT_IDLE_CHECK_INTERVAL: float = float(os.getenv("AGENT_IDLE_CHECK_INTERVAL", "30"))  # Seconds between idle checks (0 disables hibernation)
+    AGENT_CPU_QUOTA: float = float(os.getenv("AGENT_CPU_QUOTA", "0"))  # CPU cores per agent process (0 = unlimited)
+    AGENT_MEMORY_LIMIT_MB: float = float(os.getenv("AGENT_MEMORY_LIMIT_MB", "0"))  # Memory per agent process (0 = unlimited)
+    AGENT_MAX_FDS: int = int(os.getenv("AGENT_MAX_FDS", "0"))  # Open files per agent process (0 = unlimited)
+    AGENT_CGROUP_PARENT: str = os.getenv("AGENT_CGROUP_PARENT", "/sys/fs/cgroup/agent-orch")  # cgroup v2 directory agent cgroups go under (empty = setrlimit only)
+    AGENT_CPU_AFFINITY: str = os.getenv("AGENT_CPU_AFFINITY", "none")  # "none" or "round-robin" (pin each agent process to the least used cores)
+    AGENT_CPUS_PER_AGENT: int = int(os.getenv("AGENT_CPUS_PER_AGENT", "1"))  # Cores each round-robin pinned process gets
+    AGENT_AFFINITY_GROUP_CONNECTED: bool = os.getenv("AGENT_AFFINITY_GROUP_CONNECTED", "true").lower() == "true"  # Keep connected agents on one socket
+    AGENT_BATCH_PARALLELISM: int = int(os.getenv("AGENT_BATCH_PARALLELISM", "8"))  # Agents started at once by POST /agents/batch
+    AGENT_TRANSPORT: str = os.getenv("AGENT_TRANSPORT", "tcp")  # "tcp" (localhost port per agent) or "uds" (Unix domain socket)
+    AGENT_SOCKET_DIR: str = os.getenv("AGENT_SOCKET_DIR", os.path.join(tempfile.gettempdir(), "agent-orch"))  # Where "uds" agents put their sockets
+    AGENT_HOST_CAPACITY: int = int(os.getenv("AGENT_HOST_CAPACITY", "0"))  # Agents packed into one host process (0 = a process per agent)
+    AGENT_SPAWNER: str = os.getenv("AGENT_SPAWNER", "exec")  # "exec" (new process per agent) or "zygote" (fork-server)
+    AGENT_WARM_POOL_SIZE: int = int(os.getenv("AGENT_WARM_POOL_SIZE", "0"))  # Idle pre-imported workers (0 = disabled)
+    
+    # Multi-node placement (agents started through node_daemon.py on other machines)
+    AGENT_NODES: str = os.getenv("AGENT_NODES", "")  # Comma-separated node daemon URLs (empty = run agents locally)
+    AGENT_PLACEMENT: str = os.getenv("AGENT_PLACEMENT", "spread")  # "spread" (least loaded node) or "binpack" (fill nodes one by one)
+    NODE_POLL_INTERVAL: float = float(os.getenv("NODE_POLL_INTERVAL", "10"))  # Seconds between node capacity polls
+    
+    # Node daemon (node_daemon.py)
+    NODE_ID: str = os.getenv("NODE_ID", "")  # Name of this node (default hostname:port)
+    NODE_ADVERTISE_HOST: str = os.getenv("NODE_ADVERTISE_HOST", "localhost")  # Host name the integration layer reaches this node's agents on
+    NODE_MAX_AGENTS: int = int(os.getenv("NODE_MAX_AGENTS", "0"))  # Agents this node accepts (0 = as many as memory allows)
+    NODE_AGENT_MEMORY_MB: float = float(os.getenv("NODE_AGENT_MEMORY_MB", "150"))  # Memory budgeted per agent
+    
+    # Persistent registry (agents, replicas, connections and nodes survive restarts of this server)
+    AGENT_REGISTRY_PATH: str = os.getenv(
+        "AGENT_REGISTRY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "agent_registry.db")
+    )  # SQLite file (empty = keep everything in memory only)
+    AGENT_STOP_ON_SHUTDOWN: bool = os.getenv("AGENT_STOP_ON_SHUTDOWN", "false").lower() == "true"  # Stop agents on shutdown instead of leaving them to be re-adopted
+    
+    # Agent HTTP client pool (shared by all agent traffic)
+    AGENT_POOL_MAX_CONNECTIONS: int = int(os.getenv("AGENT_POOL_MAX_CONNECTIONS", "500"))
+    AGENT_POOL_MAX_KEEPALIVE: int = int(os.getenv("AGENT_POOL_MAX_KEEPALIVE", "200"))
+    AGENT_POOL_KEEPALIVE_EXPIRY: float = float(os.getenv("AGENT_POOL_KEEPALIVE_EXPIRY", "30.0"))
+    AGENT_POOL_MAX_CONNECTIONS_PER_AGENT: int = int(os.getenv("AGENT_POOL_MAX_CONNECTIONS_PER_AGENT", "10"))
+    
+    # Routed message history (kept in memory; the oldest messages go first)
+    MESSAGE_HISTORY_MAX_MESSAGES: int = int(os.getenv("MESSAGE_HISTORY_MAX_MESSAGES", "1000"))  # 0 = no count limit
+    MESSAGE_HISTORY_MAX_MB: float = float(os.getenv("MESSAGE_HISTORY_MAX_MB", "16"))  # Approximate text size (0 = no size limit)
+    MESSAGE_HISTORY_MAX_AGE: float = float(os.getenv("MESSAGE_HISTORY_MAX_AGE", "3600"))  # Seconds (0 = no age limit)
     
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
@@ -0,0 +1,46 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, Set
+
+from models import AgentStatus
+
+@dataclass
+class AgentHost:
+    """One multi-tenant agent process (single/main.py with HOST_MODE=true).
+    
+    Shaped like an AgentInstance where it matters (url, status, error_message,
+    last_health_check) so it goes through the same readiness checks.
+    """
+    id: str
+    url: str
+    port: int = 0
+    socket_path: Optional[str] = None
+    process: Optional[Any] = None
+    agent_ids: Set[str] = field(default_factory=set)
+    status: AgentStatus = AgentStatus.STARTING
+    error_message: Optional[str] = None
+    last_health_check: Optional[str] = None
+    ready: Optional[asyncio.Future] = None  # Resolved with True/False once the process is up
+    closing: bool = False
+    
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process is not None else None
+    
+    @property
+    def alive(self) -> bool:
+        return not self.closing and (self.process is None or self.process.returncode is None)
+    
+    def has_room(self, capacity: int) -> bool:
+        return self.alive and self.status != AgentStatus.ERROR and len(self.agent_ids) < capacity
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "pid": self.pid,
+            "url": self.url,
+            "socket_path": self.socket_path,
+            "status": self.status,
+            "agents": sorted(self.agent_ids),
+            "error_message": self.error_message
+        }
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable, Set
+
+logger = logging.getLogger(__name__)
+
+class AgentLogBuffer:
+    """Fixed-size ring buffer of one agent's output lines, with live followers.
+    
+    Lines are truncated to max_line_length and only the most recent max_lines
+    are kept, so memory per agent stays bounded however much the agent writes.
+    Followers get new lines through bounded queues; a follower that falls too
+    far behind loses lines instead of growing its queue.
+    """
+    
+    def __init__(self, max_lines: int = 1000, max_line_length: int = 2000, follower_queue_size: int = 1000):
+        self.lines = deque(maxlen=max_lines)
+        self.max_line_length = max_line_length
+        self.follower_queue_size = follower_queue_size
+        self.next_seq = 0
+        self.dropped = 0  # Lines lost by followers that couldn't keep up
+        self._followers: Set[asyncio.Queue] = set()
+    
+    def append(self, stream: str, text: str):
+        """Store one line and hand it to every follower"""
+        if len(text) > self.max_line_length:
+            text = text[:self.max_line_length] + "...[truncated]"
+        entry = {
+            "seq": self.next_seq,
+            "timestamp": datetime.now().isoformat(),
+            "stream": stream,
+            "line": text
+        }
+        self.next_seq += 1
+        self.lines.append(entry)
+        
+        for queue in self._followers:
+            try:
+                queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                self.dropped += 1
+    
+    def tail(self, count: Optional[int] = None, stream: Optional[str] = None) -> List[Dict[str, Any]]:
+        """The last count lines (all buffered lines by default), optionally of one stream"""
+        lines = [entry for entry in self.lines if stream is None or entry["stream"] == stream]
+        if count is not None:
+            lines = lines[-count:] if count > 0 else []
+        return lines
+    
+    def follow(self) -> asyncio.Queue:
+        """Subscribe to new lines; None is delivered when the buffer is closed"""
+        queue = asyncio.Queue(maxsize=self.follower_queue_size)
+        self._followers.add(queue)
+        return queue
+    
+    def unfollow(self, queue: asyncio.Queue):
+        self._followers.discard(queue)
+    
+    def close(self):
+        """End every follow stream (the agent is gone)"""
+        for queue in self._followers:
+            try:
+                queue.put_nowait(None)
+            except asyncio.QueueFull:
+                # Make room for the end marker - this follower is behind anyway
+                queue.get_nowait()
+                queue.put_nowait(None)
+        self._followers.clear()
+    
+    async def pump(self, reader: asyncio.StreamReader, stream: str, on_line: Optional[Callable[[bytes], None]] = None):
+        """Drain a pipe into the buffer until EOF, so the agent never blocks on a full pipe"""
+        while True:
+            try:
+                raw = await reader.readline()
+            except ValueError:
+                # readline() discards a line longer than the reader's limit
+                raw = b"[line too long, dropped]\n"
+            except Exception as e:
+                logger.debug(f"Stopped reading agent {stream}: {str(e)}")
+                return
+            
+            if not raw:
+                return
+            if on_line is not None:
+                on_line(raw.strip())
+            self.append(stream, raw.decode(errors="replace").rstrip("\r\n"))
@@ -4,45 +4,502 @@ import os
 import signal
 import psutil
 import logging
-from typing import Dict, Optional, List
+import socket
+import time
+import uuid
+import hashlib
+import json
+from typing import Dict, Any, Optional, List, Tuple, Callable, Awaitable
 import httpx
 from datetime import datetime
 
-from models import AgentInstance, AgentConfig, AgentStatus, AgentQueryRequest
+from models import AgentInstance, AgentConfig, AgentStatus, AgentQueryRequest, BatchAgentResult, AgentHeartbeat
+from http_pool import AgentHttpPool
+from metrics import Histogram
+from warm_pool import WarmAgentPool
+from fork_server import ZygoteSpawner
+from health_monitor import HealthMonitor
+from agent_logs import AgentLogBuffer
+from agent_hosts import AgentHost
+from resource_sampler import ResourceSampler
+from supervisor import AgentSupervisor
+from replicas import AgentReplica, ReplicaStats, ReplicaAutoscaler, clamp_replicas, replica_bounds
+from nodes import NodeRegistry, NODE_UNREACHABLE
+from agent_registry import AgentRegistryStore, AdoptedAgentProcess, is_same_process
+from request_queue import AgentRequestQueue
+from circuit_breaker import CircuitBreaker, CIRCUIT_CLOSED, CIRCUIT_OPEN
+from call_policy import LatencyTracker, RetryBudget, backoff_delay
+from hibernation import AgentHibernator
+from resource_limits import ResourceLimiter, agent_limits
+from cpu_affinity import CpuPlacer
+from config import settings
 
 logger = logging.getLogger(__name__)
 
+# Lines the agent prints on stdout once it is listening (or has given up)
+READY_MARKER = b"AGENT_READY"
+FAILED_MARKER = b"AGENT_FAILED"
+
+# Environment shared by every agent process
+AGENT_BASE_ENV = {
+    'LOG_LEVEL': 'INFO',
+    # Serve directly so the agent can announce readiness on stdout
+    'RELOAD': 'false',
+    # Fix MKL threading issues
+    'MKL_NUM_THREADS': '1',
+    'OMP_NUM_THREADS': '1',
+    'OPENBLAS_NUM_THREADS': '1',
+    'NUMEXPR_NUM_THREADS': '1',
+    'VECLIB_MAXIMUM_THREADS': '1',
+    'MKL_THREADING_LAYER': 'GNU'
+}
+
+class AgentUnavailableError(Exception):
+    """The agent went away (crashed or was stopped) while a request was in flight"""
+
+class AgentTimeoutError(Exception):
+    """The agent didn't answer within the query's timeout"""
+
 class AgentManager:
     """Manages lifecycle of SingleAgent instances"""
     
-    def __init__(self):
+    def __init__(self, registry_path: Optional[str] = None):
         self.agents: Dict[str, AgentInstance] = {}
-        self.base_port = 8001  # Start agent ports from 8001
+        
+        # Copy of the registry on disk, so a restarted server re-adopts its agents
+        self.store: Optional[AgentRegistryStore] = AgentRegistryStore(registry_path) if registry_path else None
+        self.base_port = settings.BASE_AGENT_PORT  # Start agent ports from 8001 (by default)
         self.next_port = self.base_port
         
-    async def create_agent(self, config: AgentConfig) -> AgentInstance:
-        """Create and start a new agent instance"""
+        # One pooled HTTP client for every query and health probe
+        self.http = AgentHttpPool(
+            max_connections=settings.AGENT_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.AGENT_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.AGENT_POOL_KEEPALIVE_EXPIRY,
+            max_connections_per_agent=settings.AGENT_POOL_MAX_CONNECTIONS_PER_AGENT
+        )
+        
+        # Agent processes we spawned, and how long they took to become ready
+        self.processes: Dict[str, asyncio.subprocess.Process] = {}
+        self.startup_latency = Histogram()
+        self.startup_failures = 0
+        
+        # Output of every agent, drained continuously so a full pipe never blocks it
+        self.logs: Dict[str, AgentLogBuffer] = {}
+        self.log_pumps: Dict[str, List[asyncio.Task]] = {}
+        
+        # Idle, pre-imported workers that new agents can claim
+        self.agent_dir = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "single"
+        )
+        self.warm_pool = WarmAgentPool(
+            size=settings.AGENT_WARM_POOL_SIZE,
+            agent_dir=self.agent_dir,
+            env=AGENT_BASE_ENV,
+            startup_timeout=settings.AGENT_STARTUP_TIMEOUT
+        )
+        
+        # Optional fork-server that agents are forked from instead of spawned
+        self.zygote: Optional[ZygoteSpawner] = None
+        if settings.AGENT_SPAWNER == "zygote":
+            self.zygote = ZygoteSpawner(
+                agent_dir=self.agent_dir,
+                env=AGENT_BASE_ENV,
+                startup_timeout=settings.AGENT_STARTUP_TIMEOUT
+            )
+        
+        # Background health probing; API reads use the cached results
+        self.health_monitor = HealthMonitor(
+            self,
+            interval=settings.HEALTH_CHECK_INTERVAL,
+            timeout=settings.HEALTH_CHECK_TIMEOUT,
+            max_backoff=settings.HEALTH_CHECK_MAX_BACKOFF,
+            concurrency=settings.HEALTH_CHECK_CONCURRENCY,
+            heartbeat_interval=settings.HEARTBEAT_INTERVAL,
+            heartbeat_missed_limit=settings.HEARTBEAT_MISSED_LIMIT
+        )
+        
+        # Multi-tenant host processes, each serving up to AGENT_HOST_CAPACITY agents
+        self.hosts: Dict[str, AgentHost] = {}
+        
+        # CPU/memory/fd time series of every agent process
+        self.resource_sampler = ResourceSampler(
+            self,
+            interval=settings.RESOURCE_SAMPLE_INTERVAL,
+            capacity=settings.RESOURCE_HISTORY,
+            downsample=settings.RESOURCE_DOWNSAMPLE,
+            coarse_capacity=settings.RESOURCE_COARSE_HISTORY
+        )
+        
+        # Notices process exits immediately and restarts crashed agents
+        self.supervisor = AgentSupervisor(
+            self,
+            policy=settings.AGENT_RESTART_POLICY,
+            backoff_base=settings.AGENT_RESTART_BACKOFF,
+            backoff_max=settings.AGENT_RESTART_BACKOFF_MAX,
+            crash_loop_limit=settings.AGENT_CRASH_LOOP_LIMIT,
+            crash_loop_window=settings.AGENT_CRASH_LOOP_WINDOW
+        )
+        
+        # Node daemons on other machines that agents can be placed on
+        self.nodes = NodeRegistry(self.http, poll_interval=settings.NODE_POLL_INTERVAL)
+        
+        # Extra processes of replicated agents, and what each replica (by URL) has served
+        self.replicas: Dict[str, List[AgentReplica]] = {}
+        self.replica_stats: Dict[str, ReplicaStats] = {}
+        self.autoscaler = ReplicaAutoscaler(
+            self,
+            interval=settings.AGENT_AUTOSCALE_INTERVAL,
+            target_queue_depth=settings.AGENT_AUTOSCALE_QUEUE_DEPTH,
+            scale_down_delay=settings.AGENT_SCALE_DOWN_DELAY,
+            backoff_base=settings.AGENT_RESTART_BACKOFF,
+            backoff_max=settings.AGENT_RESTART_BACKOFF_MAX
+        )
+        
+        # Bounded queue of queries per agent, so bursts are turned away instead of piling up
+        self.request_queues: Dict[str, AgentRequestQueue] = {}
+        
+        # Circuit breaker per agent, so calls to a failing agent fail fast
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        
+        # Recent query latency per agent (for timeouts and hedging), and what retries may cost
+        self.latency: Dict[str, LatencyTracker] = {}
+        self.retry_budgets: Dict[str, RetryBudget] = {}
+        
+        # CPU/memory/fd limits of agent processes (cgroup v2, else setrlimit)
+        self.limiter = ResourceLimiter(settings.AGENT_CGROUP_PARENT)
+        
+        # Pins agent processes to cores, keeping connected agents on one socket
+        self.cpu_placer = CpuPlacer(
+            policy=settings.AGENT_CPU_AFFINITY,
+            cpus_per_agent=settings.AGENT_CPUS_PER_AGENT,
+            group_connected=settings.AGENT_AFFINITY_GROUP_CONNECTED
+        )
+        
+        # Stops agents idle past their TTL; queries wake them (one start shared by concurrent queries)
+        self.hibernator = AgentHibernator(
+            self,
+            interval=settings.AGENT_IDLE_CHECK_INTERVAL,
+            default_ttl=settings.AGENT_IDLE_TTL
+        )
+        self._hibernating: set = set()
+        self._waking: Dict[str, asyncio.Task] = {}
+        
+        # Serializes config updates and scaling per agent
+        self._update_locks: Dict[str, asyncio.Lock] = {}
+        
+        # When each agent last pushed a heartbeat (monotonic seconds)
+        self.last_heartbeat_at: Dict[str, float] = {}
+        
+        # Called with an agent whenever its status changes in the background
+        self.on_agent_update: Optional[Callable[[AgentInstance], Awaitable[None]]] = None
+        
+        # Called with an agent id for the agents connected to it (set by the message router)
+        self.connected_agents: Optional[Callable[[str], List[str]]] = None
+    
+    async def start(self):
+        """Start shared resources (called from the integration lifespan)"""
+        await self.http.start()
+        node_urls = [url.strip().rstrip("/") for url in settings.AGENT_NODES.split(",") if url.strip()]
+        if self.store:
+            node_urls += [url for url in self.store.load_nodes().values() if url not in node_urls]
+        await self.nodes.start(node_urls)
+        if self.zygote:
+            await self.zygote.start()
+        elif self.warm_pool.size > 0:
+            await self.warm_pool.start()
+        if self.store:
+            await self._recover()
+        await self.health_monitor.start()
+        await self.resource_sampler.start()
+        await self.autoscaler.start()
+        await self.hibernator.start()
+    
+    async def close(self):
+        """Release shared resources (called on integration shutdown)"""
+        await self.health_monitor.close()
+        await self.resource_sampler.close()
+        await self.autoscaler.close()
+        await self.hibernator.close()
+        await self.supervisor.close()
+        for host in list(self.hosts.values()):
+            await self._stop_host(host)
+        await self.warm_pool.close()
+        if self.zygote:
+            await self.zygote.close()
+        await self.nodes.close()
+        await self.http.close()
+        if self.store:
+            self.store.close()
+    
+    def _persist(self, agent: AgentInstance):
+        """Write an agent's current state to the registry store"""
+        if self.store is None or self.agents.get(agent.id) is not agent:
+            return
         try:
-            # Assign port if not specified
-            if not config.port:
-                config.port = self.next_port
-                self.next_port += 1
-            
-            # Create agent instance
+            self.store.save_agent(agent)
+        except Exception as e:
+            logger.warning(f"Failed to persist agent {agent.id}: {str(e)}")
+    
+    async def _recover(self):
+        """Rebuild the registry from the store, re-adopting agent processes that are still alive.
+        
+        Nothing is probed or respawned inline: live processes are adopted as
+        they are (the health monitor checks them from here on), and agents whose
+        process is gone are restarted in the background.
+        """
+        started = time.perf_counter()
+        restart: List[str] = []
+        stale_pids = set()
+        adopted = 0
+        
+        for row in self.store.load_agents():
+            config = AgentConfig(**json.loads(row["config"]))
+            status = AgentStatus(row["status"])
+            wanted = status in (AgentStatus.RUNNING, AgentStatus.STARTING)
+            alive = is_same_process(row["pid"], row["pid_started"])
             agent = AgentInstance(
                 id=config.id,
                 config=config,
                 status=AgentStatus.STOPPED,
-                url=f"http://localhost:{config.port}"
+                url=row["url"],
+                socket_path=row["socket_path"],
+                replicas=row["replicas"],
+                restart_count=row["restart_count"]
             )
             
-            self.agents[config.id] = agent
+            if row["node_id"]:
+                node = self.nodes.nodes.get(row["node_id"])
+                if node is not None:
+                    # Still running on its node as far as we know - the node polls will tell
+                    node.agent_ids.add(agent.id)
+                    agent.node_id = node.id
+                    agent.status = status
+                    self.agents[agent.id] = agent
+                    adopted += 1
+                    continue
+                logger.warning(f"Node {row['node_id']} of agent {agent.id} is gone, placing the agent again")
+                agent.url = None
+            elif row["host_id"]:
+                # Host processes are shared and not re-adopted: rebuild the agent on a new host
+                if alive:
+                    stale_pids.add(row["pid"])
+                agent.url = None
+            elif alive and status not in (AgentStatus.STOPPING, AgentStatus.STOPPED):
+                self._adopt_agent(agent, row["pid"])
+                adopted += 1
+                continue
+            elif alive:
+                stale_pids.add(row["pid"])  # Was being stopped when we went down
+            
+            if agent.url is None and not self.nodes.nodes and settings.AGENT_HOST_CAPACITY <= 0:
+                # No node or host to put it on any more - give it a local address
+                agent = self._register_agent(agent.config)
+                agent.restart_count = row["restart_count"]
+            if status == AgentStatus.ERROR:
+                agent.status = AgentStatus.ERROR
+                agent.error_message = "Agent process was gone when the integration layer restarted"
+            elif status == AgentStatus.HIBERNATED:
+                agent.status = AgentStatus.HIBERNATED  # Woken by its next query, as before
+            self.agents[agent.id] = agent
+            self._persist(agent)
+            if wanted:
+                restart.append(agent.id)
+        
+        for row in self.store.load_replicas():
+            agent = self.agents.get(row["agent_id"])
+            alive = is_same_process(row["pid"], row["pid_started"])
+            if agent is None or agent.id not in self.processes or not alive:
+                if alive:
+                    stale_pids.add(row["pid"])
+                self.store.delete_replica(row["agent_id"], row["idx"])
+                continue  # Missing replicas are started again by the autoscaler
+            self._adopt_replica(agent, row)
+        
+        for pid in stale_pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        
+        if restart:
+            asyncio.ensure_future(self._restart_recovered(restart))
+        logger.info(
+            f"Recovered {len(self.agents)} agents in {(time.perf_counter() - started) * 1000:.1f}ms "
+            f"({adopted} re-adopted, {len(restart)} to restart)"
+        )
+    
+    def _adopt_agent(self, agent: AgentInstance, pid: int):
+        """Take over an agent process started by a previous run of the integration layer"""
+        process = AdoptedAgentProcess(pid)
+        agent.pid = pid
+        agent.status = AgentStatus.RUNNING
+        try:
+            agent.limits = self.limiter.adopt(agent.id, pid, agent_limits(agent.config, settings))
+        except OSError as e:
+            logger.warning(f"Could not read the limits of re-adopted agent {agent.id}: {str(e)}")
+        agent.cpus = self.cpu_placer.adopt(agent.id, pid)
+        self.agents[agent.id] = agent
+        self.processes[agent.id] = process
+        if agent.socket_path:
+            self.http.register_socket(agent.url, agent.socket_path)
+        
+        # Its pipes went away with the previous run - only our own notes land here
+        logs = AgentLogBuffer(settings.AGENT_LOG_BUFFER_LINES, settings.AGENT_LOG_MAX_LINE_LENGTH)
+        logs.append("system", f"Agent process re-adopted after an integration restart (pid {pid}); earlier output is not available")
+        self.logs[agent.id] = logs
+        
+        self.last_heartbeat_at[agent.id] = time.monotonic()
+        self.supervisor.watch(agent.id, process)
+    
+    def _adopt_replica(self, agent: AgentInstance, row):
+        replica = AgentReplica(
+            agent_id=agent.id,
+            index=row["idx"],
+            url=row["url"],
+            port=row["port"],
+            socket_path=row["socket_path"],
+            process=AdoptedAgentProcess(row["pid"]),
+            status=AgentStatus.RUNNING
+        )
+        if replica.socket_path:
+            self.http.register_socket(replica.url, replica.socket_path)
+        self.cpu_placer.adopt(agent.id, replica.pid)
+        self.logs[replica.key] = self.logs[agent.id]
+        self.replicas.setdefault(agent.id, []).append(replica)
+        replica.exited = asyncio.ensure_future(replica.process.wait())
+        replica.exited.add_done_callback(lambda exited: self._on_replica_exit(replica, exited))
+    
+    async def _restart_recovered(self, agent_ids: List[str]):
+        """Start the recovered agents whose process didn't survive"""
+        semaphore = asyncio.Semaphore(max(1, settings.AGENT_BATCH_PARALLELISM))
+        
+        async def restart_one(agent_id: str):
+            async with semaphore:
+                agent = self.agents.get(agent_id)
+                if agent is None or agent.status != AgentStatus.STOPPED:
+                    return  # Started, stopped or deleted by hand meanwhile
+                if await self.start_agent(agent_id):
+                    await self.notify_agent_update(agent)
+        
+        await asyncio.gather(*(restart_one(agent_id) for agent_id in agent_ids))
+    
+    async def register_node(self, url: str) -> Dict:
+        """Add a node daemon (POST /nodes) and remember it across restarts"""
+        node = await self.nodes.add(url)
+        if self.store:
+            self.store.save_node(node.id, node.url)
+        return node.to_dict()
+    
+    def remove_node(self, node_id: str):
+        self.nodes.remove(node_id)
+        if self.store:
+            self.store.delete_node(node_id)
+    
+    async def notify_agent_update(self, agent: AgentInstance):
+        """Tell listeners (the WebSocket broadcaster) that an agent changed"""
+        self._persist(agent)
+        if self.on_agent_update is None:
+            return
+        try:
+            await self.on_agent_update(agent)
+        except Exception as e:
+            logger.warning(f"Failed to publish update for agent {agent.id}: {str(e)}")
+    
+    def get_http_pool_stats(self) -> Dict:
+        """Connection pool statistics for agent traffic"""
+        return self.http.get_stats()
+    
+    def get_startup_stats(self) -> Dict:
+        """Startup latency histogram (seconds from spawn to ready)"""
+        return {
+            "latency": self.startup_latency.to_dict(),
+            "failures": self.startup_failures,
+            "warm_pool": self.warm_pool.get_stats()
+        }
+    
+    def get_agent_resources(self, agent_id: str, resolution: str = "raw") -> Dict:
+        """Resource time series of an agent's process"""
+        agent = self.agents[agent_id]
+        host = self.hosts.get(agent.host_id) if agent.host_id else None
+        return {
+            "agent_id": agent_id,
+            "pid": agent.pid,
+            "host_id": agent.host_id,
+            "shared_with": sorted(host.agent_ids - {agent_id}) if host else [],
+            "interval": self.resource_sampler.interval,
+            "resolution": resolution,
+            "samples": self.resource_sampler.get_series(agent.host_id or agent_id, resolution)
+        }
+    
+    def get_agent_replicas(self, agent_id: str) -> Dict:
+        """Every process serving an agent, with the requests each has answered"""
+        agent = self.agents[agent_id]
+        processes = [(0, agent.pid, agent.url, agent.status)]
+        processes += [(r.index, r.pid, r.url, r.status) for r in self.replicas.get(agent_id, [])]
+        
+        replicas = []
+        for index, pid, url, status in processes:
+            stats = self.replica_stats.get(url) or ReplicaStats()
+            replicas.append({
+                "index": index,
+                "pid": pid,
+                "url": url,
+                "status": status,
+                **stats.to_dict()
+            })
+        
+        return {
+            "agent_id": agent_id,
+            "replicas": agent.replicas,
+            "min_replicas": agent.config.min_replicas or agent.config.replicas,
+            "max_replicas": agent.config.max_replicas or agent.config.replicas,
+            "queue_depth": self.queue_depth(agent_id),
+            "scale_failures": self.autoscaler.failures.get(agent_id, 0),
+            "scale_retry_in": self.autoscaler.retry_in(agent_id),
+            "processes": replicas
+        }
+    
+    def get_agent_queue(self, agent_id: str) -> Dict:
+        """Concurrency limit, queue depth and queue wait times of an agent"""
+        queue = self._request_queue(self.agents[agent_id])
+        return {"agent_id": agent_id, **queue.to_dict()} if queue else {"agent_id": agent_id, "max_concurrency": 0}
+    
+    def get_agent_latency(self, agent_id: str) -> Dict:
+        """Recent query latency of an agent, the timeout derived from it, and retries/hedges spent"""
+        agent = self.agents[agent_id]
+        tracker = self.latency.get(agent_id) or LatencyTracker()
+        budget = self.retry_budgets.get(agent_id) or RetryBudget(ratio=settings.AGENT_RETRY_BUDGET)
+        return {
+            "agent_id": agent_id,
+            **tracker.to_dict(),
+            "timeout": self._query_timeout(agent),
+            "hedging": settings.AGENT_HEDGE_REQUESTS and len(self._query_targets(agent)) > 1,
+            "retry_budget": budget.to_dict()
+        }
+    
+    def get_hibernation_stats(self) -> Dict:
+        return self.hibernator.to_dict()
+    
+    def get_queue_stats(self) -> Dict[str, Dict]:
+        """Queue of every agent that has been queried"""
+        return {agent_id: queue.to_dict() for agent_id, queue in self.request_queues.items()}
+    
+    def get_hosts(self) -> List[Dict]:
+        """Multi-tenant host processes and the agents placed on them"""
+        return [host.to_dict() for host in self.hosts.values()]
+    
+    async def create_agent(self, config: AgentConfig) -> AgentInstance:
+        """Create and start a new agent instance"""
+        try:
+            agent = self._register_agent(config)
+            self._persist(agent)
             
             # Start the agent process
             await self.start_agent(config.id)
             
             return agent
-            
+        
         except Exception as e:
             logger.error(f"Failed to create agent {config.id}: {str(e)}")
             if config.id in self.agents:
@@ -50,8 +507,130 @@ class AgentManager:
                 self.agents[config.id].error_message = str(e)
             raise
     
+    async def create_agents(self, configs: List[AgentConfig], parallelism: Optional[int] = None) -> List[BatchAgentResult]:
+        """Create many agents, starting at most `parallelism` of them at once"""
+        parallelism = max(1, parallelism or settings.AGENT_BATCH_PARALLELISM)
+        
+        # Register every agent (and allocate every port) before any await,
+        # so concurrent starts can never be handed the same port
+        agents = []
+        results: List[Optional[BatchAgentResult]] = [None] * len(configs)
+        for index, config in enumerate(configs):
+            try:
+                agents.append((index, self._register_agent(config)))
+                self._persist(agents[-1][1])
+            except Exception as e:
+                results[index] = BatchAgentResult(index=index, agent_id=config.id, success=False, error=str(e))
+        
+        semaphore = asyncio.Semaphore(parallelism)
+        
+        async def start_one(index: int, agent: AgentInstance):
+            async with semaphore:
+                try:
+                    started = await self.start_agent(agent.id)
+                    results[index] = BatchAgentResult(
+                        index=index,
+                        agent_id=agent.id,
+                        success=started,
+                        agent=agent,
+                        error=None if started else agent.error_message
+                    )
+                except Exception as e:
+                    agent.status = AgentStatus.ERROR
+                    agent.error_message = str(e)
+                    results[index] = BatchAgentResult(index=index, agent_id=agent.id, success=False, agent=agent, error=str(e))
+        
+        await asyncio.gather(*(start_one(index, agent) for index, agent in agents))
+        
+        logger.info(f"Batch created {sum(1 for r in results if r.success)}/{len(configs)} agents (parallelism {parallelism})")
+        return results
+    
+    def _register_agent(self, config: AgentConfig) -> AgentInstance:
+        """Add a stopped agent to the registry, assigning it a port (or socket) if needed"""
+        if config.id in self.agents:
+            raise ValueError(f"Agent {config.id} already exists")
+        
+        if self.nodes.nodes and not config.port:
+            # Placed on a node when started - the node decides the address
+            if config.replicas > 1 or (config.max_replicas or 1) > 1:
+                logger.warning(f"Agent {config.id} asks for replicas, but agents on nodes run as a single instance")
+            agent = AgentInstance(id=config.id, config=config, status=AgentStatus.STOPPED)
+            self.agents[config.id] = agent
+            return agent
+        
+        if settings.AGENT_HOST_CAPACITY > 0 and not config.port:
+            # Placed on a host process when started - the host decides the address
+            if config.replicas > 1 or (config.max_replicas or 1) > 1:
+                logger.warning(f"Agent {config.id} asks for replicas, but agents on hosts run as a single instance")
+            agent = AgentInstance(id=config.id, config=config, status=AgentStatus.STOPPED)
+            self.agents[config.id] = agent
+            return agent
+        
+        if settings.AGENT_TRANSPORT == "uds" and not config.port:
+            # No port at all - the host name only labels the agent's connections
+            agent = AgentInstance(
+                id=config.id,
+                config=config,
+                status=AgentStatus.STOPPED,
+                url=f"http://agent-{config.id}",
+                socket_path=os.path.join(settings.AGENT_SOCKET_DIR, f"{config.id}.sock"),
+                replicas=clamp_replicas(config, config.replicas)
+            )
+            self.agents[config.id] = agent
+            return agent
+        
+        # Assign port if not specified
+        if not config.port:
+            config.port = self._allocate_port()
+        
+        # Create agent instance
+        agent = AgentInstance(
+            id=config.id,
+            config=config,
+            status=AgentStatus.STOPPED,
+            url=f"http://localhost:{config.port}",
+            replicas=clamp_replicas(config, config.replicas)
+        )
+        
+        self.agents[config.id] = agent
+        return agent
+    
+    def _allocate_port(self) -> int:
+        """Next free agent port - synchronous, so it is atomic on the event loop"""
+        used = {agent.config.port for agent in self.agents.values()}
+        used.update(host.port for host in self.hosts.values())
+        used.update(replica.port for replicas in self.replicas.values() for replica in replicas)
+        while True:
+            port = self.next_port
+            self.next_port += 1
+            if port not in used and self._port_available(port):
+                return port
+    
+    @staticmethod
+    def _port_available(port: int) -> bool:
+        """Whether nothing else on this host is listening on the port"""
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+            try:
+                probe.bind(("0.0.0.0", port))
+                return True
+            except OSError:
+                return False
+    
     async def start_agent(self, agent_id: str) -> bool:
         """Start an agent process"""
+        started = False
+        try:
+            started = await self._start_agent(agent_id)
+            return started
+        finally:
+            if agent_id in self.agents:
+                if started and agent_id in self.breakers:
+                    # A fresh process gets a fresh circuit
+                    self.breakers[agent_id].reset()
+                    self._sync_circuit(self.agents[agent_id])
+                self._persist(self.agents[agent_id])
+    
+    async def _start_agent(self, agent_id: str) -> bool:
         if agent_id not in self.agents:
             raise ValueError(f"Agent {agent_id} not found")
         
@@ -62,24 +641,22 @@ class AgentManager:
         
         try:
             agent.status = AgentStatus.STARTING
+            agent.error_message = None
+            spawn_started = time.perf_counter()
+            
+            if agent.url is None and self.nodes.nodes:
+                return await self._start_remote_agent(agent, spawn_started)
+            
+            if settings.AGENT_HOST_CAPACITY > 0:
+                return await self._start_hosted_agent(agent, spawn_started)
             
             # Create environment variables for the agent
-            env = os.environ.copy()
-            env.update({
-                'AGENT_NAME': agent.config.name,
-                'AGENT_DESCRIPTION': f"Agent {agent.config.name}",
-                'PORT': str(agent.config.port),
-                'OPENAI_API_KEY': agent.config.openai_api_key,
-                'OPENAI_MODEL': agent.config.model,
-                'LOG_LEVEL': 'INFO',
-                # Fix MKL threading issues
-                'MKL_NUM_THREADS': '1',
-                'OMP_NUM_THREADS': '1',
-                'OPENBLAS_NUM_THREADS': '1',
-                'NUMEXPR_NUM_THREADS': '1',
-                'VECLIB_MAXIMUM_THREADS': '1',
-                'MKL_THREADING_LAYER': 'GNU'
-            })
+            agent_env = self._agent_env(agent_id, agent.config, agent.socket_path)
+            
+            if agent.socket_path:
+                os.makedirs(os.path.dirname(agent.socket_path), exist_ok=True)
+                self._remove_socket(agent)  # Left behind by a previous run
+                self.http.register_socket(agent.url, agent.socket_path)
             
             # Write agent-specific .env file
             # Get absolute path to single directory (go up to agent-orch root)
@@ -102,11 +679,6 @@ class AgentManager:
                 f.write("VECLIB_MAXIMUM_THREADS=1\n")
                 f.write("MKL_THREADING_LAYER=GNU\n")
             
-            # Start the agent process
-            cmd = [
-                "python", "main.py"
-            ]
-            
             # Ensure the agent directory exists and is accessible
             if not os.path.exists(agent_dir):
                 raise ValueError(f"Agent directory not found: {agent_dir}")
@@ -115,91 +687,891 @@ class AgentManager:
             if not os.path.exists(main_py_path):
                 raise ValueError(f"main.py not found in agent directory: {main_py_path}")
             
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                env=env,
-                cwd=agent_dir,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
+            process = await self._spawn_agent_process(agent_env)
             
             agent.pid = process.pid
+            self.processes[agent_id] = process
+            agent.limits = self._limit_process(agent_id, process.pid, agent.config)
+            agent.cpus = self._pin_process(agent_id, process.pid, agent.config)
+            self._persist(agent)  # Re-adoptable even if we go down while it starts
+            readiness = self._start_log_pumps(agent_id, process)
+            
+            # Wait for the agent to announce readiness (or die trying)
+            if not await self._wait_for_agent_ready(agent_id, process, readiness):
+                if process.returncode is not None:
+                    agent.pid = None
+                    self.processes.pop(agent_id, None)
+                self.startup_failures += 1
+                logger.error(f"Agent {agent_id} failed to start: {agent.error_message}")
+                return False
+            
+            startup_time = time.perf_counter() - spawn_started
+            self.startup_latency.observe(startup_time)
             agent.status = AgentStatus.RUNNING
+            self.last_heartbeat_at[agent_id] = time.monotonic()  # Heartbeat deadline starts now
+            self.supervisor.watch(agent_id, process)
             
-            # Wait a moment and check if process is still running
-            await asyncio.sleep(3)
+            address = agent.socket_path or f"port {agent.config.port}"
+            logger.info(f"Agent {agent_id} started successfully on {address} in {startup_time:.2f}s")
             
-            if process.returncode is not None:
-                # Process died immediately
-                try:
-                    stdout, stderr = await process.communicate()
-                    stdout_text = stdout.decode() if stdout else "No stdout"
-                    stderr_text = stderr.decode() if stderr else "No stderr"
-                    error_msg = f"Agent process died. Return code: {process.returncode}\nStdout: {stdout_text}\nStderr: {stderr_text}"
-                except:
-                    error_msg = f"Agent process died with return code: {process.returncode}"
-                
+            if agent.replicas > 1:
+                await self.scale_agent(agent_id, agent.replicas)
+            return True
+        
+        except Exception as e:
+            agent.status = AgentStatus.ERROR
+            agent.error_message = str(e)
+            logger.error(f"Failed to start agent {agent_id}: {str(e)}")
+            return False
+    
+    @staticmethod
+    def _agent_env(
+        agent_id: str,
+        config: AgentConfig,
+        socket_path: Optional[str] = None,
+        heartbeats: bool = True
+    ) -> Dict[str, str]:
+        """Environment an agent process is configured with (heartbeats=False for replicas, see _start_replica)"""
+        agent_env = {
+            **AGENT_BASE_ENV,
+            'AGENT_NAME': config.name,
+            'AGENT_DESCRIPTION': f"Agent {config.name}",
+            'AGENT_PROMPT': config.prompt or "",
+            'AGENT_ID': agent_id,
+            'PORT': str(config.port),
+            'OPENAI_API_KEY': config.openai_api_key,
+            'OPENAI_MODEL': config.model
+        }
+        if socket_path:
+            agent_env['UDS'] = socket_path
+        if heartbeats and settings.HEARTBEAT_INTERVAL > 0:
+            agent_env.update({
+                'INTEGRATION_URL': settings.INTEGRATION_URL,
+                'HEARTBEAT_INTERVAL': str(settings.HEARTBEAT_INTERVAL)
+            })
+        return agent_env
+    
+    @staticmethod
+    def config_hash(config: AgentConfig) -> str:
+        """Hash of everything that affects a running agent (not its id or address)"""
+        effective = config.model_dump(exclude={
+            "id", "port", "restart_policy", "replicas", "min_replicas", "max_replicas",
+            "max_concurrency", "max_queue", "queue_timeout", "idle_ttl"
+        })
+        return hashlib.sha256(json.dumps(effective, sort_keys=True).encode()).hexdigest()
+    
+    async def update_agent(self, agent_id: str, updates: Dict[str, Any]) -> bool:
+        """Apply a config change, replacing a running agent blue/green.
+        
+        Returns False when the effective config didn't change (nothing restarted).
+        A running agent keeps serving on its current process until the
+        replacement is ready; if the replacement fails the old config stays.
+        """
+        agent = self.agents[agent_id]
+        lock = self._update_locks.setdefault(agent_id, asyncio.Lock())
+        
+        async with lock:
+            new_config = agent.config.model_copy(update=updates)
+            replicas = clamp_replicas(new_config, updates.get("replicas", agent.replicas))
+            if replicas > 1 and not self._replicas_supported(agent):
+                raise ValueError("Replicas need a local process per agent, which agent hosts and nodes don't provide")
+            
+            if self.config_hash(new_config) == self.config_hash(agent.config):
+                if new_config == agent.config and replicas == agent.replicas:
+                    return False
+                agent.config = new_config  # Only restart, replica or queue settings changed
+            elif agent.status != AgentStatus.RUNNING:
+                agent.config = new_config  # Picked up by the next start
+            elif agent.node_id:
+                await self._replace_remote_agent(agent, new_config)
+            elif agent.host_id:
+                await self._replace_hosted_agent(agent, new_config)
+            else:
+                await self._replace_agent_process(agent, new_config)
+            
+            agent.replicas = replicas
+            self._persist(agent)
+            if agent.status == AgentStatus.RUNNING:
+                await self._reconcile_replicas(agent)
+        
+        # Hibernation turned off: don't leave the agent asleep until its next query
+        if "idle_ttl" in updates and agent.status == AgentStatus.HIBERNATED and self.hibernator.ttl(agent.config) <= 0:
+            try:
+                await self._wake_agent(agent)
+            except AgentUnavailableError as e:
+                logger.warning(f"{str(e)}; the next query will try again")
+        return True
+    
+    async def scale_agent(self, agent_id: str, replicas: int) -> int:
+        """Serve an agent from `replicas` processes; returns how many are serving it"""
+        agent = self.agents[agent_id]
+        if replicas > 1 and not self._replicas_supported(agent):
+            raise ValueError("Replicas need a local process per agent, which agent hosts and nodes don't provide")
+        
+        lock = self._update_locks.setdefault(agent_id, asyncio.Lock())
+        async with lock:
+            agent.replicas = max(1, replicas)
+            self._persist(agent)
+            if agent.status == AgentStatus.RUNNING:
+                await self._reconcile_replicas(agent)
+        return self.live_replicas(agent_id)
+    
+    def _replicas_supported(self, agent: AgentInstance) -> bool:
+        return not (agent.host_id or agent.node_id or settings.AGENT_HOST_CAPACITY > 0)
+    
+    def live_replicas(self, agent_id: str) -> int:
+        """Processes currently answering for an agent"""
+        agent = self.agents[agent_id]
+        live = 1 if agent.status == AgentStatus.RUNNING else 0
+        return live + sum(1 for r in self.replicas.get(agent_id, []) if r.status == AgentStatus.RUNNING)
+    
+    def queue_depth(self, agent_id: str) -> int:
+        """Queries outstanding across all of an agent's processes, plus those queued for them"""
+        queue = self.request_queues.get(agent_id)
+        return (queue.waiting if queue else 0) + sum(
+            self.replica_stats[url].in_flight
+            for url, _ in self._query_targets(self.agents[agent_id])
+            if url in self.replica_stats
+        )
+    
+    async def _reconcile_replicas(self, agent: AgentInstance):
+        """Start or stop replica processes until agent.replicas serve the agent (call with its lock held)"""
+        for replica in [r for r in self.replicas.get(agent.id, []) if r.status != AgentStatus.RUNNING]:
+            await self._stop_replica(agent, replica, drain=False)  # Exited - replaced below
+        
+        replicas = self.replicas.get(agent.id, [])
+        missing = agent.replicas - 1 - len(replicas)
+        if missing > 0:
+            await asyncio.gather(*(self._start_replica(agent) for _ in range(missing)))
+        elif missing < 0:
+            # Newest first, each finishing the requests it already has
+            extra = sorted(replicas, key=lambda r: r.index)[missing:]
+            await asyncio.gather(*(self._stop_replica(agent, r) for r in extra))
+    
+    async def _start_replica(self, agent: AgentInstance) -> Optional[AgentReplica]:
+        """Start one more process for an agent, on its own port (or socket)"""
+        replicas = self.replicas.setdefault(agent.id, [])
+        index = max((r.index for r in replicas), default=0) + 1
+        if agent.socket_path:
+            replica = AgentReplica(
+                agent_id=agent.id,
+                index=index,
+                url=f"http://agent-{agent.id}-r{index}",
+                socket_path=os.path.join(settings.AGENT_SOCKET_DIR, f"{agent.id}-r{index}.sock")
+            )
+            os.makedirs(os.path.dirname(replica.socket_path), exist_ok=True)
+            self._remove_socket(replica)
+            self.http.register_socket(replica.url, replica.socket_path)
+        else:
+            port = self._allocate_port()
+            replica = AgentReplica(agent_id=agent.id, index=index, url=f"http://localhost:{port}", port=port)
+        replicas.append(replica)  # Before any await, so the index and port stay ours
+        
+        if agent.id in self.logs:
+            self.logs[replica.key] = self.logs[agent.id]  # One log buffer for all of an agent's processes
+        config = agent.config.model_copy(update={"port": replica.port})
+        try:
+            # No heartbeats: they would be taken for the primary's and hide its crash; exits are watched directly
+            env = self._agent_env(agent.id, config, replica.socket_path, heartbeats=False)
+            replica.process = await self._spawn_agent_process(env)
+            self._limit_process(agent.id, replica.pid, config)
+            self._pin_process(agent.id, replica.pid, config)
+            readiness = self._start_log_pumps(replica.key, replica.process)
+            ready = await self._wait_for_agent_ready(replica.key, replica.process, readiness, target=replica)
+        except Exception as e:
+            ready = False
+            replica.error_message = str(e)
+        
+        if not ready or not any(r is replica for r in self.replicas.get(agent.id, [])):
+            if not ready:
+                logger.error(f"Replica {index} of agent {agent.id} failed to start: {replica.error_message}")
+            await self._stop_replica(agent, replica, drain=False)  # Failed, or the agent was stopped meanwhile
+            return None
+        
+        replica.status = AgentStatus.RUNNING
+        replica.exited = asyncio.ensure_future(replica.process.wait())
+        replica.exited.add_done_callback(lambda exited: self._on_replica_exit(replica, exited))
+        if self.store:
+            self.store.save_replica(replica)
+        logger.info(f"Replica {index} of agent {agent.id} started (pid {replica.pid})")
+        return replica
+    
+    def _on_replica_exit(self, replica: AgentReplica, exited: asyncio.Future):
+        if exited.cancelled() or replica.status != AgentStatus.RUNNING:
+            return  # Stopped on purpose
+        replica.status = AgentStatus.ERROR
+        replica.error_message = f"Replica process exited with code {exited.result()}"
+        logger.error(f"Replica {replica.index} of agent {replica.agent_id} exited with code {exited.result()}")
+    
+    async def _stop_replica(self, agent: AgentInstance, replica: AgentReplica, drain: bool = True):
+        """Take a replica out of rotation, let it finish its requests, then stop its process"""
+        replica.status = AgentStatus.STOPPING
+        if agent.id in self.replicas:
+            self.replicas[agent.id] = [r for r in self.replicas[agent.id] if r is not replica]
+        if self.store:
+            self.store.delete_replica(agent.id, replica.index)
+        
+        if drain:
+            deadline = time.monotonic() + settings.AGENT_DRAIN_TIMEOUT
+            while self.http.in_flight(replica.url) > 0 and time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
+        
+        if replica.process is not None:
+            await self._terminate_process(replica.key, replica.pid, process=replica.process)
+        pumps = self.log_pumps.pop(replica.key, [])
+        if pumps:
+            await asyncio.wait(pumps, timeout=1.0)
+            for pump in pumps:
+                pump.cancel()
+        self.logs.pop(replica.key, None)
+        self.http.forget(replica.url)
+        self.replica_stats.pop(replica.url, None)
+        self._remove_socket(replica)
+        replica.status = AgentStatus.STOPPED
+    
+    async def _replace_agent_process(self, agent: AgentInstance, new_config: AgentConfig):
+        """Blue/green: start the new process, switch routing to it, then drain and stop the old one"""
+        agent_id = agent.id
+        started = time.perf_counter()
+        
+        # The replacement needs its own address while the old process still holds the current one
+        socket_path = None
+        if agent.socket_path:
+            socket_path = os.path.join(settings.AGENT_SOCKET_DIR, f"{agent_id}-{uuid.uuid4().hex[:8]}.sock")
+            green = AgentInstance(id=agent_id, config=new_config, status=AgentStatus.STARTING,
+                                  url=f"http://agent-{agent_id}-{uuid.uuid4().hex[:8]}", socket_path=socket_path)
+            os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+            self.http.register_socket(green.url, socket_path)
+        else:
+            new_config.port = self._allocate_port()
+            green = AgentInstance(id=agent_id, config=new_config, status=AgentStatus.STARTING,
+                                  url=f"http://localhost:{new_config.port}")
+        
+        green_key = f"{agent_id}:green"
+        if agent_id in self.logs:
+            self.logs[green_key] = self.logs[agent_id]  # One log buffer across both processes
+        process = None
+        try:
+            process = await self._spawn_agent_process(self._agent_env(agent_id, new_config, socket_path))
+            limits = self._limit_process(agent_id, process.pid, new_config)
+            cpus = self._pin_process(agent_id, process.pid, new_config)
+            readiness = self._start_log_pumps(green_key, process)
+            ready = await self._wait_for_agent_ready(green_key, process, readiness, target=green)
+        except Exception as e:
+            ready = False
+            green.error_message = str(e)
+        finally:
+            self.logs.pop(green_key, None)
+        
+        if not ready:
+            if process is not None:
+                await self._kill_process(process)
+            for pump in self.log_pumps.pop(green_key, []):
+                pump.cancel()
+            self.http.forget(green.url)
+            self._remove_socket(green)
+            raise RuntimeError(f"Replacement process failed to start, keeping the current one: {green.error_message}")
+        
+        # Switch routing in one step - nothing awaits between these lines
+        old_process = self.processes.get(agent_id)
+        old_pumps = self.log_pumps.get(agent_id, [])
+        old = AgentInstance(id=agent_id, config=agent.config, status=AgentStatus.STOPPING,
+                            url=agent.url, socket_path=agent.socket_path, pid=agent.pid)
+        agent.config = new_config
+        agent.url = green.url
+        agent.socket_path = socket_path
+        agent.pid = process.pid
+        agent.limits = limits
+        agent.cpus = cpus
+        agent.last_health_check = green.last_health_check
+        self.processes[agent_id] = process
+        self.log_pumps[agent_id] = self.log_pumps.pop(green_key, [])
+        self.supervisor.watch(agent_id, process)  # The old process exiting is no longer a crash
+        self._persist(agent)
+        logger.info(f"Agent {agent_id} switched to its new process (pid {process.pid}) in {time.perf_counter() - started:.2f}s")
+        
+        # Drain: let requests already sent to the old process finish
+        deadline = time.monotonic() + settings.AGENT_DRAIN_TIMEOUT
+        while self.http.in_flight(old.url) > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        
+        if old.pid:
+            await self._terminate_process(agent_id, old.pid, process=old_process)
+        if old_pumps:
+            await asyncio.wait(old_pumps, timeout=1.0)  # Its last lines still land in the shared buffer
+            for pump in old_pumps:
+                pump.cancel()
+        if old.url != agent.url:
+            self.http.forget(old.url)
+            self.replica_stats.pop(old.url, None)
+        self._remove_socket(old)
+        logger.info(f"Agent {agent_id} old process (pid {old.pid}) drained and stopped")
+        
+        # Replicas follow one at a time, so capacity never drops by more than one process
+        for old_replica in list(self.replicas.get(agent_id, [])):
+            await self._start_replica(agent)
+            await self._stop_replica(agent, old_replica)
+    
+    async def _replace_hosted_agent(self, agent: AgentInstance, new_config: AgentConfig):
+        """Rebuild an agent inside its host; the host swaps it in once the new one is built"""
+        host = self.hosts[agent.host_id]
+        response = await self.http.request(
+            "PUT",
+            host.url,
+            f"/agents/{agent.id}",
+            json={
+                "name": new_config.name,
+                "prompt": new_config.prompt,
+                "model": new_config.model,
+                "openai_api_key": new_config.openai_api_key
+            },
+            timeout=settings.AGENT_STARTUP_TIMEOUT
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Host rejected the new config, keeping the current one: {response.json().get('detail')}")
+        agent.config = new_config
+    
+    async def _start_remote_agent(self, agent: AgentInstance, spawn_started: float) -> bool:
+        """Start an agent through the node daemon the placement policy picks, moving on if a node is full"""
+        # Replicas are a local feature - a node runs exactly one process for the agent
+        config = agent.config.model_dump()
+        config.update(port=0, replicas=1, min_replicas=None, max_replicas=None)
+        
+        tried = set()
+        while True:
+            node = self.nodes.place(agent.id, settings.AGENT_PLACEMENT, exclude=tried)
+            if node is None:
+                agent.node_id = None
                 agent.status = AgentStatus.ERROR
-                agent.error_message = error_msg
-                logger.error(f"Agent {agent_id} failed to start: {error_msg}")
+                agent.error_message = "No node has room for another agent"
+                if tried:
+                    agent.error_message += f" (turned down by {', '.join(sorted(tried))})"
+                self.startup_failures += 1
+                logger.error(f"Agent {agent.id} failed to start: {agent.error_message}")
                 return False
+            tried.add(node.id)
+            agent.node_id = node.id
             
-            # Test health endpoint
-            await self._wait_for_agent_ready(agent_id)
+            try:
+                response = await self.http.post(node.url, "/agents", json=config, timeout=settings.AGENT_STARTUP_TIMEOUT + 10)
+            except httpx.TimeoutException:
+                response = None
+                detail = f"Node {node.id} did not answer within {settings.AGENT_STARTUP_TIMEOUT + 10:.0f}s"
+            except httpx.TransportError as e:
+                node.status = NODE_UNREACHABLE
+                node.error_message = str(e)
+                logger.warning(f"Node {node.id} is unreachable, placing agent {agent.id} elsewhere: {str(e)}")
+                self.nodes.release(node.id, agent.id)
+                continue
             
-            logger.info(f"Agent {agent_id} started successfully on port {agent.config.port}")
-            return True
+            if response is not None and response.status_code == 503:
+                logger.info(f"Node {node.id} turned agent {agent.id} down ({response.json().get('detail')}), trying another")
+                self.nodes.release(node.id, agent.id)
+                continue
+            if response is not None and response.status_code == 200:
+                break
+            
+            if response is not None:
+                detail = response.json().get("detail", f"HTTP {response.status_code}")
+            await self._stop_remote_agent(agent)
+            agent.status = AgentStatus.ERROR
+            agent.error_message = f"Node {node.id}: {detail}"
+            self.startup_failures += 1
+            logger.error(f"Agent {agent.id} failed to start: {agent.error_message}")
+            return False
+        
+        agent.url = response.json()["url"]
+        agent.last_health_check = datetime.now().isoformat()
+        
+        startup_time = time.perf_counter() - spawn_started
+        self.startup_latency.observe(startup_time)
+        agent.status = AgentStatus.RUNNING
+        if node.heartbeat_interval > 0:
+            self.last_heartbeat_at[agent.id] = time.monotonic()
+        
+        logger.info(f"Agent {agent.id} started on node {node.id} ({len(node.agent_ids)} agents) in {startup_time:.2f}s")
+        return True
+    
+    async def _stop_remote_agent(self, agent: AgentInstance):
+        """Remove an agent from its node and free the slot"""
+        node = self.nodes.nodes.get(agent.node_id) if agent.node_id else None
+        if node is not None:
+            try:
+                response = await self.http.request(
+                    "DELETE", node.url, f"/agents/{agent.id}", timeout=settings.AGENT_STOP_TIMEOUT + 10
+                )
+                if response.status_code not in (200, 404):
+                    raise RuntimeError(response.json().get("detail", f"HTTP {response.status_code}"))
+            except httpx.TransportError as e:
+                logger.warning(f"Could not reach node {node.id} - agent {agent.id} may still be running there: {str(e)}")
+        
+        self.nodes.release(agent.node_id, agent.id)
+        agent.node_id = None
+        if agent.url:
+            self.http.forget(agent.url)
+            self.replica_stats.pop(agent.url, None)
+        agent.url = None  # Placed again on the next start
+    
+    async def _replace_remote_agent(self, agent: AgentInstance, new_config: AgentConfig):
+        """Have the agent's node swap it for one with the new config (blue/green on the node)"""
+        node = self.nodes.nodes[agent.node_id]
+        response = await self.http.request(
+            "PUT",
+            node.url,
+            f"/agents/{agent.id}",
+            # Everything the node's own config hash covers; nulls put the node's defaults back
+            json=new_config.model_dump(include={
+                "name", "prompt", "model", "openai_api_key", "cpu_quota", "memory_limit_mb", "max_fds", "cpu_affinity"
+            }),
+            timeout=settings.AGENT_STARTUP_TIMEOUT + settings.AGENT_DRAIN_TIMEOUT + 10
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Node {node.id} rejected the new config, keeping the current one: {response.json().get('detail')}")
+        
+        old_url = agent.url
+        agent.config = new_config
+        agent.url = response.json()["url"]
+        if agent.url != old_url:
+            self.http.forget(old_url)
+            self.replica_stats.pop(old_url, None)
+    
+    def get_nodes(self) -> List[Dict]:
+        """Node daemons agents are placed on, with their last capacity report"""
+        return [node.to_dict() for node in self.nodes.nodes.values()]
+    
+    async def _start_hosted_agent(self, agent: AgentInstance, spawn_started: float) -> bool:
+        """Place an agent on a host process (starting one if all are full) and add it there"""
+        await self._release_host_slot(agent)
+        host = self._place_agent(agent.id)
+        agent.host_id = host.id
+        
+        try:
+            if not await self._host_ready(host):
+                raise RuntimeError(f"Agent host {host.id} failed to start: {host.error_message}")
             
+            response = await self.http.request(
+                "PUT",
+                host.url,
+                f"/agents/{agent.id}",
+                json={
+                    "name": agent.config.name,
+                    "prompt": agent.config.prompt,
+                    "model": agent.config.model,
+                    "openai_api_key": agent.config.openai_api_key
+                },
+                timeout=settings.AGENT_STARTUP_TIMEOUT
+            )
+            if response.status_code != 200:
+                raise RuntimeError(response.json().get("detail", f"HTTP {response.status_code}"))
         except Exception as e:
             agent.status = AgentStatus.ERROR
             agent.error_message = str(e)
-            logger.error(f"Failed to start agent {agent_id}: {str(e)}")
+            self.startup_failures += 1
+            logger.error(f"Agent {agent.id} failed to start: {agent.error_message}")
+            await self._release_host_slot(agent)
+            return False
+        
+        # The agent's API lives under its id on the host
+        agent.url = f"{host.url}/agents/{agent.id}"
+        if host.socket_path:
+            self.http.register_socket(agent.url, host.socket_path)
+        agent.pid = host.pid
+        agent.last_health_check = datetime.now().isoformat()
+        self.logs[agent.id] = self.logs[host.id]
+        
+        startup_time = time.perf_counter() - spawn_started
+        self.startup_latency.observe(startup_time)
+        agent.status = AgentStatus.RUNNING
+        self.last_heartbeat_at[agent.id] = time.monotonic()
+        
+        logger.info(f"Agent {agent.id} started on host {host.id} ({len(host.agent_ids)} agents) in {startup_time:.2f}s")
+        return True
+    
+    def _place_agent(self, agent_id: str) -> AgentHost:
+        """Reserve a slot on the first host with room, or register a new host.
+        
+        Synchronous, so concurrent starts can't overfill a host; the new host's
+        process is started by whoever awaits _host_ready first.
+        """
+        for host in self.hosts.values():
+            if host.has_room(settings.AGENT_HOST_CAPACITY):
+                host.agent_ids.add(agent_id)
+                return host
+        
+        host_id = f"host-{uuid.uuid4().hex[:8]}"
+        if settings.AGENT_TRANSPORT == "uds":
+            host = AgentHost(
+                id=host_id,
+                url=f"http://{host_id}",
+                socket_path=os.path.join(settings.AGENT_SOCKET_DIR, f"{host_id}.sock")
+            )
+        else:
+            port = self._allocate_port()
+            host = AgentHost(id=host_id, url=f"http://localhost:{port}", port=port)
+        host.agent_ids.add(agent_id)
+        self.hosts[host_id] = host
+        return host
+    
+    async def _host_ready(self, host: AgentHost) -> bool:
+        """Start the host process on first use; everyone else waits for the same result"""
+        if host.ready is None:
+            host.ready = asyncio.get_running_loop().create_future()
+            try:
+                started = await self._start_host(host)
+            except Exception as e:
+                host.status = AgentStatus.ERROR
+                host.error_message = str(e)
+                started = False
+            host.ready.set_result(started)
+        return await asyncio.shield(host.ready)
+    
+    async def _start_host(self, host: AgentHost) -> bool:
+        host_env = {
+            **AGENT_BASE_ENV,
+            'HOST_MODE': 'true',
+            'AGENT_NAME': f"AgentHost {host.id}",
+            'PORT': str(host.port)
+        }
+        if host.socket_path:
+            host_env['UDS'] = host.socket_path
+            os.makedirs(os.path.dirname(host.socket_path), exist_ok=True)
+            self._remove_socket(host)
+            self.http.register_socket(host.url, host.socket_path)
+        if settings.HEARTBEAT_INTERVAL > 0:
+            host_env.update({
+                'INTEGRATION_URL': settings.INTEGRATION_URL,
+                'HEARTBEAT_INTERVAL': str(settings.HEARTBEAT_INTERVAL)
+            })
+        
+        try:
+            host.process = await self._spawn_agent_process(host_env)
+        except Exception as e:
+            host.status = AgentStatus.ERROR
+            host.error_message = str(e)
             return False
+        
+        self.processes[host.id] = host.process
+        readiness = self._start_log_pumps(host.id, host.process)
+        if not await self._wait_for_agent_ready(host.id, host.process, readiness):
+            logger.error(f"Agent host {host.id} failed to start: {host.error_message}")
+            return False
+        
+        host.status = AgentStatus.RUNNING
+        self.supervisor.watch(host.id, host.process)
+        logger.info(f"Agent host {host.id} started (pid {host.pid})")
+        return True
+    
+    async def _release_host_slot(self, agent: AgentInstance):
+        """Take an agent off its host, stopping the host once it serves nobody"""
+        host = self.hosts.get(agent.host_id) if agent.host_id else None
+        agent.host_id = None
+        self.logs.pop(agent.id, None)
+        if host is None or agent.id not in host.agent_ids:
+            return
+        
+        if host.status == AgentStatus.RUNNING and host.alive:
+            try:
+                await self.http.request("DELETE", host.url, f"/agents/{agent.id}", timeout=5.0)
+            except Exception as e:
+                logger.warning(f"Failed to remove agent {agent.id} from host {host.id}: {str(e)}")
+        if agent.url and agent.url != host.url:
+            self.http.forget(agent.url)
+        
+        host.agent_ids.discard(agent.id)
+        if not host.agent_ids and not host.closing:
+            await self._stop_host(host)
+    
+    async def _stop_host(self, host: AgentHost):
+        host.closing = True
+        if host.ready is not None and not host.ready.done():
+            await asyncio.shield(host.ready)
+        if host.pid:
+            await self._terminate_process(host.id, host.pid)
+        
+        self.hosts.pop(host.id, None)
+        self.processes.pop(host.id, None)
+        self.resource_sampler.forget(host.id)
+        self.supervisor.forget(host.id)
+        self.http.forget(host.url)
+        for pump in self.log_pumps.pop(host.id, []):
+            pump.cancel()
+        logs = self.logs.pop(host.id, None)
+        if logs is not None:
+            logs.close()
+        self._remove_socket(host)
+        logger.info(f"Agent host {host.id} stopped")
+    
+    def _start_log_pumps(self, agent_id: str, process: asyncio.subprocess.Process) -> asyncio.Future:
+        """Drain the agent's stdout/stderr into its log buffer.
+        
+        Returns a future resolved with the first readiness/failure line seen on
+        stdout, or None if stdout closes without one.
+        """
+        logs = self.logs.get(agent_id)
+        if logs is None:
+            logs = AgentLogBuffer(settings.AGENT_LOG_BUFFER_LINES, settings.AGENT_LOG_MAX_LINE_LENGTH)
+            self.logs[agent_id] = logs
+        logs.append("system", f"Agent process started (pid {process.pid})")
+        
+        readiness = asyncio.get_running_loop().create_future()
+        
+        def watch_for_readiness(line: bytes):
+            if not readiness.done() and (line.startswith(READY_MARKER) or line.startswith(FAILED_MARKER)):
+                readiness.set_result(line)
+        
+        def stdout_closed(_):
+            if not readiness.done():
+                readiness.set_result(None)
+        
+        stdout_pump = asyncio.ensure_future(logs.pump(process.stdout, "stdout", watch_for_readiness))
+        stdout_pump.add_done_callback(stdout_closed)
+        stderr_pump = asyncio.ensure_future(logs.pump(process.stderr, "stderr"))
+        
+        for pump in self.log_pumps.pop(agent_id, []):
+            pump.cancel()
+        self.log_pumps[agent_id] = [stdout_pump, stderr_pump]
+        return readiness
+    
+    def _limit_process(self, agent_id: str, pid: int, config: AgentConfig) -> Optional[Dict[str, Any]]:
+        """Apply the agent's CPU/memory/fd limits to one of its processes"""
+        try:
+            return self.limiter.apply(agent_id, pid, agent_limits(config, settings))
+        except (OSError, psutil.Error) as e:
+            logger.error(f"Failed to limit resources of agent {agent_id} (pid {pid}): {str(e)}")
+            return None
+    
+    def _pin_process(self, agent_id: str, pid: int, config: AgentConfig) -> Optional[List[int]]:
+        """Pin one of the agent's processes to its CPUs (explicit, or picked by AGENT_CPU_AFFINITY)"""
+        peers = self.connected_agents(agent_id) if self.connected_agents else []
+        try:
+            return self.cpu_placer.place(agent_id, pid, config.cpu_affinity, peers)
+        except OSError as e:
+            logger.error(f"Failed to pin agent {agent_id} (pid {pid}) to CPUs: {str(e)}")
+            return None
+    
+    def colocate_agents(self, agent_id: str, peer_id: str):
+        """Move an agent's processes to the socket of an agent it was just connected to"""
+        agent = self.agents.get(agent_id)
+        if agent is None or peer_id not in self.agents:
+            return
+        moved = self.cpu_placer.colocate(agent_id, peer_id)
+        if agent.pid in moved:
+            agent.cpus = moved[agent.pid]
+        if moved:
+            logger.info(f"Moved {len(moved)} processes of agent {agent_id} next to agent {peer_id}")
+    
+    def get_cpu_placement(self) -> Dict:
+        return self.cpu_placer.to_dict()
+    
+    async def check_limits(self, samples: Dict[str, Dict[str, float]]):
+        """Count the limits each agent's processes ran into (called after every resource sweep)"""
+        for agent in list(self.agents.values()):
+            if not agent.limits:
+                continue
+            try:
+                hit = self.limiter.check(agent.id, agent.limits, samples.get(agent.id))
+            except (OSError, psutil.Error) as e:
+                logger.warning(f"Failed to check the limits of agent {agent.id}: {str(e)}")
+                continue
+            if not hit:
+                continue
+            
+            for resource_name in hit:
+                agent.limit_hits[resource_name] = agent.limit_hits.get(resource_name, 0) + 1
+            agent.last_limit_hit = f"{', '.join(hit)} at {datetime.now().isoformat()}"
+            logger.warning(f"Agent {agent.id} hit its {', '.join(hit)} limit")
+            await self.notify_agent_update(agent)
+    
+    async def _spawn_agent_process(self, agent_env: Dict[str, str]):
+        """Launch an agent process: forked from the zygote, claimed from the warm pool, or spawned cold"""
+        if self.zygote:
+            return await self.zygote.spawn(agent_env)
+        
+        process = await self.warm_pool.claim(agent_env)
+        if process is not None:
+            return process
+        
+        env = os.environ.copy()
+        env.update(agent_env)
+        return await asyncio.create_subprocess_exec(
+            "python", "main.py",
+            env=env,
+            cwd=self.agent_dir,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True  # Outlives a Ctrl-C of the integration layer, to be re-adopted
+        )
     
     async def stop_agent(self, agent_id: str) -> bool:
         """Stop an agent process"""
         if agent_id not in self.agents:
             return False
-        
+        try:
+            return await self._stop_agent(agent_id)
+        finally:
+            if agent_id in self.agents:
+                self._persist(self.agents[agent_id])
+    
+    async def _stop_agent(self, agent_id: str) -> bool:
         agent = self.agents[agent_id]
+        self.supervisor.cancel_restart(agent_id)
         
         if agent.status == AgentStatus.STOPPED:
             return True
+        if agent.status == AgentStatus.HIBERNATED:
+            agent.status = AgentStatus.STOPPED  # Nothing is running
+            logger.info(f"Agent {agent_id} stopped")
+            return True
         
         try:
             agent.status = AgentStatus.STOPPING
             
-            if agent.pid:
-                # Kill the process
-                try:
-                    process = psutil.Process(agent.pid)
-                    process.terminate()
-                    
-                    # Wait for graceful shutdown
-                    try:
-                        process.wait(timeout=5)
-                    except psutil.TimeoutExpired:
-                        # Force kill if it doesn't stop gracefully
-                        process.kill()
-                        process.wait()
-                        
-                except psutil.NoSuchProcess:
-                    # Process already dead
-                    pass
+            replicas = self.replicas.pop(agent_id, [])
+            await asyncio.gather(*(self._stop_replica(agent, r, drain=False) for r in replicas))
+            
+            if agent.node_id:
+                await self._stop_remote_agent(agent)
+            elif agent.host_id:
+                await self._release_host_slot(agent)
+            elif agent.pid:
+                await self._terminate_process(agent_id, agent.pid)
             
             agent.status = AgentStatus.STOPPED
             agent.pid = None
             agent.error_message = None
+            self.processes.pop(agent_id, None)
+            self.health_monitor.forget(agent_id)
+            self.last_heartbeat_at.pop(agent_id, None)
             
             logger.info(f"Agent {agent_id} stopped")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Failed to stop agent {agent_id}: {str(e)}")
             agent.status = AgentStatus.ERROR
             agent.error_message = str(e)
             return False
     
+    async def stop_all(self, agent_ids: Optional[List[str]] = None) -> Dict[str, bool]:
+        """Stop many agents (all of them by default) concurrently"""
+        if agent_ids is None:
+            agent_ids = list(self.agents.keys())
+        
+        results = await asyncio.gather(*(self.stop_agent(agent_id) for agent_id in agent_ids))
+        return dict(zip(agent_ids, results))
+    
+    async def _terminate_process(self, agent_id: str, pid: int, timeout: Optional[float] = None, process=None):
+        """SIGTERM, wait without blocking the event loop, then SIGKILL if it hangs"""
+        timeout = settings.AGENT_STOP_TIMEOUT if timeout is None else timeout
+        process = process or self.processes.get(agent_id)
+        
+        if process is not None:
+            if process.returncode is not None:
+                return
+            try:
+                process.terminate()
+                try:
+                    await asyncio.wait_for(process.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(f"Agent {agent_id} ignored SIGTERM for {timeout}s, killing it")
+                    process.kill()
+                    await process.wait()
+            except ProcessLookupError:
+                pass
+            return
+        
+        # No handle (e.g. the process wasn't started by us): poll with psutil
+        try:
+            process = psutil.Process(pid)
+            process.terminate()
+            deadline = time.monotonic() + timeout
+            while process.is_running() and process.status() != psutil.STATUS_ZOMBIE:
+                if time.monotonic() >= deadline:
+                    logger.warning(f"Agent {agent_id} ignored SIGTERM for {timeout}s, killing it")
+                    process.kill()
+                    break
+                await asyncio.sleep(0.05)
+        except psutil.NoSuchProcess:
+            pass
+    
+    async def hibernate_agent(self, agent_id: str) -> bool:
+        """Stop an idle agent's processes but keep its config, address and connections.
+        
+        Returns False if the agent isn't running or has queries outstanding.
+        The next query to the agent starts it again.
+        """
+        if agent_id not in self.agents:
+            raise ValueError(f"Agent {agent_id} not found")
+        
+        agent = self.agents[agent_id]
+        lock = self._update_locks.setdefault(agent_id, asyncio.Lock())
+        async with lock:
+            if agent.status != AgentStatus.RUNNING or self.queue_depth(agent_id) > 0:
+                return False
+            
+            self._hibernating.add(agent_id)
+            try:
+                rss = self._process_memory(agent)
+                agent.replicas = replica_bounds(agent.config)[0]  # Wakes up small, the autoscaler grows it again
+                stopped = await self._stop_agent(agent_id)
+                if stopped:
+                    agent.status = AgentStatus.HIBERNATED
+                    self.hibernator.hibernated(agent_id, rss)
+                self._persist(agent)
+            finally:
+                self._hibernating.discard(agent_id)
+        
+        await self.notify_agent_update(agent)
+        if stopped:
+            logger.info(f"Agent {agent_id} hibernated ({rss / 2 ** 20:.0f} MB freed)")
+        return stopped
+    
+    def _process_memory(self, agent: AgentInstance) -> int:
+        """RSS of the agent's own processes in bytes (0 for agents in shared hosts or on other nodes)"""
+        if agent.host_id or agent.node_id:
+            return 0
+        pids = [agent.pid] + [r.pid for r in self.replicas.get(agent.id, [])]
+        rss = 0
+        for pid in pids:
+            if pid is None:
+                continue
+            try:
+                rss += psutil.Process(pid).memory_info().rss
+            except psutil.Error:
+                pass
+        return rss
+    
+    async def _wake_agent(self, agent: AgentInstance, deadline: Optional[float] = None):
+        """Hold a query until its hibernated agent is running again"""
+        wake = self._waking.get(agent.id)
+        if wake is None:
+            wake = asyncio.ensure_future(self._wake(agent))
+            wake.add_done_callback(lambda _, agent_id=agent.id: self._waking.pop(agent_id, None))
+            self._waking[agent.id] = wake
+        
+        # Shielded: a caller giving up doesn't abort the start the others are waiting for
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            await asyncio.wait_for(asyncio.shield(wake), timeout)
+        except asyncio.TimeoutError:
+            raise AgentTimeoutError(f"Agent {agent.id} was still waking up when the query's deadline passed")
+    
+    async def _wake(self, agent: AgentInstance):
+        lock = self._update_locks.setdefault(agent.id, asyncio.Lock())
+        async with lock:
+            pass  # Let a hibernation that is still stopping the agent finish
+        if agent.status != AgentStatus.HIBERNATED:
+            return  # Never got hibernated, or started/stopped by hand meanwhile
+        
+        logger.info(f"Waking agent {agent.id} for an incoming query")
+        started = time.perf_counter()
+        ok = await self.start_agent(agent.id)
+        self.hibernator.woke(agent.id, time.perf_counter() - started, ok)
+        await self.notify_agent_update(agent)
+        if not ok:
+            raise AgentUnavailableError(f"Agent {agent.id} failed to wake from hibernation: {agent.error_message}")
+        logger.info(f"Agent {agent.id} woke in {time.perf_counter() - started:.2f}s")
+    
     async def delete_agent(self, agent_id: str) -> bool:
         """Delete an agent instance"""
         if agent_id not in self.agents:
@@ -209,7 +1581,31 @@ class AgentManager:
         await self.stop_agent(agent_id)
         
         # Remove from registry
-        del self.agents[agent_id]
+        agent = self.agents.pop(agent_id)
+        if self.store:
+            self.store.delete_agent(agent_id)
+        if agent.url:
+            self.http.forget(agent.url)
+        self.health_monitor.forget(agent_id)
+        self.resource_sampler.forget(agent_id)
+        self.supervisor.forget(agent_id)
+        self.autoscaler.forget(agent_id)
+        self.hibernator.forget(agent_id)
+        self.limiter.forget(agent_id)
+        self.replicas.pop(agent_id, None)
+        self.replica_stats.pop(agent.url, None)
+        self.request_queues.pop(agent_id, None)
+        self.breakers.pop(agent_id, None)
+        self.latency.pop(agent_id, None)
+        self.retry_budgets.pop(agent_id, None)
+        self._update_locks.pop(agent_id, None)
+        self.last_heartbeat_at.pop(agent_id, None)
+        for pump in self.log_pumps.pop(agent_id, []):
+            pump.cancel()
+        logs = self.logs.pop(agent_id, None)
+        if logs is not None:
+            logs.close()
+        self._remove_socket(agent)
         
         # Clean up env file
         try:
@@ -224,96 +1620,428 @@ class AgentManager:
         logger.info(f"Agent {agent_id} deleted")
         return True
     
+    @staticmethod
+    def _remove_socket(agent):
+        if agent.socket_path and os.path.exists(agent.socket_path):
+            try:
+                os.remove(agent.socket_path)
+            except OSError as e:
+                logger.warning(f"Failed to remove socket {agent.socket_path}: {str(e)}")
+    
     async def get_agent_status(self, agent_id: str) -> Optional[AgentInstance]:
         """Get current status of an agent"""
         if agent_id not in self.agents:
             return None
         
-        agent = self.agents[agent_id]
-        
-        # Update health check if agent is running
-        if agent.status == AgentStatus.RUNNING:
-            await self._update_health_status(agent_id)
-        
-        return agent
+        # Status is kept fresh by the health monitor - just report how fresh
+        return self._with_health_age(self.agents[agent_id])
     
     async def list_agents(self) -> List[AgentInstance]:
         """List all agent instances"""
-        # Update health status for all running agents
-        for agent_id in self.agents:
-            if self.agents[agent_id].status == AgentStatus.RUNNING:
-                await self._update_health_status(agent_id)
+        return [self._with_health_age(agent) for agent in self.agents.values()]
+    
+    @staticmethod
+    def _with_health_age(agent: AgentInstance) -> AgentInstance:
+        """Stamp the cached snapshot with the age of its last successful health check"""
+        if agent.last_health_check:
+            age = datetime.now() - datetime.fromisoformat(agent.last_health_check)
+            agent.health_age_seconds = round(age.total_seconds(), 3)
+        else:
+            agent.health_age_seconds = None
+        return agent
+    
+    def _request_queue(self, agent: AgentInstance) -> Optional[AgentRequestQueue]:
+        """The agent's query queue, sized for its config and live processes (None when unlimited)"""
+        config = agent.config
+        per_process = config.max_concurrency if config.max_concurrency is not None else settings.AGENT_MAX_CONCURRENCY
+        if per_process <= 0:
+            return None
         
-        return list(self.agents.values())
+        queue = self.request_queues.get(agent.id)
+        if queue is None:
+            queue = AgentRequestQueue(0, 0, 0.0)
+            self.request_queues[agent.id] = queue
+        queue.max_queue = config.max_queue if config.max_queue is not None else settings.AGENT_MAX_QUEUE
+        queue.timeout = config.queue_timeout if config.queue_timeout is not None else settings.AGENT_QUEUE_TIMEOUT
+        queue.resize(per_process * max(1, len(self._query_targets(agent))))
+        return queue
+    
+    def _breaker(self, agent: AgentInstance) -> Optional[CircuitBreaker]:
+        if settings.AGENT_BREAKER_WINDOW <= 0:
+            return None
+        breaker = self.breakers.get(agent.id)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                window=settings.AGENT_BREAKER_WINDOW,
+                min_calls=settings.AGENT_BREAKER_MIN_CALLS,
+                failure_rate=settings.AGENT_BREAKER_FAILURE_RATE,
+                slow_call_seconds=settings.AGENT_BREAKER_SLOW_CALL_SECONDS,
+                slow_call_rate=settings.AGENT_BREAKER_SLOW_CALL_RATE,
+                open_seconds=settings.AGENT_BREAKER_OPEN_SECONDS
+            )
+            self.breakers[agent.id] = breaker
+        return breaker
+    
+    def _sync_circuit(self, agent: AgentInstance) -> bool:
+        """Copy the breaker's state onto the agent; returns True if it changed"""
+        breaker = self.breakers.get(agent.id)
+        state = breaker.state if breaker else CIRCUIT_CLOSED
+        if state == agent.circuit_state:
+            return False
+        logger.warning(f"Circuit of agent {agent.id} is now {state}" + (f": {breaker.last_reason}" if state == CIRCUIT_OPEN else ""))
+        agent.circuit_state = state
+        agent.circuit_reason = breaker.last_reason if state != CIRCUIT_CLOSED else None
+        return True
     
     async def send_query_to_agent(self, agent_id: str, query: AgentQueryRequest) -> Dict:
-        """Send a query to a specific agent"""
+        """Send a query to a specific agent, through its circuit breaker and queue"""
         if agent_id not in self.agents:
             raise ValueError(f"Agent {agent_id} not found")
         
         agent = self.agents[agent_id]
+        deadline = time.monotonic() + query.timeout if query.timeout else None
+        self.hibernator.touch(agent_id)
+        if agent.status == AgentStatus.HIBERNATED or agent_id in self._hibernating or agent_id in self._waking:
+            await self._wake_agent(agent, deadline)
+        if not self._query_targets(agent):
+            raise AgentUnavailableError(f"Agent {agent_id} is not running (status: {agent.status.value})")
         
-        if agent.status != AgentStatus.RUNNING:
-            raise ValueError(f"Agent {agent_id} is not running (status: {agent.status})")
+        # An open circuit fails the call before it takes a place in the queue
+        breaker = self._breaker(agent)
+        if breaker is not None:
+            try:
+                breaker.allow()
+            finally:
+                if self._sync_circuit(agent):
+                    await self.notify_agent_update(agent)
         
+        queue = self._request_queue(agent)
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{agent.url}/agent/query",
-                    json={
-                        "query": query.query,
-                        "session_id": f"integration_{agent_id}"
-                    },
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                return response.json()
-                
+            if queue is not None:
+                await queue.acquire(timeout=deadline - time.monotonic() if deadline else None)
+        except BaseException:
+            if breaker is not None:
+                breaker.abandon()
+            raise
+        
+        try:
+            if breaker is None:
+                return await self._send_query(agent, query, deadline)
+            
+            started = time.perf_counter()
+            try:
+                response = await self._send_query(agent, query, deadline)
+            except asyncio.CancelledError:
+                breaker.abandon()
+                raise
+            except Exception as e:
+                # The agent rejecting a bad query isn't the agent failing
+                ok = isinstance(e, httpx.HTTPStatusError) and e.response.status_code < 500
+                breaker.record(time.perf_counter() - started, ok)
+                if self._sync_circuit(agent):
+                    await self.notify_agent_update(agent)
+                raise
+            
+            breaker.record(time.perf_counter() - started, ok=True)
+            if self._sync_circuit(agent):
+                await self.notify_agent_update(agent)
+            return response
+        finally:
+            if queue is not None:
+                queue.release()
+            self.hibernator.touch(agent_id)
+    
+    def _query_timeout(self, agent: AgentInstance, deadline: Optional[float] = None) -> float:
+        """Timeout for one attempt: a multiple of the agent's recent p99 within
+        [AGENT_TIMEOUT_MIN, AGENT_TIMEOUT], cut short by the caller's deadline"""
+        timeout = settings.AGENT_TIMEOUT
+        tracker = self.latency.get(agent.id)
+        p99 = tracker.percentile(99) if tracker else None
+        if p99 is not None:
+            timeout = min(timeout, max(settings.AGENT_TIMEOUT_MIN, p99 * settings.AGENT_TIMEOUT_P99_FACTOR))
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise AgentTimeoutError(f"Agent {agent.id}: the query's deadline passed before it could be sent")
+            timeout = min(timeout, remaining)
+        return timeout
+    
+    async def _send_query(self, agent: AgentInstance, query: AgentQueryRequest, deadline: Optional[float] = None) -> Dict:
+        """Query the agent, retrying calls that never got an answer as far as the retry budget allows"""
+        budget = self.retry_budgets.get(agent.id)
+        if budget is None:
+            budget = RetryBudget(ratio=settings.AGENT_RETRY_BUDGET)
+            self.retry_budgets[agent.id] = budget
+        budget.deposit()
+        
+        attempt = 0
+        while True:
+            try:
+                return await self._hedged_call(agent, query, self._query_timeout(agent, deadline), budget)
+            except (AgentUnavailableError, httpx.TransportError) as e:
+                # The process crashed or the connection failed - a timeout or an error answer is never retried
+                attempt += 1
+                delay = backoff_delay(attempt, settings.AGENT_RETRY_BACKOFF)
+                if (
+                    attempt > settings.AGENT_MAX_RETRIES
+                    or not self._query_targets(agent)
+                    or (deadline is not None and time.monotonic() + delay >= deadline)
+                    or not budget.try_spend("retries")
+                ):
+                    raise
+                logger.warning(f"Retrying query to agent {agent.id} in {delay:.2f}s (retry {attempt}): {str(e)}")
+                await asyncio.sleep(delay)
+    
+    async def _hedged_call(self, agent: AgentInstance, query: AgentQueryRequest, timeout: float, budget: RetryBudget) -> Dict:
+        """One attempt; if the chosen replica is slower than the agent's p95, race a copy on another replica"""
+        targets = self._query_targets(agent)
+        if not targets:
+            # Stopped or crashed while the query was queued
+            raise AgentUnavailableError(f"Agent {agent.id} is not running (status: {agent.status.value})")
+        
+        url, exited = self._pick_target(targets)
+        calls = {asyncio.ensure_future(self._call_target(agent, url, exited, query, timeout)): url}
+        try:
+            tracker = self.latency.get(agent.id)
+            hedge_after = tracker.percentile(95) if tracker and settings.AGENT_HEDGE_REQUESTS else None
+            if hedge_after is not None and len(targets) > 1 and hedge_after < timeout:
+                done, _ = await asyncio.wait(calls, timeout=hedge_after)
+                others = [target for target in self._query_targets(agent) if target[0] != url]
+                if not done and others and budget.try_spend("hedges"):
+                    hedge_url, hedge_exited = self._pick_target(others)
+                    hedge = asyncio.ensure_future(
+                        self._call_target(agent, hedge_url, hedge_exited, query, timeout - hedge_after)
+                    )
+                    calls[hedge] = hedge_url
+            
+            # The first answer wins (the other call is cancelled); fail only once every call has failed
+            pending = set(calls)
+            errors = []
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for call in done:
+                    if call.exception() is None:
+                        if calls[call] != url:
+                            budget.hedge_wins += 1
+                        return call.result()
+                    errors.append(call.exception())
+            raise errors[0]
+        finally:
+            for call in calls:
+                call.cancel()
+    
+    def _pick_target(self, targets: List[Tuple[str, Optional[asyncio.Future]]]) -> Tuple[str, Optional[asyncio.Future]]:
+        """Least outstanding requests wins; among equals, the replica that has served the fewest"""
+        for url, _ in targets:
+            if url not in self.replica_stats:
+                self.replica_stats[url] = ReplicaStats()
+        return min(targets, key=lambda target: (
+            self.replica_stats[target[0]].in_flight,
+            self.replica_stats[target[0]].requests
+        ))
+    
+    async def _call_target(
+        self,
+        agent: AgentInstance,
+        url: str,
+        exited: Optional[asyncio.Future],
+        query: AgentQueryRequest,
+        timeout: float
+    ) -> Dict:
+        """Send the query to one of the agent's processes"""
+        agent_id = agent.id
+        stats = self.replica_stats[url]
+        stats.in_flight += 1
+        
+        started = time.perf_counter()
+        request = asyncio.ensure_future(self.http.post(
+            url,
+            "/agent/query",
+            json={
+                "query": query.query,
+                "session_id": f"integration_{agent_id}"
+            },
+            timeout=timeout
+        ))
+        
+        try:
+            # Give up the moment the agent's process exits instead of waiting out the timeout
+            if exited is not None:
+                await asyncio.wait({request, exited}, return_when=asyncio.FIRST_COMPLETED)
+                if not request.done():
+                    request.cancel()
+                    raise AgentUnavailableError(
+                        f"Agent {agent_id} crashed (exit code {exited.result()}) while processing the query"
+                    )
+            
+            try:
+                response = await request
+            except httpx.TimeoutException as e:
+                raise AgentTimeoutError(f"Agent {agent_id} did not answer within {timeout:.1f}s") from e
+            except httpx.TransportError:
+                # A dropped connection usually means the process is dying - say so if it is
+                if exited is not None:
+                    await asyncio.wait({exited}, timeout=0.5)
+                    if exited.done():
+                        raise AgentUnavailableError(
+                            f"Agent {agent_id} crashed (exit code {exited.result()}) while processing the query"
+                        )
+                raise
+            
+            response.raise_for_status()
+            elapsed = time.perf_counter() - started
+            stats.observe(elapsed, ok=True)
+            tracker = self.latency.get(agent_id)
+            if tracker is None:
+                tracker = LatencyTracker()
+                self.latency[agent_id] = tracker
+            tracker.observe(elapsed)
+            return response.json()
+        
+        except asyncio.CancelledError:
+            request.cancel()
+            raise
         except Exception as e:
+            stats.observe(time.perf_counter() - started, ok=False)
             logger.error(f"Failed to query agent {agent_id}: {str(e)}")
             raise
+        finally:
+            stats.in_flight -= 1
     
-    async def _wait_for_agent_ready(self, agent_id: str, max_attempts: int = 30) -> bool:
-        """Wait for agent to be ready and responding to health checks"""
-        agent = self.agents[agent_id]
+    def _query_targets(self, agent: AgentInstance) -> List[Tuple[str, Optional[asyncio.Future]]]:
+        """(url, exit future) of every process that can take a query for the agent"""
+        targets = []
+        if agent.status == AgentStatus.RUNNING:
+            targets.append((agent.url, self.supervisor.exit_future(agent.id)))
+        if agent.status not in (AgentStatus.STOPPING, AgentStatus.STOPPED):
+            # Replicas keep answering while a crashed primary is being restarted
+            targets += [(r.url, r.exited) for r in self.replicas.get(agent.id, []) if r.status == AgentStatus.RUNNING]
+        return targets
+    
+    async def _wait_for_agent_ready(
+        self,
+        agent_id: str,
+        process: asyncio.subprocess.Process,
+        readiness: asyncio.Future,
+        timeout: Optional[float] = None,
+        target=None
+    ) -> bool:
+        """Wait for the agent (or agent host) to print its readiness line, failing fast if the process exits"""
+        agent = target or self.agents.get(agent_id) or self.hosts[agent_id]
+        timeout = timeout or settings.AGENT_STARTUP_TIMEOUT
+        
+        exited = asyncio.ensure_future(process.wait())
         
-        for attempt in range(max_attempts):
+        try:
+            done, _ = await asyncio.wait({readiness, exited}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            exited.cancel()
+        
+        if readiness in done and readiness.result() is not None:
+            line = readiness.result()
+            if line.startswith(FAILED_MARKER):
+                agent.status = AgentStatus.ERROR
+                agent.error_message = line[len(FAILED_MARKER):].decode(errors="replace").strip() or "Agent failed to initialize"
+                await self._kill_process(process)
+                return False
+            
+            # The agent is listening - one probe confirms it answers HTTP
             try:
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(f"{agent.url}/health", timeout=5.0)
-                    if response.status_code == 200:
-                        agent.last_health_check = datetime.now().isoformat()
-                        logger.info(f"Agent {agent_id} health check passed after {attempt + 1} attempts")
-                        return True
-                    else:
-                        logger.debug(f"Agent {agent_id} health check attempt {attempt + 1}: HTTP {response.status_code}")
-            except httpx.ConnectError:
-                logger.debug(f"Agent {agent_id} health check attempt {attempt + 1}: Connection refused (agent still starting)")
+                response = await self.http.get(agent.url, "/health", timeout=5.0)
+                if response.status_code == 200:
+                    agent.last_health_check = datetime.now().isoformat()
+                    return True
+                agent.error_message = f"Agent announced readiness but health check returned HTTP {response.status_code}"
             except Exception as e:
-                logger.debug(f"Agent {agent_id} health check attempt {attempt + 1}: {str(e)}")
-            
-            await asyncio.sleep(2)
+                agent.error_message = f"Agent announced readiness but health check failed: {str(e)}"
+            agent.status = AgentStatus.ERROR
+            return False
         
         agent.status = AgentStatus.ERROR
-        agent.error_message = f"Agent failed to respond to health checks after {max_attempts} attempts"
-        logger.error(f"Agent {agent_id} health checks failed after {max_attempts} attempts")
+        
+        if readiness in done:
+            # stdout closed without a readiness line - the process is on its way out
+            try:
+                await asyncio.wait_for(process.wait(), timeout=5.0)
+            except asyncio.TimeoutError:
+                pass
+        
+        if process.returncode is not None:
+            # Process died before it became ready - let the pumps catch its last words
+            await asyncio.wait(self.log_pumps.get(agent_id, []), timeout=1.0)
+            stderr_lines = self.logs[agent_id].tail(50, stream="stderr")
+            stderr_text = "\n".join(entry["line"] for entry in stderr_lines) or "No stderr"
+            agent.error_message = f"Agent process died. Return code: {process.returncode}\nStderr: {stderr_text}"
+        else:
+            agent.error_message = f"Agent did not become ready within {timeout:.0f}s"
+            await self._kill_process(process)
+        
         return False
     
-    async def _update_health_status(self, agent_id: str):
-        """Update health status for a running agent"""
+    async def _kill_process(self, process: asyncio.subprocess.Process):
+        """Kill an agent process that will never become ready"""
+        if process.returncode is None:
+            try:
+                process.kill()
+                await process.wait()
+            except ProcessLookupError:
+                pass
+    
+    async def record_heartbeat(self, agent_id: str, heartbeat: AgentHeartbeat) -> bool:
+        """Record a heartbeat pushed by an agent; returns False for unknown agents"""
+        agent = self.agents.get(agent_id)
+        if agent is None:
+            return False
+        
+        # Ignore stragglers from agents that are stopping or stopped
+        if agent.status not in (AgentStatus.RUNNING, AgentStatus.ERROR):
+            return True
+        
+        self.last_heartbeat_at[agent_id] = time.monotonic()
+        agent.last_heartbeat = datetime.now().isoformat()
+        agent.last_health_check = agent.last_heartbeat
+        agent.load = {
+            "in_flight": heartbeat.in_flight,
+            "queue_depth": heartbeat.queue_depth,
+            "requests_total": heartbeat.requests_total,
+            "latency_ms": heartbeat.latency_ms
+        }
+        
+        healthy = heartbeat.status == "healthy" and heartbeat.ready
+        if healthy and agent.status != AgentStatus.RUNNING:
+            agent.status = AgentStatus.RUNNING
+            agent.error_message = None
+            await self.notify_agent_update(agent)
+        elif not healthy and agent.status != AgentStatus.ERROR:
+            agent.status = AgentStatus.ERROR
+            agent.error_message = f"Agent reported itself {heartbeat.status}"
+            await self.notify_agent_update(agent)
+        
+        return True
+    
+    async def check_agent_health(self, agent_id: str, timeout: float = 5.0) -> bool:
+        """Probe an agent's /health endpoint and update its cached status"""
         agent = self.agents[agent_id]
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{agent.url}/health", timeout=5.0)
-                if response.status_code == 200:
-                    agent.last_health_check = datetime.now().isoformat()
-                    if agent.status != AgentStatus.RUNNING:
-                        agent.status = AgentStatus.RUNNING
-                        agent.error_message = None
-                else:
-                    agent.status = AgentStatus.ERROR
-                    agent.error_message = f"Health check failed: {response.status_code}"
+            response = await self.http.get(agent.url, "/health", timeout=timeout)
+            healthy = response.status_code == 200
+            error_message = None if healthy else f"Health check failed: {response.status_code}"
         except Exception as e:
+            healthy = False
+            error_message = f"Health check failed: {str(e)}"
+        
+        # The agent may have been stopped or restarted while the probe was in flight
+        if agent.status not in (AgentStatus.RUNNING, AgentStatus.ERROR):
+            return healthy
+        
+        if healthy:
+            agent.last_health_check = datetime.now().isoformat()
+            if agent.status != AgentStatus.RUNNING:
+                agent.status = AgentStatus.RUNNING
+                agent.error_message = None
+        else:
             agent.status = AgentStatus.ERROR
-            agent.error_message = f"Health check failed: {str(e)}"
\ No newline at end of file
+            agent.error_message = error_message
+        
+        return healthy
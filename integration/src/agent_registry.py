@@ -0,0 +1,225 @@
+import asyncio
+import json
+import logging
+import os
+import signal
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+import psutil
+
+from models import AgentInstance, AgentConnection
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS agents (
+    id TEXT PRIMARY KEY,
+    config TEXT NOT NULL,
+    status TEXT NOT NULL,
+    pid INTEGER,
+    pid_started REAL,
+    url TEXT,
+    socket_path TEXT,
+    host_id TEXT,
+    node_id TEXT,
+    replicas INTEGER NOT NULL DEFAULT 1,
+    restart_count INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS replicas (
+    agent_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    pid INTEGER,
+    pid_started REAL,
+    url TEXT NOT NULL,
+    port INTEGER NOT NULL DEFAULT 0,
+    socket_path TEXT,
+    PRIMARY KEY (agent_id, idx)
+);
+CREATE TABLE IF NOT EXISTS connections (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    id TEXT PRIMARY KEY,
+    url TEXT NOT NULL
+);
+"""
+
+def process_started(pid: Optional[int]) -> Optional[float]:
+    """Creation time of a live process - tells a re-used PID from the process we started"""
+    if not pid:
+        return None
+    try:
+        return psutil.Process(pid).create_time()
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        return None
+
+def is_same_process(pid: Optional[int], started: Optional[float]) -> bool:
+    """Whether pid still belongs to the process that was recorded as started at `started`"""
+    current = process_started(pid)
+    return current is not None and started is not None and abs(current - started) < 0.5
+
+def process_alive(pid: int) -> bool:
+    """Whether a process exists and hasn't exited (a zombie counts as exited)"""
+    try:
+        return psutil.Process(pid).status() != psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return False
+
+async def wait_for_exit(pid: int):
+    """Wait for a process that isn't our child to exit, so its exit code can't be collected.
+    
+    Waits on a pidfd, which becomes readable once the process exits, and polls
+    where there is none (before Python 3.9 / Linux 5.3).
+    """
+    try:
+        pidfd = os.pidfd_open(pid)
+    except ProcessLookupError:
+        return
+    except (AttributeError, OSError):
+        pidfd = None
+    
+    if pidfd is None:
+        while process_alive(pid):
+            await asyncio.sleep(1.0)
+        return
+    
+    loop = asyncio.get_running_loop()
+    exited = loop.create_future()
+    loop.add_reader(pidfd, lambda: exited.done() or exited.set_result(None))
+    try:
+        await exited
+    finally:
+        loop.remove_reader(pidfd)
+        os.close(pidfd)
+
+class AgentRegistryStore:
+    """SQLite (WAL mode) copy of the agent registry, written row by row as it changes.
+    
+    Every change is one small upsert, so writes stay cheap however many agents
+    exist, and the whole topology - agents, replicas, connections and nodes -
+    can be read back in one pass when the integration layer restarts.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path, isolation_level=None)  # Autocommit: each write is its own transaction
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")  # Durable across crashes of this process, fsync only at checkpoints
+        self.db.executescript(SCHEMA)
+    
+    def close(self):
+        self.db.close()
+    
+    def save_agent(self, agent: AgentInstance):
+        self.db.execute(
+            "INSERT OR REPLACE INTO agents "
+            "(id, config, status, pid, pid_started, url, socket_path, host_id, node_id, replicas, restart_count, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                agent.id,
+                agent.config.model_dump_json(),
+                agent.status.value,
+                agent.pid,
+                process_started(agent.pid),
+                agent.url,
+                agent.socket_path,
+                agent.host_id,
+                agent.node_id,
+                agent.replicas,
+                agent.restart_count,
+                time.time()
+            )
+        )
+    
+    def delete_agent(self, agent_id: str):
+        self.db.execute("DELETE FROM agents WHERE id = ?", (agent_id,))
+        self.db.execute("DELETE FROM replicas WHERE agent_id = ?", (agent_id,))
+    
+    def load_agents(self) -> List[sqlite3.Row]:
+        return self.db.execute("SELECT * FROM agents").fetchall()
+    
+    def save_replica(self, replica):
+        self.db.execute(
+            "INSERT OR REPLACE INTO replicas (agent_id, idx, pid, pid_started, url, port, socket_path) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                replica.agent_id,
+                replica.index,
+                replica.pid,
+                process_started(replica.pid),
+                replica.url,
+                replica.port,
+                replica.socket_path
+            )
+        )
+    
+    def delete_replica(self, agent_id: str, index: int):
+        self.db.execute("DELETE FROM replicas WHERE agent_id = ? AND idx = ?", (agent_id, index))
+    
+    def load_replicas(self) -> List[sqlite3.Row]:
+        return self.db.execute("SELECT * FROM replicas ORDER BY agent_id, idx").fetchall()
+    
+    def save_connection(self, connection: AgentConnection):
+        self.db.execute(
+            "INSERT OR REPLACE INTO connections (id, data) VALUES (?, ?)",
+            (connection.id, connection.model_dump_json())
+        )
+    
+    def delete_connection(self, connection_id: str):
+        self.db.execute("DELETE FROM connections WHERE id = ?", (connection_id,))
+    
+    def load_connections(self) -> List[AgentConnection]:
+        rows = self.db.execute("SELECT data FROM connections").fetchall()
+        return [AgentConnection(**json.loads(row["data"])) for row in rows]
+    
+    def save_node(self, node_id: str, url: str):
+        self.db.execute("INSERT OR REPLACE INTO nodes (id, url) VALUES (?, ?)", (node_id, url))
+    
+    def delete_node(self, node_id: str):
+        self.db.execute("DELETE FROM nodes WHERE id = ?", (node_id,))
+    
+    def load_nodes(self) -> Dict[str, str]:
+        return {row["id"]: row["url"] for row in self.db.execute("SELECT id, url FROM nodes")}
+
+class AdoptedAgentProcess:
+    """Handle for an agent process started by a previous run of the integration layer.
+    
+    Mirrors the parts of asyncio.subprocess.Process the manager relies on,
+    like ForkedAgentProcess. The process isn't our child, so its output pipes
+    are gone and its exit code can't be collected: the exit is noticed through
+    a pidfd (or by polling where there is none) and reported as -1.
+    """
+    
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.stdin = None
+        self.stdout = None
+        self.stderr = None
+        self.returncode: Optional[int] = None
+        self._exited = asyncio.ensure_future(self._watch_exit())
+    
+    async def wait(self) -> int:
+        return await asyncio.shield(self._exited)
+    
+    def send_signal(self, sig: int):
+        if self.returncode is not None:
+            raise ProcessLookupError(self.pid)
+        os.kill(self.pid, sig)
+    
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+    
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+    
+    async def _watch_exit(self) -> int:
+        await wait_for_exit(self.pid)
+        self.returncode = -1
+        return self.returncode
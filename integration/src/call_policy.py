@@ -0,0 +1,88 @@
+import random
+import time
+from typing import Dict, Any, Optional
+
+from metrics import Histogram
+
+class LatencyTracker:
+    """Latency percentiles of an agent's recent successful queries.
+    
+    Percentiles are recomputed every `refresh` samples rather than on every
+    read, so asking for a timeout on each query stays cheap.
+    """
+    
+    def __init__(self, window: int = 200, refresh: int = 10, min_samples: int = 20):
+        self.histogram = Histogram(window=window)
+        self.refresh = refresh
+        self.min_samples = min_samples
+        self._percentiles: Dict[int, float] = {}
+        self._since_refresh = 0
+    
+    def observe(self, seconds: float):
+        self.histogram.observe(seconds)
+        self._since_refresh += 1
+        if self._since_refresh >= self.refresh:
+            self._percentiles.clear()
+            self._since_refresh = 0
+    
+    def percentile(self, q: int) -> Optional[float]:
+        """Recent percentile, or None until min_samples queries have succeeded"""
+        if len(self.histogram.recent) < self.min_samples:
+            return None
+        if q not in self._percentiles:
+            self._percentiles[q] = self.histogram.percentile(q)
+        return self._percentiles[q]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "samples": len(self.histogram.recent),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99)
+        }
+
+class RetryBudget:
+    """Token bucket limiting retries and hedged requests to a share of real queries.
+    
+    Every query deposits `ratio` tokens and every retry or hedge spends one,
+    so extra attempts stay around ratio x the query rate however badly an
+    agent misbehaves; min_per_second tokens trickle in so a quiet agent can
+    still retry now and then.
+    """
+    
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 0.5, capacity: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.spent: Dict[str, int] = {"retries": 0, "hedges": 0}
+        self.denied = 0
+        self.hedge_wins = 0  # Hedges that answered before the original call
+        self._updated = time.monotonic()
+    
+    def deposit(self):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+    
+    def try_spend(self, kind: str) -> bool:
+        """Take a token for a retry or hedge ("retries" / "hedges"); False if the budget is exhausted"""
+        self._refill()
+        if self.tokens < 1.0:
+            self.denied += 1
+            return False
+        self.tokens -= 1.0
+        self.spent[kind] = self.spent.get(kind, 0) + 1
+        return True
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+    
+    def to_dict(self) -> Dict[str, Any]:
+        self._refill()
+        return {"tokens": round(self.tokens, 2), **self.spent, "hedge_wins": self.hedge_wins, "denied": self.denied}
+
+def backoff_delay(attempt: int, base: float, cap: float = 5.0) -> float:
+    """Full-jitter exponential backoff before retry number `attempt` (1-based)"""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
@@ -0,0 +1,122 @@
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+# Breaker states
+CIRCUIT_CLOSED = "closed"  # Calls go through, outcomes are counted
+CIRCUIT_OPEN = "open"  # Calls fail immediately until the cool-down ends
+CIRCUIT_HALF_OPEN = "half-open"  # One trial call decides between closed and open
+
+class CircuitOpenError(Exception):
+    """The agent's circuit is open - the call was not attempted"""
+    
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """Circuit breaker over the outcomes of the last `window` calls to one agent.
+    
+    The circuit opens once at least min_calls are recorded and either the
+    share of failed calls reaches failure_rate or the share of calls slower
+    than slow_call_seconds reaches slow_call_rate. After open_seconds a
+    single trial call is let through (half-open): success closes the
+    circuit, failure opens it again.
+    """
+    
+    def __init__(
+        self,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 20.0,
+        slow_call_rate: float = 0.8,
+        open_seconds: float = 30.0
+    ):
+        self.window = max(1, window)
+        self.min_calls = max(1, min_calls)
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.state = CIRCUIT_CLOSED
+        self.opened_at: Optional[float] = None
+        self.last_reason: Optional[str] = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._calls: deque = deque(maxlen=self.window)  # (failed, slow) per call
+        self._trial_in_flight = False
+    
+    def allow(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        if self.state == CIRCUIT_CLOSED:
+            return
+        
+        if self.state == CIRCUIT_OPEN:
+            remaining = self.opened_at + self.open_seconds - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuit open ({self.last_reason}), retry in {remaining:.0f}s", remaining)
+            self.state = CIRCUIT_HALF_OPEN
+        
+        if self._trial_in_flight:
+            self.rejected += 1
+            raise CircuitOpenError(f"Circuit half-open, waiting for the trial call ({self.last_reason})", 1.0)
+        self._trial_in_flight = True
+    
+    def record(self, seconds: float, ok: bool):
+        """Count the outcome of a call that allow() let through"""
+        slow = seconds >= self.slow_call_seconds
+        
+        if self.state == CIRCUIT_HALF_OPEN:
+            self._trial_in_flight = False
+            if ok and not slow:
+                self.reset()
+            else:
+                self._open("trial call failed" if not ok else f"trial call took {seconds:.1f}s")
+            return
+        if self.state == CIRCUIT_OPEN:
+            return  # Started before the circuit opened
+        
+        self._calls.append((not ok, slow))
+        if len(self._calls) < self.min_calls:
+            return
+        failures = sum(1 for failed, _ in self._calls if failed) / len(self._calls)
+        slow_calls = sum(1 for _, was_slow in self._calls if was_slow) / len(self._calls)
+        if failures >= self.failure_rate:
+            self._open(f"{failures:.0%} of the last {len(self._calls)} calls failed")
+        elif slow_calls >= self.slow_call_rate:
+            self._open(f"{slow_calls:.0%} of the last {len(self._calls)} calls took over {self.slow_call_seconds:g}s")
+    
+    def abandon(self):
+        """A call that allow() let through was never made (or was cancelled)"""
+        if self.state == CIRCUIT_HALF_OPEN:
+            self._trial_in_flight = False
+    
+    def reset(self):
+        self.state = CIRCUIT_CLOSED
+        self.opened_at = None
+        self._calls.clear()
+        self._trial_in_flight = False
+    
+    def _open(self, reason: str):
+        self.state = CIRCUIT_OPEN
+        self.opened_at = time.monotonic()
+        self.last_reason = reason
+        self.times_opened += 1
+        self._calls.clear()
+        self._trial_in_flight = False
+    
+    def to_dict(self) -> Dict[str, Any]:
+        retry_after = None
+        if self.state == CIRCUIT_OPEN:
+            retry_after = max(0.0, self.opened_at + self.open_seconds - time.monotonic())
+        return {
+            "state": self.state,
+            "reason": self.last_reason,
+            "retry_after": retry_after,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "recent_calls": len(self._calls),
+            "recent_failures": sum(1 for failed, _ in self._calls if failed)
+        }
@@ -0,0 +1,197 @@
+import logging
+import os
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+AFFINITY_NONE = "none"  # Let the scheduler move agent processes anywhere
+AFFINITY_ROUND_ROBIN = "round-robin"  # Pin each process to the least used cores of a socket
+
+def parse_cpu_list(text: str) -> List[int]:
+    """Kernel CPU list ("0-3,8,10-11") as a list of CPU numbers"""
+    cpus = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+def cpu_sockets() -> Dict[int, List[int]]:
+    """CPUs this process may use, grouped by NUMA node (by physical package where NUMA isn't exposed)"""
+    available = set(os.sched_getaffinity(0))
+    sockets: Dict[int, List[int]] = {}
+    node_dir = "/sys/devices/system/node"
+    try:
+        for name in os.listdir(node_dir):
+            if name.startswith("node") and name[4:].isdigit():
+                with open(os.path.join(node_dir, name, "cpulist")) as f:
+                    cpus = [cpu for cpu in parse_cpu_list(f.read()) if cpu in available]
+                if cpus:
+                    sockets[int(name[4:])] = sorted(cpus)
+    except OSError:
+        pass
+    if sum(len(cpus) for cpus in sockets.values()) == len(available):
+        return sockets
+    
+    sockets = {}
+    for cpu in sorted(available):
+        try:
+            with open(f"/sys/devices/system/cpu/cpu{cpu}/topology/physical_package_id") as f:
+                package = int(f.read())
+        except (OSError, ValueError):
+            package = 0
+        sockets.setdefault(package, []).append(cpu)
+    return sockets
+
+def pin_process(pid: int, cpus: List[int]):
+    """Restrict every thread of a process (and the threads it starts later) to `cpus`"""
+    try:
+        threads = [int(tid) for tid in os.listdir(f"/proc/{pid}/task")]
+    except OSError:
+        threads = [pid]
+    for tid in threads:
+        try:
+            os.sched_setaffinity(tid, cpus)
+        except ProcessLookupError:
+            pass  # Thread exited meanwhile
+
+class CpuPlacer:
+    """Pins agent processes to CPU sets.
+    
+    An agent's explicit cpu_affinity always wins. Otherwise, with the
+    round-robin policy, each process gets the cpus_per_agent least used cores
+    of a socket (NUMA node), which spreads processes over the cores in turn.
+    The socket is the least loaded one or, with group_connected, the one
+    already running the agent's other processes or the agents it is connected
+    to, unless that socket is over a process per core busier than the least
+    loaded one. Pinned pids that no longer exist are dropped lazily.
+    """
+    
+    def __init__(self, policy: str = AFFINITY_NONE, cpus_per_agent: int = 1, group_connected: bool = True):
+        self.policy = policy
+        self.cpus_per_agent = max(1, cpus_per_agent)
+        self.group_connected = group_connected
+        self.supported = hasattr(os, "sched_setaffinity")
+        self.sockets = cpu_sockets() if self.supported else {}
+        self.socket_of = {cpu: socket for socket, cpus in self.sockets.items() for cpu in cpus}
+        self.pinned: Dict[int, Tuple[str, List[int], bool]] = {}  # pid -> (agent id, cpus, explicitly configured)
+        if policy != AFFINITY_NONE and not self.supported:
+            logger.warning("CPU affinity is not supported on this platform, agent processes won't be pinned")
+    
+    def place(
+        self,
+        agent_id: str,
+        pid: int,
+        explicit: Optional[List[int]] = None,
+        peers: Optional[List[str]] = None
+    ) -> Optional[List[int]]:
+        """Pin a new agent process; returns its CPUs (None if it isn't pinned)"""
+        if not self.supported:
+            return None
+        self._prune()
+        
+        if explicit:
+            cpus = sorted(cpu for cpu in set(explicit) if cpu in self.socket_of)
+            if not cpus:
+                logger.warning(f"None of the CPUs {explicit} of agent {agent_id} are available, leaving it unpinned")
+                return None
+        elif self.policy == AFFINITY_ROUND_ROBIN:
+            cpus = self._pick_cpus(self._pick_socket(agent_id, peers or []))
+        else:
+            return None
+        
+        pin_process(pid, cpus)
+        self.pinned[pid] = (agent_id, cpus, bool(explicit))
+        return cpus
+    
+    def adopt(self, agent_id: str, pid: int) -> Optional[List[int]]:
+        """Take over the pinning of a process started by a previous run"""
+        if not self.supported:
+            return None
+        try:
+            cpus = sorted(os.sched_getaffinity(pid))
+        except OSError:
+            return None
+        if set(cpus) >= set(self.socket_of):
+            return None  # Not pinned
+        self.pinned[pid] = (agent_id, cpus, False)
+        return cpus
+    
+    def colocate(self, agent_id: str, peer_id: str) -> Dict[int, List[int]]:
+        """Move an agent's round-robin pinned processes to the socket of a peer it was just connected to"""
+        if not (self.supported and self.group_connected and self.policy == AFFINITY_ROUND_ROBIN):
+            return {}
+        self._prune()
+        target = self._majority_socket([peer_id])
+        if target is None:
+            return {}
+        moved = {}
+        for pid, (owner, cpus, explicit) in list(self.pinned.items()):
+            current = self.socket_of.get(cpus[0])
+            if owner != agent_id or explicit or current == target:
+                continue
+            load = self._socket_load()
+            if current is not None and load[target] > load[current] + 1:
+                continue  # Not worth crowding the peer's socket
+            del self.pinned[pid]
+            new_cpus = self._pick_cpus(target)
+            try:
+                pin_process(pid, new_cpus)
+            except OSError:
+                continue
+            self.pinned[pid] = (agent_id, new_cpus, False)
+            moved[pid] = new_cpus
+        return moved
+    
+    def _pick_socket(self, agent_id: str, peers: List[str]) -> int:
+        load = self._socket_load()
+        least = min(self.sockets, key=lambda socket: (load[socket], socket))
+        if self.group_connected:
+            preferred = self._majority_socket([agent_id] + peers)
+            if preferred is not None and load[preferred] <= load[least] + 1:
+                return preferred
+        return least
+    
+    def _pick_cpus(self, socket: int) -> List[int]:
+        load = self._cpu_load()
+        return sorted(sorted(self.sockets[socket], key=lambda cpu: (load[cpu], cpu))[:self.cpus_per_agent])
+    
+    def _majority_socket(self, agent_ids: List[str]) -> Optional[int]:
+        wanted = set(agent_ids)
+        votes = Counter(
+            self.socket_of[cpus[0]] for owner, cpus, _ in self.pinned.values() if owner in wanted and cpus[0] in self.socket_of
+        )
+        return votes.most_common(1)[0][0] if votes else None
+    
+    def _cpu_load(self) -> Counter:
+        load = Counter({cpu: 0 for cpu in self.socket_of})
+        for _, cpus, _ in self.pinned.values():
+            for cpu in cpus:
+                load[cpu] += 1 / len(cpus)
+        return load
+    
+    def _socket_load(self) -> Dict[int, float]:
+        """Pinned processes per core of each socket"""
+        load = self._cpu_load()
+        return {socket: sum(load[cpu] for cpu in cpus) / len(cpus) for socket, cpus in self.sockets.items()}
+    
+    def _prune(self):
+        for pid in list(self.pinned):
+            if not os.path.exists(f"/proc/{pid}"):
+                del self.pinned[pid]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        self._prune()
+        load = self._cpu_load()
+        return {
+            "policy": self.policy,
+            "cpus_per_agent": self.cpus_per_agent,
+            "group_connected": self.group_connected,
+            "sockets": {
+                socket: {"cpus": cpus, "processes_per_cpu": {cpu: round(load[cpu], 2) for cpu in cpus}}
+                for socket, cpus in self.sockets.items()
+            },
+            "pinned_processes": len(self.pinned)
+        }
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import tempfile
+from typing import Dict, Optional
+
+from agent_registry import process_alive, wait_for_exit
+
+logger = logging.getLogger(__name__)
+
+# Line the zygote prints once its imports are done and it accepts requests
+ZYGOTE_READY_MARKER = b"ZYGOTE_READY"
+
+class ForkedAgentProcess:
+    """Handle for an agent forked by the zygote.
+
+    Mirrors the parts of asyncio.subprocess.Process the manager relies on
+    (pid, stdout, stderr, returncode, wait, terminate, kill) so forked and
+    spawned agents are handled the same way.
+
+    Children run in their own session and outlive the zygote. If the zygote
+    goes away first, the child is watched directly (through a pidfd, or by
+    polling) until it really exits; its exit code is lost then (-1).
+    """
+
+    def __init__(self, pid: int, stdout: asyncio.StreamReader, stderr: asyncio.StreamReader, connection: socket.socket, pending: bytes = b""):
+        self.pid = pid
+        self.stdin = None
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode: Optional[int] = None
+        self._connection = connection
+        self._pending = pending
+        self._exited = asyncio.ensure_future(self._watch_exit())
+
+    async def wait(self) -> int:
+        """Wait for the child to exit"""
+        return await asyncio.shield(self._exited)
+
+    def send_signal(self, sig: int):
+        if self.returncode is not None:
+            raise ProcessLookupError(self.pid)
+        os.kill(self.pid, sig)
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+    async def _watch_exit(self) -> int:
+        loop = asyncio.get_running_loop()
+        buffer = self._pending
+        report = None
+        try:
+            while b"\n" not in buffer:
+                chunk = await loop.sock_recv(self._connection, 4096)
+                if not chunk:
+                    break
+                buffer += chunk
+            if b"\n" in buffer:
+                report = json.loads(buffer.partition(b"\n")[0].decode() or "{}")
+        except Exception:
+            pass
+        finally:
+            self._connection.close()
+
+        if report is not None:
+            self.returncode = report.get("returncode", -1)
+        else:
+            # Lost the zygote before it reported an exit - that says nothing about the child
+            self.returncode = await self._watch_orphan()
+        return self.returncode
+
+    async def _watch_orphan(self) -> int:
+        """Wait for a child whose zygote is gone to exit (its exit code can't be known)"""
+        if process_alive(self.pid):
+            logger.warning(f"Lost the agent zygote, watching its child {self.pid} directly")
+            await wait_for_exit(self.pid)
+        return -1
+
+class ZygoteSpawner:
+    """Starts agents by asking a fork-server (single/zygote.py) for a child.
+
+    The zygote imports LangChain and the agent classes once and calls
+    gc.freeze(), so children share those pages copy-on-write instead of
+    each loading a full interpreter and LangChain stack.
+    """
+
+    def __init__(self, agent_dir: str, env: Dict[str, str], startup_timeout: float = 60.0):
+        self.agent_dir = agent_dir
+        self.env = env
+        self.startup_timeout = startup_timeout
+        self.socket_path = os.path.join(tempfile.gettempdir(), f"agent-zygote-{os.getpid()}.sock")
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        """Launch the zygote and wait until it accepts spawn requests"""
+        async with self._lock:
+            if self.process is not None and self.process.returncode is None:
+                return
+
+            env = os.environ.copy()
+            env.update(self.env)
+            self.process = await asyncio.create_subprocess_exec(
+                "python", "zygote.py", self.socket_path,
+                env=env,
+                cwd=self.agent_dir,
+                stdout=asyncio.subprocess.PIPE
+            )
+
+            while True:
+                line = await asyncio.wait_for(self.process.stdout.readline(), timeout=self.startup_timeout)
+                if not line:
+                    raise RuntimeError(f"Agent zygote exited with return code {await self.process.wait()}")
+                if line.strip().startswith(ZYGOTE_READY_MARKER):
+                    break
+
+            logger.info(f"Agent zygote started (pid {self.process.pid}, socket {self.socket_path})")
+
+    async def close(self):
+        """Stop the zygote (agents it forked keep running until stopped)"""
+        if self.process is not None and self.process.returncode is None:
+            self.process.terminate()
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=5.0)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        self.process = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def spawn(self, agent_env: Dict[str, str]) -> ForkedAgentProcess:
+        """Fork a new agent from the zygote with the given environment overrides"""
+        if self.process is None or self.process.returncode is not None:
+            await self.start()
+
+        loop = asyncio.get_running_loop()
+        stdout_read, stdout_write = os.pipe()
+        stderr_read, stderr_write = os.pipe()
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.setblocking(False)
+
+        try:
+            await loop.sock_connect(connection, self.socket_path)
+            payload = json.dumps({"env": agent_env}).encode() + b"\n"
+            socket.send_fds(connection, [payload], [stdout_write, stderr_write])
+        except Exception:
+            for fd in (stdout_read, stderr_read):
+                os.close(fd)
+            connection.close()
+            raise
+        finally:
+            # The zygote has its own copies now
+            os.close(stdout_write)
+            os.close(stderr_write)
+
+        buffer = b""
+        while b"\n" not in buffer:
+            chunk = await loop.sock_recv(connection, 4096)
+            if not chunk:
+                break
+            buffer += chunk
+        line, _, pending = buffer.partition(b"\n")
+
+        reply = json.loads(line.decode() or "{}")
+        if "pid" not in reply:
+            for fd in (stdout_read, stderr_read):
+                os.close(fd)
+            connection.close()
+            raise RuntimeError(f"Agent zygote refused spawn request: {reply.get('error', 'no reply')}")
+
+        stdout = await self._reader_for(stdout_read)
+        stderr = await self._reader_for(stderr_read)
+        return ForkedAgentProcess(reply["pid"], stdout, stderr, connection, pending)
+
+    @staticmethod
+    async def _reader_for(fd: int) -> asyncio.StreamReader:
+        """Wrap the read end of a pipe in an asyncio StreamReader"""
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=2 ** 20)
+        protocol = asyncio.StreamReaderProtocol(reader)
+        await loop.connect_read_pipe(lambda: protocol, os.fdopen(fd, "rb", 0))
+        return reader
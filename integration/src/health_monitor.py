@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, Optional, Set
+from dataclasses import dataclass
+
+from models import AgentStatus
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ProbeState:
+    """Scheduling state for one agent's health probes"""
+    next_probe_at: float
+    consecutive_failures: int = 0
+
+class HealthMonitor:
+    """Probes running agents in the background and keeps their status fresh.
+    
+    API reads return the status cached on each AgentInstance instead of
+    probing inline. Probes run concurrently (bounded), each agent on its own
+    jittered schedule, and failing agents are probed with exponential backoff
+    so a dead agent doesn't eat probe slots. Status changes are pushed through
+    AgentManager.notify_agent_update.
+    
+    When agents push heartbeats instead, no probes are sent: each tick only
+    compares every agent's last heartbeat time against the allowed gap.
+    Agents on nodes heartbeat at their node's interval, if at all.
+    """
+    
+    def __init__(
+        self,
+        agent_manager,
+        interval: float = 10.0,
+        timeout: float = 5.0,
+        max_backoff: float = 60.0,
+        concurrency: int = 50,
+        jitter: float = 0.1,
+        heartbeat_interval: float = 0,
+        heartbeat_missed_limit: int = 3
+    ):
+        self.agent_manager = agent_manager
+        self.interval = interval
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_missed_limit = heartbeat_missed_limit
+        self._slots = asyncio.Semaphore(concurrency)
+        self._states: Dict[str, ProbeState] = {}
+        self._in_flight: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+            logger.info(f"Health monitor started (interval={self.interval}s)")
+    
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def forget(self, agent_id: str):
+        """Stop tracking an agent (stopped or deleted)"""
+        self._states.pop(agent_id, None)
+    
+    def _next_delay(self, failures: int) -> float:
+        """Interval with exponential backoff on failures, plus jitter"""
+        delay = min(self.interval * (2 ** failures), self.max_backoff) if failures else self.interval
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+    
+    async def _run(self):
+        tick = min(1.0, self.interval / 2)
+        while True:
+            try:
+                if self.heartbeat_interval > 0:
+                    await self._check_heartbeats()
+                else:
+                    self._schedule_probes()
+            except Exception as e:
+                logger.error(f"Health monitor tick failed: {str(e)}")
+            
+            await asyncio.sleep(tick)
+    
+    async def _check_heartbeats(self):
+        """Mark running agents unhealthy once they miss too many heartbeats"""
+        now = time.monotonic()
+        
+        for agent_id, agent in list(self.agent_manager.agents.items()):
+            if agent.status != AgentStatus.RUNNING:
+                continue
+            last_seen = self.agent_manager.last_heartbeat_at.get(agent_id)
+            interval = self._heartbeat_interval(agent)
+            if last_seen is None or interval <= 0 or now - last_seen <= interval * self.heartbeat_missed_limit:
+                continue
+            
+            agent.status = AgentStatus.ERROR
+            agent.error_message = f"Missed {self.heartbeat_missed_limit} heartbeats ({now - last_seen:.1f}s since the last one)"
+            logger.warning(f"Agent {agent_id}: {agent.error_message}")
+            await self.agent_manager.notify_agent_update(agent)
+    
+    def _heartbeat_interval(self, agent) -> float:
+        """How often an agent pushes heartbeats (0 = never)"""
+        if agent.node_id:
+            node = self.agent_manager.nodes.nodes.get(agent.node_id)
+            return node.heartbeat_interval if node is not None else 0
+        return self.heartbeat_interval
+    
+    def _schedule_probes(self):
+        """Start a probe for every agent whose next probe is due"""
+        now = time.monotonic()
+        for agent_id, agent in list(self.agent_manager.agents.items()):
+            if agent.status not in (AgentStatus.RUNNING, AgentStatus.ERROR) or agent.pid is None:
+                self._states.pop(agent_id, None)
+                continue
+            
+            state = self._states.get(agent_id)
+            if state is None:
+                # Spread first probes over one interval instead of all at once
+                state = ProbeState(next_probe_at=now + random.uniform(0, self.interval))
+                self._states[agent_id] = state
+            
+            if now >= state.next_probe_at and agent_id not in self._in_flight:
+                self._in_flight.add(agent_id)
+                asyncio.ensure_future(self._probe(agent_id, state))
+    
+    async def _probe(self, agent_id: str, state: ProbeState):
+        try:
+            async with self._slots:
+                agent = self.agent_manager.agents.get(agent_id)
+                if agent is None:
+                    return
+                
+                previous = (agent.status, agent.error_message)
+                healthy = await self.agent_manager.check_agent_health(agent_id, timeout=self.timeout)
+                
+                state.consecutive_failures = 0 if healthy else state.consecutive_failures + 1
+                state.next_probe_at = time.monotonic() + self._next_delay(state.consecutive_failures)
+                
+                if (agent.status, agent.error_message) != previous and agent_id in self.agent_manager.agents:
+                    logger.info(f"Agent {agent_id} health changed: {previous[0]} -> {agent.status}")
+                    await self.agent_manager.notify_agent_update(agent)
+        except Exception as e:
+            logger.error(f"Health probe for agent {agent_id} failed: {str(e)}")
+        finally:
+            self._in_flight.discard(agent_id)
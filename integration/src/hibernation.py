@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional
+
+from models import AgentStatus, AgentConfig
+from metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+class AgentHibernator:
+    """Hibernates agents that sat idle longer than their TTL, and counts the wake-ups.
+    
+    A hibernated agent keeps its config, address and connections - only its
+    process goes away - and the next query starts it again (see
+    AgentManager.send_query_to_agent). Each tick hibernates running agents
+    that received no query for idle_ttl seconds (per agent, or default_ttl)
+    and have nothing in flight or queued.
+    """
+    
+    def __init__(self, agent_manager, interval: float = 30.0, default_ttl: float = 0.0):
+        self.agent_manager = agent_manager
+        self.interval = interval
+        self.default_ttl = default_ttl
+        self.last_active: Dict[str, float] = {}  # Monotonic time of each agent's last query
+        self.memory_saved: Dict[str, int] = {}  # RSS freed when each agent was hibernated (bytes)
+        self.hibernations = 0
+        self.wakes = 0
+        self.wake_failures = 0
+        self.wake_latency = Histogram()
+        self._hibernating: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+    
+    def ttl(self, config: AgentConfig) -> float:
+        """Idle seconds before an agent is hibernated (0 = never)"""
+        return self.default_ttl if config.idle_ttl is None else config.idle_ttl
+    
+    def touch(self, agent_id: str):
+        self.last_active[agent_id] = time.monotonic()
+    
+    def hibernated(self, agent_id: str, rss_bytes: int):
+        self.hibernations += 1
+        self.memory_saved[agent_id] = rss_bytes
+    
+    def woke(self, agent_id: str, seconds: float, ok: bool):
+        if ok:
+            self.wakes += 1
+            self.wake_latency.observe(seconds)
+            self.touch(agent_id)  # A full TTL before it may hibernate again
+        else:
+            self.wake_failures += 1
+    
+    def forget(self, agent_id: str):
+        self.last_active.pop(agent_id, None)
+        self.memory_saved.pop(agent_id, None)
+    
+    async def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.ensure_future(self._run())
+            logger.info(f"Agent hibernator started (interval={self.interval}s, default idle TTL={self.default_ttl}s)")
+    
+    async def close(self):
+        tasks = list(self._hibernating.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        self._hibernating.clear()
+    
+    async def _run(self):
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Agent hibernation failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+    
+    def tick(self):
+        """Start hibernating every agent that has been idle for longer than its TTL"""
+        manager = self.agent_manager
+        now = time.monotonic()
+        for agent_id, agent in manager.agents.items():
+            ttl = self.ttl(agent.config)
+            if agent.status != AgentStatus.RUNNING or ttl <= 0 or agent_id in self._hibernating:
+                continue
+            
+            # Agents nobody has queried yet count as active since we first saw them
+            idle = now - self.last_active.setdefault(agent_id, now)
+            if idle < ttl or manager.queue_depth(agent_id) > 0:
+                continue
+            
+            logger.info(f"Agent {agent_id} idle for {idle:.0f}s (TTL {ttl:g}s), hibernating it")
+            task = asyncio.ensure_future(manager.hibernate_agent(agent_id))
+            task.add_done_callback(lambda _, agent_id=agent_id: self._hibernating.pop(agent_id, None))
+            self._hibernating[agent_id] = task
+    
+    def to_dict(self) -> Dict[str, Any]:
+        hibernated = [
+            agent_id for agent_id, agent in self.agent_manager.agents.items()
+            if agent.status == AgentStatus.HIBERNATED
+        ]
+        return {
+            "default_ttl": self.default_ttl,
+            "hibernated": len(hibernated),
+            "hibernations": self.hibernations,
+            "wakes": self.wakes,
+            "wake_failures": self.wake_failures,
+            "wake_latency_p50": self.wake_latency.percentile(50),
+            "wake_latency_p95": self.wake_latency.percentile(95),
+            "wake_latency_p99": self.wake_latency.percentile(99),
+            "memory_saved_mb": round(sum(self.memory_saved.get(agent_id, 0) for agent_id in hibernated) / 2 ** 20, 1)
+        }
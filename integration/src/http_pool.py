@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import ssl
+import time
+from typing import Dict, Any, Optional
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class AgentPoolStats:
+    """Usage counters for the connection slots of one agent URL"""
+    in_use: int = 0
+    waiting: int = 0
+    total_requests: int = 0
+    total_wait_time: float = 0.0
+    max_wait_time: float = 0.0
+
+class AgentHttpPool:
+    """Long-lived HTTP client shared by all traffic from the manager to its agents.
+
+    A single httpx.AsyncClient keeps connections alive between queries and
+    health probes. On top of the client-wide limits every agent URL gets its
+    own bounded number of concurrent connections, so one busy agent cannot
+    take all the sockets in the pool.
+    
+    Agents served on a Unix domain socket get a client of their own (httpx
+    binds a transport to one socket path), registered with register_socket.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 500,
+        max_keepalive_connections: int = 200,
+        keepalive_expiry: float = 30.0,
+        max_connections_per_agent: int = 10
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.max_connections_per_agent = max_connections_per_agent
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, AgentPoolStats] = {}
+        self._socket_clients: Dict[str, httpx.AsyncClient] = {}
+        self._socket_paths: Dict[str, str] = {}
+        self._socket_ssl_context: Optional[ssl.SSLContext] = None
+
+    async def start(self):
+        """Create the underlying client"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=self.limits)
+            logger.info(
+                f"Agent HTTP pool started (max_connections={self.limits.max_connections}, "
+                f"per_agent={self.max_connections_per_agent})"
+            )
+
+    async def close(self):
+        """Close the underlying client and all pooled connections"""
+        socket_clients, self._socket_clients = self._socket_clients, {}
+        for client in socket_clients.values():
+            await client.aclose()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("Agent HTTP pool closed")
+
+    async def request(self, method: str, base_url: str, path: str, **kwargs) -> httpx.Response:
+        """Send a request to an agent, waiting for a free connection slot first.
+
+        The wait for a slot is bounded by the request's pool timeout, like
+        httpx's own wait for a connection, and raises httpx.PoolTimeout.
+        """
+        if self._client is None:
+            await self.start()
+
+        slots = self._slots.get(base_url)
+        if slots is None:
+            slots = asyncio.Semaphore(self.max_connections_per_agent)
+            self._slots[base_url] = slots
+            self._stats[base_url] = AgentPoolStats()
+        stats = self._stats[base_url]
+
+        stats.waiting += 1
+        wait_started = time.perf_counter()
+        try:
+            await asyncio.wait_for(slots.acquire(), self._pool_timeout(kwargs.get("timeout", httpx.USE_CLIENT_DEFAULT)))
+        except asyncio.TimeoutError:
+            raise httpx.PoolTimeout(f"No free connection slot for {base_url} ({self.max_connections_per_agent} in use)")
+        finally:
+            stats.waiting -= 1
+
+        wait_time = time.perf_counter() - wait_started
+        stats.total_requests += 1
+        stats.total_wait_time += wait_time
+        stats.max_wait_time = max(stats.max_wait_time, wait_time)
+        stats.in_use += 1
+
+        try:
+            client = self._socket_clients.get(base_url) or self._client
+            return await client.request(method, f"{base_url}{path}", **kwargs)
+        finally:
+            stats.in_use -= 1
+            slots.release()
+
+    async def get(self, base_url: str, path: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", base_url, path, **kwargs)
+
+    async def post(self, base_url: str, path: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", base_url, path, **kwargs)
+
+    def _pool_timeout(self, timeout) -> Optional[float]:
+        """Seconds a request may wait for a slot, taken from its timeout the way httpx reads it"""
+        if timeout is httpx.USE_CLIENT_DEFAULT:
+            timeout = self._client.timeout
+        if not isinstance(timeout, httpx.Timeout):
+            timeout = httpx.Timeout(timeout)
+        return timeout.pool
+
+    def in_flight(self, base_url: str) -> int:
+        """Requests to an agent URL that are waiting or being processed"""
+        stats = self._stats.get(base_url)
+        return stats.in_use + stats.waiting if stats else 0
+    
+    def register_socket(self, base_url: str, socket_path: str):
+        """Route requests for base_url over a Unix domain socket"""
+        if self._socket_paths.get(base_url) == socket_path:
+            return
+        self._close_socket_client(base_url)
+        if self._socket_ssl_context is None:
+            # Never used over a socket, but building one per agent costs tens of milliseconds
+            self._socket_ssl_context = httpx.create_ssl_context()
+        transport = httpx.AsyncHTTPTransport(uds=socket_path, verify=self._socket_ssl_context, limits=httpx.Limits(
+            max_connections=self.max_connections_per_agent,
+            max_keepalive_connections=self.max_connections_per_agent,
+            keepalive_expiry=self.limits.keepalive_expiry
+        ))
+        self._socket_clients[base_url] = httpx.AsyncClient(transport=transport)
+        self._socket_paths[base_url] = socket_path
+    
+    def forget(self, base_url: str):
+        """Drop the slots and counters of an agent URL that is no longer used"""
+        self._slots.pop(base_url, None)
+        self._stats.pop(base_url, None)
+        self._close_socket_client(base_url)
+    
+    def _close_socket_client(self, base_url: str):
+        self._socket_paths.pop(base_url, None)
+        client = self._socket_clients.pop(base_url, None)
+        if client is not None:
+            asyncio.ensure_future(client.aclose())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool statistics, overall and per agent URL"""
+        connections = self._pool_connections()
+        socket_connections = [c for client in self._socket_clients.values() for c in self._pool_connections(client)]
+        agents = {}
+
+        for base_url, stats in self._stats.items():
+            origin = self._origin(base_url)
+            idle = 0
+            open_connections = 0
+            socket_client = self._socket_clients.get(base_url)
+            for connection in (self._pool_connections(socket_client) if socket_client else connections):
+                try:
+                    if origin is not None and connection.can_handle_request(origin):
+                        open_connections += 1
+                        if connection.is_idle():
+                            idle += 1
+                except Exception:
+                    continue
+
+            agents[base_url] = {
+                "in_use": stats.in_use,
+                "idle": idle,
+                "open_connections": open_connections,
+                "waiting": stats.waiting,
+                "total_requests": stats.total_requests,
+                "avg_wait_ms": round(stats.total_wait_time / stats.total_requests * 1000, 3) if stats.total_requests else 0.0,
+                "max_wait_ms": round(stats.max_wait_time * 1000, 3),
+                "limit": self.max_connections_per_agent,
+                "transport": "uds" if socket_client else "tcp"
+            }
+
+        return {
+            "limits": {
+                "max_connections": self.limits.max_connections,
+                "max_keepalive_connections": self.limits.max_keepalive_connections,
+                "keepalive_expiry": self.limits.keepalive_expiry,
+                "max_connections_per_agent": self.max_connections_per_agent
+            },
+            "open_connections": len(connections) + len(socket_connections),
+            "idle_connections": sum(1 for c in connections + socket_connections if self._is_idle(c)),
+            "in_use": sum(s.in_use for s in self._stats.values()),
+            "waiting": sum(s.waiting for s in self._stats.values()),
+            "agents": agents
+        }
+
+    def _pool_connections(self, client: Optional[httpx.AsyncClient] = None) -> list:
+        """Connections currently held by the httpcore pool behind a client (the shared one by default)"""
+        client = client or self._client
+        if client is None:
+            return []
+        transport = getattr(client, "_transport", None)
+        pool = getattr(transport, "_pool", None)
+        return list(getattr(pool, "connections", []) or [])
+
+    @staticmethod
+    def _is_idle(connection) -> bool:
+        try:
+            return connection.is_idle()
+        except Exception:
+            return False
+
+    @staticmethod
+    def _origin(base_url: str):
+        """httpcore origin for a base URL, used to attribute pooled connections"""
+        try:
+            import httpcore
+            parts = urlsplit(base_url)
+            port = parts.port or (443 if parts.scheme == "https" else 80)
+            return httpcore.Origin(parts.scheme.encode(), (parts.hostname or "").encode(), port)
+        except Exception:
+            return None
@@ -13,18 +13,30 @@ import logging
 import asyncio
 import uuid
 import time
+import json
+import os
+import sys
+import math
 from typing import List, Dict, Any, Optional
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from contextlib import asynccontextmanager
 
+# Make integration/config.py importable when running from src/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from models import (
     AgentInstance, AgentConfig, CreateAgentRequest, UpdateAgentRequest,
     AgentQueryRequest, MessageRouteRequest, WorkflowExecutionRequest,
-    AgentConnection, AgentStatus
+    AgentConnection, AgentStatus, BatchCreateAgentsRequest, BatchCreateAgentsResponse,
+    AgentHeartbeat, StopAgentsRequest, StopAgentsResponse, RegisterNodeRequest
 )
-from agent_manager import AgentManager
+from agent_manager import AgentManager, AgentUnavailableError, AgentTimeoutError
+from request_queue import AgentQueueFullError, AgentQueueTimeoutError
+from circuit_breaker import CircuitOpenError
 from message_router import MessageRouter
+from config import settings
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -42,17 +54,23 @@ async def lifespan(app: FastAPI):
     
     # Startup
     logger.info("🚀 Starting Agent Orchestration Integration Layer")
-    agent_manager = AgentManager()
+    agent_manager = AgentManager(registry_path=settings.AGENT_REGISTRY_PATH or None)
+    agent_manager.on_agent_update = broadcast_agent_update
+    await agent_manager.start()
     message_router = MessageRouter(agent_manager)
+    agent_manager.connected_agents = message_router.get_connected_agents
     
     yield
     
     # Shutdown
     logger.info("🛑 Shutting down Agent Orchestration Integration Layer")
     if agent_manager:
-        # Stop all running agents
-        for agent_id in list(agent_manager.agents.keys()):
-            await agent_manager.stop_agent(agent_id)
+        if agent_manager.store is None or settings.AGENT_STOP_ON_SHUTDOWN:
+            # Stop all running agents at once
+            await agent_manager.stop_all()
+        else:
+            logger.info(f"Leaving {len(agent_manager.processes)} agent processes running to be re-adopted on restart")
+        await agent_manager.close()
 
 # Create FastAPI app
 app = FastAPI(
@@ -103,6 +121,65 @@ async def health_check():
         }
     }
 
+@app.get("/metrics/http-pool")
+async def http_pool_metrics():
+    """Connection pool statistics for traffic to agents"""
+    return agent_manager.get_http_pool_stats()
+
+@app.get("/metrics/queues")
+async def queue_metrics():
+    """Request queue of every agent: depth, rejections and wait times"""
+    return agent_manager.get_queue_stats()
+
+@app.get("/metrics/hibernation")
+async def hibernation_metrics():
+    """Hibernated agents, hibernations and wakes, wake latency and memory freed"""
+    return agent_manager.get_hibernation_stats()
+
+@app.get("/metrics/cpu-affinity")
+async def cpu_affinity_metrics():
+    """CPU sockets, pinned agent processes per core, and the placement policy"""
+    return agent_manager.get_cpu_placement()
+
+@app.get("/metrics/message-history")
+async def message_history_metrics():
+    """Messages kept in the routing history, their size and how many were evicted"""
+    return message_router.message_history.to_dict()
+
+@app.get("/hosts")
+async def list_agent_hosts():
+    """Multi-tenant agent host processes (AGENT_HOST_CAPACITY > 0)"""
+    return {"capacity": settings.AGENT_HOST_CAPACITY, "hosts": agent_manager.get_hosts()}
+
+@app.get("/nodes")
+async def list_nodes():
+    """Node daemons agents are placed on, with their capacity"""
+    return {"placement": settings.AGENT_PLACEMENT, "nodes": agent_manager.get_nodes()}
+
+@app.post("/nodes")
+async def register_node(request: RegisterNodeRequest):
+    """Register a node daemon (called by node_daemon.py on startup)"""
+    try:
+        return await agent_manager.register_node(request.url)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Node at {request.url} did not answer: {str(e)}")
+
+@app.delete("/nodes/{node_id}")
+async def remove_node(node_id: str):
+    """Stop placing agents on a node (it must not be running any)"""
+    node = agent_manager.nodes.nodes.get(node_id)
+    if not node:
+        raise HTTPException(status_code=404, detail="Node not found")
+    if node.agent_ids:
+        raise HTTPException(status_code=409, detail=f"Node still runs {len(node.agent_ids)} agents")
+    agent_manager.remove_node(node_id)
+    return {"status": "removed", "node_id": node_id}
+
+@app.get("/metrics/startup")
+async def startup_metrics():
+    """Agent startup latency histogram"""
+    return agent_manager.get_startup_stats()
+
 # Agent management endpoints
 @app.post("/agents", response_model=AgentInstance)
 async def create_agent(request: CreateAgentRequest):
@@ -117,7 +194,19 @@ async def create_agent(request: CreateAgentRequest):
             port=0,  # Will be assigned by agent_manager
             model=request.model,
             prompt=request.prompt,
-            openai_api_key=request.openai_api_key
+            openai_api_key=request.openai_api_key,
+            restart_policy=request.restart_policy,
+            replicas=request.replicas,
+            min_replicas=request.min_replicas,
+            max_replicas=request.max_replicas,
+            max_concurrency=request.max_concurrency,
+            max_queue=request.max_queue,
+            queue_timeout=request.queue_timeout,
+            idle_ttl=request.idle_ttl,
+            cpu_quota=request.cpu_quota,
+            memory_limit_mb=request.memory_limit_mb,
+            max_fds=request.max_fds,
+            cpu_affinity=request.cpu_affinity
         )
         
         agent = await agent_manager.create_agent(config)
@@ -126,11 +215,67 @@ async def create_agent(request: CreateAgentRequest):
         await broadcast_agent_update(agent)
         
         return agent
-        
+    
     except Exception as e:
         logger.error(f"Failed to create agent: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/agents/batch", response_model=BatchCreateAgentsResponse)
+async def create_agents_batch(request: BatchCreateAgentsRequest):
+    """Create and start many agents at once, in parallel"""
+    configs = [
+        AgentConfig(
+            id=str(uuid.uuid4()),
+            name=agent_request.name,
+            type=agent_request.type,
+            port=0,  # Will be assigned by agent_manager
+            model=agent_request.model,
+            prompt=agent_request.prompt,
+            openai_api_key=agent_request.openai_api_key,
+            restart_policy=agent_request.restart_policy,
+            replicas=agent_request.replicas,
+            min_replicas=agent_request.min_replicas,
+            max_replicas=agent_request.max_replicas,
+            max_concurrency=agent_request.max_concurrency,
+            max_queue=agent_request.max_queue,
+            queue_timeout=agent_request.queue_timeout,
+            idle_ttl=agent_request.idle_ttl,
+            cpu_quota=agent_request.cpu_quota,
+            memory_limit_mb=agent_request.memory_limit_mb,
+            max_fds=agent_request.max_fds,
+            cpu_affinity=agent_request.cpu_affinity
+        )
+        for agent_request in request.agents
+    ]
+    
+    results = await agent_manager.create_agents(configs, request.parallelism)
+    
+    # One coalesced update for the whole batch
+    await broadcast_agents_update([r.agent for r in results if r.agent])
+    
+    created = sum(1 for r in results if r.success)
+    return BatchCreateAgentsResponse(results=results, created=created, failed=len(results) - created)
+
+@app.post("/agents/stop", response_model=StopAgentsResponse)
+async def stop_agents_bulk(request: StopAgentsRequest):
+    """Stop many agents (or all of them) concurrently"""
+    agent_ids = request.agent_ids
+    not_found = []
+    if agent_ids is not None:
+        not_found = [agent_id for agent_id in agent_ids if agent_id not in agent_manager.agents]
+        agent_ids = [agent_id for agent_id in agent_ids if agent_id in agent_manager.agents]
+    
+    results = await agent_manager.stop_all(agent_ids)
+    
+    # One coalesced update for all stopped agents
+    await broadcast_agents_update([agent_manager.agents[agent_id] for agent_id in results if agent_id in agent_manager.agents])
+    
+    return StopAgentsResponse(
+        stopped=[agent_id for agent_id, success in results.items() if success],
+        failed=[agent_id for agent_id, success in results.items() if not success],
+        not_found=not_found
+    )
+
 @app.get("/agents", response_model=List[AgentInstance])
 async def list_agents():
     """List all agent instances"""
@@ -151,23 +296,17 @@ async def update_agent(agent_id: str, request: UpdateAgentRequest):
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
     
-    # Update configuration
-    if request.name:
-        agent.config.name = request.name
-    if request.model:
-        agent.config.model = request.model  
-    if request.prompt:
-        agent.config.prompt = request.prompt
-    if request.openai_api_key:
-        agent.config.openai_api_key = request.openai_api_key
-    
-    # Restart agent if it's running to apply changes
-    if agent.status == AgentStatus.RUNNING:
-        await agent_manager.stop_agent(agent_id)
-        await agent_manager.start_agent(agent_id)
+    updates = request.changes()
+    
+    # A running agent is replaced blue/green: it keeps answering until the new process is ready
+    try:
+        changed = await agent_manager.update_agent(agent_id, updates)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to apply update: {str(e)}")
     
     updated_agent = await agent_manager.get_agent_status(agent_id)
-    await broadcast_agent_update(updated_agent)
+    if changed:
+        await broadcast_agent_update(updated_agent)
     
     return updated_agent
 
@@ -195,6 +334,16 @@ async def stop_agent(agent_id: str):
     
     return {"status": "stopped", "agent_id": agent_id}
 
+@app.post("/agents/{agent_id}/hibernate")
+async def hibernate_agent(agent_id: str):
+    """Stop an agent's processes until its next query wakes it"""
+    if agent_id not in agent_manager.agents:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    if not await agent_manager.hibernate_agent(agent_id):
+        raise HTTPException(status_code=409, detail="Agent is not running or still has queries outstanding")
+    
+    return {"status": "hibernated", "agent_id": agent_id}
+
 @app.delete("/agents/{agent_id}")
 async def delete_agent(agent_id: str):
     """Delete an agent"""
@@ -203,13 +352,7 @@ async def delete_agent(agent_id: str):
         raise HTTPException(status_code=404, detail="Agent not found")
     
     # Remove any connections involving this agent
-    connections_to_remove = []
-    for conn_id, conn in message_router.connections.items():
-        if conn.from_agent == agent_id or conn.to_agent == agent_id:
-            connections_to_remove.append(conn_id)
-    
-    for conn_id in connections_to_remove:
-        message_router.remove_connection(conn_id)
+    connections_to_remove = message_router.remove_agent_connections(agent_id)
     
     await broadcast_message({
         "type": "agent_deleted",
@@ -225,9 +368,84 @@ async def query_agent(agent_id: str, request: AgentQueryRequest):
     try:
         response = await agent_manager.send_query_to_agent(agent_id, request)
         return response
+    except AgentQueueFullError as e:
+        raise HTTPException(status_code=429, detail=f"Agent is overloaded: {str(e)}", headers={"Retry-After": "1"})
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+    except (AgentUnavailableError, AgentQueueTimeoutError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except AgentTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/agents/{agent_id}/metrics")
+async def get_agent_metrics(agent_id: str, resolution: str = "raw"):
+    """CPU, memory, fds, threads and context switches of the agent's process over time"""
+    if agent_id not in agent_manager.agents:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    if resolution not in ("raw", "coarse"):
+        raise HTTPException(status_code=400, detail="resolution must be 'raw' or 'coarse'")
+    return agent_manager.get_agent_resources(agent_id, resolution)
+
+@app.get("/agents/{agent_id}/replicas")
+async def get_agent_replicas(agent_id: str):
+    """Processes serving the agent, with in-flight requests, totals and latency per replica"""
+    if agent_id not in agent_manager.agents:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return agent_manager.get_agent_replicas(agent_id)
+
+@app.get("/agents/{agent_id}/latency")
+async def get_agent_latency(agent_id: str):
+    """Recent query latency percentiles, the adaptive timeout, and retries/hedges spent from the budget"""
+    if agent_id not in agent_manager.agents:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return agent_manager.get_agent_latency(agent_id)
+
+@app.get("/agents/{agent_id}/queue")
+async def get_agent_queue(agent_id: str):
+    """Concurrency limit, queries in flight and queued, rejections and queue wait percentiles"""
+    if agent_id not in agent_manager.agents:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return agent_manager.get_agent_queue(agent_id)
+
+@app.get("/agents/{agent_id}/logs")
+async def get_agent_logs(agent_id: str, tail: int = 100, stream: Optional[str] = None, follow: bool = False):
+    """Recent agent output; with follow=true, keep streaming new lines as NDJSON"""
+    if agent_id not in agent_manager.agents:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    
+    logs = agent_manager.logs.get(agent_id)
+    lines = logs.tail(tail, stream) if logs else []
+    
+    if not follow:
+        return {"agent_id": agent_id, "lines": lines}
+    if logs is None:
+        raise HTTPException(status_code=409, detail="Agent has not been started yet")
+    
+    async def stream_lines():
+        queue = logs.follow()
+        try:
+            for entry in lines:
+                yield json.dumps(entry) + "\n"
+            while True:
+                entry = await queue.get()
+                if entry is None:
+                    break  # Agent deleted
+                if stream is None or entry["stream"] == stream:
+                    yield json.dumps(entry) + "\n"
+        finally:
+            logs.unfollow(queue)
+    
+    return StreamingResponse(stream_lines(), media_type="application/x-ndjson")
+
+@app.post("/agents/{agent_id}/heartbeat")
+async def agent_heartbeat(agent_id: str, heartbeat: AgentHeartbeat):
+    """Receive a heartbeat pushed by an agent"""
+    if not await agent_manager.record_heartbeat(agent_id, heartbeat):
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return {"status": "ok"}
+
 # Connection management endpoints
 @app.post("/connections")
 async def create_connection(connection: AgentConnection):
@@ -285,9 +503,9 @@ async def broadcast_agent_message(request: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/messages/history")
-async def get_message_history(limit: int = 100):
-    """Get message routing history"""
-    return message_router.get_message_history(limit)
+async def get_message_history(limit: int = 100, agent_id: Optional[str] = None, status: Optional[str] = None):
+    """Get message routing history, newest first; agent_id and status filter it"""
+    return message_router.get_message_history(limit, agent_id=agent_id, status=status)
 
 # Workflow execution endpoints
 @app.post("/workflows/execute")
@@ -342,7 +560,7 @@ async def websocket_endpoint(websocket: WebSocket):
                 # Send a heartbeat to keep connection alive
                 await websocket.send_json({"type": "heartbeat", "timestamp": time.time()})
                 logger.debug("💓 Sent heartbeat to maintain WebSocket connection")
-            
+    
     except WebSocketDisconnect:
         websocket_connections.remove(websocket)
 
@@ -354,6 +572,15 @@ async def broadcast_agent_update(agent: AgentInstance):
         "agent": agent.dict()
     })
 
+async def broadcast_agents_update(agents: List[AgentInstance]):
+    """Broadcast one update covering several agents to WebSocket clients"""
+    if not agents:
+        return
+    await broadcast_message({
+        "type": "agents_updated",
+        "agents": [agent.dict() for agent in agents]
+    })
+
 async def broadcast_message(message: dict):
     """Broadcast message to all WebSocket clients"""
     if not websocket_connections:
@@ -0,0 +1,145 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+class MessageHistory:
+    """Bounded, insertion-ordered record of routed messages.
+    
+    Messages are kept oldest first and evicted from the front once there are
+    more than max_messages, their approximate size (message, context,
+    response and error text) exceeds max_bytes, or they are older than
+    max_age seconds (0 disables a bound). Secondary indexes by agent (sender
+    and receiver) and by status keep filtered queries from walking the whole
+    history, so recent() costs O(limit) rather than a sort of everything.
+    
+    Routed messages change after they are added (status, response); the
+    router calls update() when they do so the status index and byte count
+    follow. The status index is ordered by when a message entered its status.
+    """
+    
+    def __init__(self, max_messages: int = 1000, max_bytes: int = 0, max_age: float = 0.0):
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.bytes = 0
+        self.evicted = 0
+        self._messages: Dict[str, Any] = OrderedDict()  # message id -> routed message, oldest first
+        self._added: Dict[str, float] = {}  # message id -> monotonic time it was added
+        self._sizes: Dict[str, int] = {}  # message id -> approximate bytes
+        self._context_sizes: Dict[str, int] = {}  # Contexts never change, so they are measured once
+        self._statuses: Dict[str, str] = {}  # message id -> status it is indexed under
+        self._by_agent: Dict[str, Dict[str, Any]] = {}  # agent id -> message id -> routed message
+        self._by_status: Dict[str, Dict[str, Any]] = {}  # status -> message id -> routed message
+    
+    def __len__(self) -> int:
+        return len(self._messages)
+    
+    def __contains__(self, message_id: str) -> bool:
+        return message_id in self._messages
+    
+    def get(self, message_id: str) -> Optional[Any]:
+        return self._messages.get(message_id)
+    
+    def add(self, message):
+        """Record a new routed message, evicting old ones as needed"""
+        if message.id in self._messages:
+            self.update(message)
+            return
+        self._messages[message.id] = message
+        self._added[message.id] = time.monotonic()
+        self._context_sizes[message.id] = len(json.dumps(message.context, default=str)) if message.context else 0
+        self._sizes[message.id] = self._size(message)
+        self.bytes += self._sizes[message.id]
+        for agent_id in {message.from_agent, message.to_agent}:
+            self._by_agent.setdefault(agent_id, {})[message.id] = message
+        self._statuses[message.id] = message.status
+        self._by_status.setdefault(message.status, {})[message.id] = message
+        self._evict()
+    
+    def update(self, message):
+        """Re-index a message whose status or response changed (ignored once it was evicted)"""
+        if message.id not in self._messages:
+            return
+        size = self._size(message)
+        self.bytes += size - self._sizes[message.id]
+        self._sizes[message.id] = size
+        previous = self._statuses[message.id]
+        if previous != message.status:
+            self._drop(self._by_status, previous, message.id)
+            self._statuses[message.id] = message.status
+            self._by_status.setdefault(message.status, {})[message.id] = message
+        self._evict()
+    
+    def recent(self, limit: int = 100, agent_id: Optional[str] = None, status: Optional[str] = None) -> List[Any]:
+        """Newest messages first, optionally only those of one agent and/or in one status"""
+        self._evict()
+        if agent_id is not None and status is not None:
+            by_agent = self._by_agent.get(agent_id, {})
+            by_status = self._by_status.get(status, {})
+            # Walk the smaller index and check the other
+            if len(by_agent) <= len(by_status):
+                candidates = (m for m in reversed(by_agent.values()) if m.id in by_status)
+            else:
+                candidates = (m for m in reversed(by_status.values()) if m.id in by_agent)
+        elif agent_id is not None:
+            candidates = reversed(self._by_agent.get(agent_id, {}).values())
+        elif status is not None:
+            candidates = reversed(self._by_status.get(status, {}).values())
+        else:
+            candidates = reversed(self._messages.values())
+        
+        messages = []
+        for message in candidates:
+            if len(messages) >= limit:
+                break
+            messages.append(message)
+        return messages
+    
+    def _size(self, message) -> int:
+        return (
+            len(message.message) + len(message.response or "") + len(message.error or "")
+            + self._context_sizes[message.id]
+        )
+    
+    def _evict(self):
+        expired = time.monotonic() - self.max_age if self.max_age > 0 else None
+        while self._messages:
+            oldest = next(iter(self._messages))
+            if not (
+                (self.max_messages > 0 and len(self._messages) > self.max_messages)
+                or (self.max_bytes > 0 and self.bytes > self.max_bytes)
+                or (expired is not None and self._added[oldest] < expired)
+            ):
+                break
+            self._remove(oldest)
+            self.evicted += 1
+    
+    def _remove(self, message_id: str):
+        message = self._messages.pop(message_id)
+        del self._added[message_id]
+        del self._context_sizes[message_id]
+        self.bytes -= self._sizes.pop(message_id)
+        for agent_id in {message.from_agent, message.to_agent}:
+            self._drop(self._by_agent, agent_id, message_id)
+        self._drop(self._by_status, self._statuses.pop(message_id), message_id)
+    
+    @staticmethod
+    def _drop(index: Dict[str, Dict[str, Any]], key: str, message_id: str):
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(message_id, None)
+            if not bucket:
+                del index[key]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        self._evict()
+        return {
+            "messages": len(self._messages),
+            "bytes": self.bytes,
+            "evicted": self.evicted,
+            "max_messages": self.max_messages,
+            "max_bytes": self.max_bytes,
+            "max_age": self.max_age,
+            "by_status": {status: len(bucket) for status, bucket in self._by_status.items()}
+        }
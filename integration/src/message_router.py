@@ -1,11 +1,13 @@
 import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 import uuid
 
 from models import AgentConnection, MessageRouteRequest
 from agent_manager import AgentManager
+from message_history import MessageHistory
+from config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -22,41 +24,101 @@ class RoutedMessage:
     error: Optional[str] = None
 
 class MessageRouter:
-    """Routes messages between agents based on UI connections"""
+    """Routes messages between agents based on UI connections.
+    
+    Besides `connections` (by id) the router keeps outbound, inbound and
+    (from, to) indexes of the same connection objects, so lookups on the
+    routing path cost O(degree) rather than a scan of the whole graph. Each
+    index maps to connections by id, so duplicate edges between two agents
+    are kept apart and removing one leaves the others in place.
+    """
     
     def __init__(self, agent_manager: AgentManager):
         self.agent_manager = agent_manager
         self.connections: Dict[str, AgentConnection] = {}
-        self.message_history: Dict[str, RoutedMessage] = {}
+        self.message_history = MessageHistory(
+            max_messages=settings.MESSAGE_HISTORY_MAX_MESSAGES,
+            max_bytes=int(settings.MESSAGE_HISTORY_MAX_MB * 2 ** 20),
+            max_age=settings.MESSAGE_HISTORY_MAX_AGE
+        )
+        self._outbound: Dict[str, Dict[str, AgentConnection]] = {}  # from agent -> connection id -> connection
+        self._inbound: Dict[str, Dict[str, AgentConnection]] = {}  # to agent -> connection id -> connection
+        self._edges: Dict[Tuple[str, str], Dict[str, AgentConnection]] = {}  # (from, to) -> connection id -> connection
+        
+        # Connections survive restarts along with the agents they link
+        self.store = agent_manager.store
+        if self.store:
+            for connection in self.store.load_connections():
+                self._index(connection)
         
+    def _index(self, connection: AgentConnection):
+        """Record a connection in `connections` and every index, replacing one with the same id"""
+        previous = self.connections.get(connection.id)
+        if previous is not None:
+            self._drop_edges(previous)
+        self.connections[connection.id] = connection
+        self._outbound.setdefault(connection.from_agent, {})[connection.id] = connection
+        self._inbound.setdefault(connection.to_agent, {})[connection.id] = connection
+        self._edges.setdefault((connection.from_agent, connection.to_agent), {})[connection.id] = connection
+    
+    def _unindex(self, connection_id: str) -> Optional[AgentConnection]:
+        connection = self.connections.pop(connection_id, None)
+        if connection is not None:
+            self._drop_edges(connection)
+        return connection
+    
+    def _drop_edges(self, connection: AgentConnection):
+        for index, key in (
+            (self._outbound, connection.from_agent),
+            (self._inbound, connection.to_agent),
+            (self._edges, (connection.from_agent, connection.to_agent))
+        ):
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.pop(connection.id, None)
+                if not bucket:
+                    del index[key]
+    
     def add_connection(self, connection: AgentConnection):
         """Add a connection between agents"""
-        self.connections[connection.id] = connection
+        self._index(connection)
+        if self.store:
+            self.store.save_connection(connection)
+        self.agent_manager.colocate_agents(connection.to_agent, connection.from_agent)
         logger.info(f"Added connection: {connection.from_agent} -> {connection.to_agent}")
     
     def remove_connection(self, connection_id: str):
         """Remove a connection"""
-        if connection_id in self.connections:
-            del self.connections[connection_id]
+        if self._unindex(connection_id) is not None:
+            if self.store:
+                self.store.delete_connection(connection_id)
             logger.info(f"Removed connection: {connection_id}")
     
+    def remove_agent_connections(self, agent_id: str) -> List[str]:
+        """Remove every connection from or to an agent; returns their ids"""
+        connection_ids = list({**self._outbound.get(agent_id, {}), **self._inbound.get(agent_id, {})})
+        for connection_id in connection_ids:
+            self.remove_connection(connection_id)
+        return connection_ids
+    
     def get_connections(self) -> List[AgentConnection]:
         """Get all connections"""
         return list(self.connections.values())
     
     def get_connections_from_agent(self, agent_id: str) -> List[AgentConnection]:
         """Get all outbound connections from an agent"""
-        return [
-            conn for conn in self.connections.values() 
-            if conn.from_agent == agent_id and conn.enabled
-        ]
+        return [conn for conn in self._outbound.get(agent_id, {}).values() if conn.enabled]
     
     def get_connections_to_agent(self, agent_id: str) -> List[AgentConnection]:
         """Get all inbound connections to an agent"""
-        return [
-            conn for conn in self.connections.values() 
-            if conn.to_agent == agent_id and conn.enabled
-        ]
+        return [conn for conn in self._inbound.get(agent_id, {}).values() if conn.enabled]
+    
+    def get_connected_agents(self, agent_id: str) -> List[str]:
+        """Agents linked to an agent by a connection in either direction"""
+        peers = {conn.to_agent for conn in self._outbound.get(agent_id, {}).values()}
+        peers.update(conn.from_agent for conn in self._inbound.get(agent_id, {}).values())
+        peers.discard(agent_id)
+        return list(peers)
     
     async def route_message(self, request: MessageRouteRequest) -> RoutedMessage:
         """Route a message from one agent to another"""
@@ -72,7 +134,7 @@ class MessageRouter:
             status="pending"
         )
         
-        self.message_history[message_id] = routed_message
+        self.message_history.add(routed_message)
         
         try:
             # Check if connection exists
@@ -89,6 +151,7 @@ class MessageRouter:
             
             # Send message to target agent
             routed_message.status = "sent"
+            self.message_history.update(routed_message)
             
             from models import AgentQueryRequest
             query_request = AgentQueryRequest(
@@ -119,6 +182,8 @@ class MessageRouter:
             routed_message.status = "error"
             routed_message.error = str(e)
             logger.error(f"Failed to route message: {str(e)}")
+        finally:
+            self.message_history.update(routed_message)
         
         return routed_message
     
@@ -220,18 +285,16 @@ class MessageRouter:
         logger.info(f"Workflow {workflow_id} completed with status: {workflow_result['status']}")
         return workflow_result
     
-    def get_message_history(self, limit: int = 100) -> List[RoutedMessage]:
-        """Get recent message history"""
-        messages = sorted(
-            self.message_history.values(),
-            key=lambda m: m.timestamp,
-            reverse=True
-        )
-        return messages[:limit]
+    def get_message_history(
+        self,
+        limit: int = 100,
+        agent_id: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> List[RoutedMessage]:
+        """Get recent message history, newest first, optionally for one agent and/or status"""
+        return self.message_history.recent(limit, agent_id=agent_id, status=status)
     
     def _find_connection(self, from_agent: str, to_agent: str) -> Optional[AgentConnection]:
-        """Find a connection between two agents"""
-        for connection in self.connections.values():
-            if connection.from_agent == from_agent and connection.to_agent == to_agent:
-                return connection
-        return None
\ No newline at end of file
+        """Find a connection between two agents (the first one added, if there are several)"""
+        edges = self._edges.get((from_agent, to_agent))
+        return next(iter(edges.values())) if edges else None
\ No newline at end of file
@@ -0,0 +1,60 @@
+import math
+from collections import deque
+from typing import Dict, Any, Optional, Sequence
+
+# Default bucket bounds in seconds, tuned for agent startup/response times
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+class Histogram:
+    """Fixed-bucket histogram with percentiles over the most recent samples"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, window: int = 1000):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value: float):
+        """Record one sample"""
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.recent.append(value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Percentile (0-100) over the recent sample window"""
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        rank = max(0, math.ceil(q / 100.0 * len(ordered)) - 1)
+        return ordered[rank]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-friendly snapshot with cumulative bucket counts"""
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(list(self.buckets) + [float("inf")], self.counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "buckets": buckets
+        }
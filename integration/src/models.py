@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Dict, Any, Optional, List
 from enum import Enum
 
@@ -8,6 +8,7 @@ class AgentStatus(str, Enum):
     RUNNING = "running"
     ERROR = "error"
     STOPPING = "stopping"
+    HIBERNATED = "hibernated"  # Stopped for being idle, started again by the next query
 
 class AgentConfig(BaseModel):
     id: str
@@ -17,6 +18,18 @@ class AgentConfig(BaseModel):
     model: str = "gpt-3.5-turbo"
     prompt: Optional[str] = None
     openai_api_key: str
+    restart_policy: Optional[str] = None  # "always", "on-failure" or "never" (defaults to AGENT_RESTART_POLICY)
+    replicas: int = 1  # Processes serving the agent, requests go to the least busy one
+    min_replicas: Optional[int] = None  # Autoscaling bounds on queue depth (both default to replicas)
+    max_replicas: Optional[int] = None
+    max_concurrency: Optional[int] = None  # Queries in flight per process (defaults to AGENT_MAX_CONCURRENCY)
+    max_queue: Optional[int] = None  # Queries waiting for a slot (defaults to AGENT_MAX_QUEUE)
+    queue_timeout: Optional[float] = None  # Seconds a query may wait (defaults to AGENT_QUEUE_TIMEOUT)
+    idle_ttl: Optional[float] = None  # Idle seconds before the agent is hibernated (defaults to AGENT_IDLE_TTL, 0 = never)
+    cpu_quota: Optional[float] = None  # CPU cores each process may use (defaults to AGENT_CPU_QUOTA, 0 = unlimited)
+    memory_limit_mb: Optional[float] = None  # Memory per process (defaults to AGENT_MEMORY_LIMIT_MB, 0 = unlimited)
+    max_fds: Optional[int] = None  # Open files per process (defaults to AGENT_MAX_FDS, 0 = unlimited)
+    cpu_affinity: Optional[List[int]] = None  # CPUs the agent's processes are pinned to (defaults to AGENT_CPU_AFFINITY placement)
 
 class AgentInstance(BaseModel):
     id: str
@@ -24,8 +37,35 @@ class AgentInstance(BaseModel):
     status: AgentStatus
     pid: Optional[int] = None
     url: Optional[str] = None
+    socket_path: Optional[str] = None  # Unix domain socket the agent serves on (uds transport)
+    host_id: Optional[str] = None  # Host process serving this agent (multi-tenant hosts)
+    node_id: Optional[str] = None  # Node daemon running this agent (multi-node placement)
+    replicas: int = 1  # Processes currently meant to serve the agent (see GET /agents/{id}/replicas)
+    restart_count: int = 0  # Restarts by the supervisor after crashes
+    resources: Optional[Dict[str, Any]] = None  # Latest CPU/memory/fd/thread sample of the agent's process
     error_message: Optional[str] = None
     last_health_check: Optional[str] = None
+    health_age_seconds: Optional[float] = None  # How stale the cached status is
+    last_heartbeat: Optional[str] = None
+    load: Optional[Dict[str, Any]] = None  # In-flight requests, queue depth and latency from the last heartbeat
+    circuit_state: str = "closed"  # Circuit breaker on queries: "closed", "open" (failing fast) or "half-open"
+    circuit_reason: Optional[str] = None  # Why the circuit last opened
+    limits: Optional[Dict[str, Any]] = None  # CPU/memory/fd limits of the agent's processes and how they are enforced
+    limit_hits: Dict[str, int] = {}  # Resource sweeps in which a limit was hit, per resource ("cpu", "memory", "oom_kill", "fds")
+    last_limit_hit: Optional[str] = None
+    cpus: Optional[List[int]] = None  # CPUs the agent's process is pinned to (None = not pinned)
+
+class AgentHeartbeat(BaseModel):
+    """Health and load pushed by an agent on a fixed interval"""
+    status: str = "healthy"
+    ready: bool = True
+    in_flight: int = 0
+    queue_depth: int = 0
+    requests_total: int = 0
+    latency_ms: Dict[str, Optional[float]] = {}
+    timestamp: Optional[float] = None
+    
+    model_config = ConfigDict(extra="allow")  # Keep the rest of BaseAgent.get_health_status()
 
 class AgentConnection(BaseModel):
     id: str
@@ -54,13 +94,81 @@ class CreateAgentRequest(BaseModel):
     model: str = "gpt-3.5-turbo"
     prompt: Optional[str] = None
     openai_api_key: str
+    restart_policy: Optional[str] = None
+    replicas: int = 1
+    min_replicas: Optional[int] = None
+    max_replicas: Optional[int] = None
+    max_concurrency: Optional[int] = None
+    max_queue: Optional[int] = None
+    queue_timeout: Optional[float] = None
+    idle_ttl: Optional[float] = None
+    cpu_quota: Optional[float] = None
+    memory_limit_mb: Optional[float] = None
+    max_fds: Optional[int] = None
+    cpu_affinity: Optional[List[int]] = None
+
+class BatchCreateAgentsRequest(BaseModel):
+    agents: List[CreateAgentRequest]
+    parallelism: Optional[int] = None  # Max agents starting at once (defaults to AGENT_BATCH_PARALLELISM)
+
+class BatchAgentResult(BaseModel):
+    index: int  # Position in the request
+    agent_id: Optional[str] = None
+    success: bool
+    agent: Optional[AgentInstance] = None
+    error: Optional[str] = None
+
+class BatchCreateAgentsResponse(BaseModel):
+    results: List[BatchAgentResult]
+    created: int
+    failed: int
+
+class StopAgentsRequest(BaseModel):
+    agent_ids: Optional[List[str]] = None  # Agents to stop (all of them if omitted)
+
+class StopAgentsResponse(BaseModel):
+    stopped: List[str]
+    failed: List[str]
+    not_found: List[str]
 
 class UpdateAgentRequest(BaseModel):
     name: Optional[str] = None
     model: Optional[str] = None
     prompt: Optional[str] = None
     openai_api_key: Optional[str] = None
+    replicas: Optional[int] = None
+    min_replicas: Optional[int] = None
+    max_replicas: Optional[int] = None
+    max_concurrency: Optional[int] = None
+    max_queue: Optional[int] = None
+    queue_timeout: Optional[float] = None
+    idle_ttl: Optional[float] = None
+    cpu_quota: Optional[float] = None
+    memory_limit_mb: Optional[float] = None
+    max_fds: Optional[int] = None
+    cpu_affinity: Optional[List[int]] = None
+    
+    def changes(self) -> Dict[str, Any]:
+        """The fields the request sets, as config updates.
+        
+        Zero, empty and false values are real settings (idle_ttl=0 turns
+        hibernation off, cpu_quota=0 lifts the limit) and are kept. An explicit
+        null puts a field back to its default where the config allows None,
+        and is ignored for required fields like name. An empty cpu_affinity
+        removes the agent's own pinning, the same as null.
+        """
+        changes = {
+            field: value for field, value in self.model_dump(exclude_unset=True).items()
+            if value is not None or AgentConfig.model_fields[field].default is None
+        }
+        if changes.get("cpu_affinity") == []:
+            changes["cpu_affinity"] = None
+        return changes
+
+class RegisterNodeRequest(BaseModel):
+    url: str  # Where the node daemon listens, e.g. http://10.0.0.5:9100
 
 class AgentQueryRequest(BaseModel):
     query: str
-    context: Optional[Dict[str, Any]] = None
\ No newline at end of file
+    context: Optional[Dict[str, Any]] = None
+    timeout: Optional[float] = None  # Seconds the caller waits at most, queueing and retries included
\ No newline at end of file
@@ -0,0 +1,215 @@
+"""
+Agent Orchestration Node Daemon
+
+Runs on every machine agents should be placed on and:
+1. Reports the node's capacity (CPU, memory, running agents)
+2. Spawns and stops SingleAgent processes on this machine for the integration layer
+3. Registers itself with the integration layer (with --integration-url)
+
+Agents are managed by a local AgentManager, so they get the same readiness
+checks, supervision and logs as agents the integration layer runs itself.
+
+Usage (from the integration/src directory), e.g. two nodes on one machine:
+    python node_daemon.py --port 9101 --agent-port-base 8101 --integration-url http://localhost:8000
+    python node_daemon.py --port 9102 --agent-port-base 8201 --integration-url http://localhost:8000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import sys
+from typing import Optional
+from contextlib import asynccontextmanager
+
+import httpx
+import psutil
+from fastapi import FastAPI, HTTPException
+
+# Make integration/config.py importable when running from src/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import AgentInstance, AgentConfig, AgentStatus, UpdateAgentRequest
+from agent_manager import AgentManager
+from config import settings
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Global instances
+agent_manager: AgentManager = None
+node_url: Optional[str] = None  # How the integration layer reaches this daemon
+integration_url: Optional[str] = None  # Integration layer to register with
+
+def max_agents() -> int:
+    """Agent slots on this node: NODE_MAX_AGENTS, or what memory allows"""
+    if settings.NODE_MAX_AGENTS > 0:
+        return settings.NODE_MAX_AGENTS
+    total_mb = psutil.virtual_memory().total / 2 ** 20
+    return max(1, int(total_mb // settings.NODE_AGENT_MEMORY_MB))
+
+def remote_view(agent: AgentInstance) -> AgentInstance:
+    """The agent as seen from the integration layer (reachable on the advertised host)"""
+    url = agent.url
+    if url and url.startswith("http://localhost"):
+        url = f"http://{settings.NODE_ADVERTISE_HOST}" + url[len("http://localhost"):]
+    return agent.model_copy(update={"url": url})
+
+async def register_with_integration():
+    """Announce this node once it is serving, retrying until the integration layer answers"""
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        while True:
+            await asyncio.sleep(1.0)
+            try:
+                response = await client.post(f"{integration_url}/nodes", json={"url": node_url})
+                response.raise_for_status()
+                logger.info(f"📡 Registered with {integration_url} as {settings.NODE_ID}")
+                return
+            except Exception as e:
+                logger.warning(f"Could not register with {integration_url} yet: {str(e)}")
+                await asyncio.sleep(4.0)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup and shutdown logic"""
+    global agent_manager
+    
+    # Startup
+    logger.info(f"🚀 Starting node daemon {settings.NODE_ID}")
+    agent_manager = AgentManager()
+    # Our agents push their heartbeats to the integration layer, never to us, so probe them here
+    agent_manager.health_monitor.heartbeat_interval = 0
+    await agent_manager.start()
+    
+    registration = None
+    if integration_url:
+        registration = asyncio.ensure_future(register_with_integration())
+    
+    yield
+    
+    # Shutdown
+    logger.info(f"🛑 Shutting down node daemon {settings.NODE_ID}")
+    if registration is not None:
+        registration.cancel()
+    if agent_manager:
+        await agent_manager.stop_all()
+        await agent_manager.close()
+
+# Create FastAPI app
+app = FastAPI(
+    title="Agent Orchestration Node Daemon",
+    description="Runs agents on this machine for the integration layer",
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+@app.get("/node")
+async def get_node():
+    """Capacity report polled by the integration layer"""
+    memory = psutil.virtual_memory()
+    agents = agent_manager.agents.values()
+    return {
+        "node_id": settings.NODE_ID,
+        "max_agents": max_agents(),
+        "cpu_count": psutil.cpu_count(),
+        "cpu_percent": psutil.cpu_percent(interval=None),
+        "memory_total_mb": round(memory.total / 2 ** 20, 1),
+        "memory_available_mb": round(memory.available / 2 ** 20, 1),
+        "running_agents": sum(1 for agent in agents if agent.status == AgentStatus.RUNNING),
+        "heartbeat_interval": settings.HEARTBEAT_INTERVAL,
+        "agents": len(agent_manager.agents)
+    }
+
+@app.get("/agents")
+async def list_agents():
+    """Agents on this node"""
+    return [remote_view(agent) for agent in await agent_manager.list_agents()]
+
+@app.post("/agents")
+async def create_agent(config: AgentConfig):
+    """Start an agent on this node (the integration layer picks the id)"""
+    if config.id in agent_manager.agents:
+        raise HTTPException(status_code=409, detail=f"Agent {config.id} already exists on this node")
+    if len(agent_manager.agents) >= max_agents():
+        raise HTTPException(status_code=503, detail=f"Node {settings.NODE_ID} is full")
+    if psutil.virtual_memory().available / 2 ** 20 < settings.NODE_AGENT_MEMORY_MB:
+        raise HTTPException(status_code=503, detail=f"Node {settings.NODE_ID} is low on memory")
+    
+    config.port = 0  # Ports are this node's business
+    try:
+        agent = await agent_manager.create_agent(config)
+    except Exception as e:
+        await agent_manager.delete_agent(config.id)
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if agent.status != AgentStatus.RUNNING:
+        error = agent.error_message
+        await agent_manager.delete_agent(config.id)
+        raise HTTPException(status_code=500, detail=error or "Agent failed to start")
+    return remote_view(agent)
+
+@app.get("/agents/{agent_id}")
+async def get_agent(agent_id: str):
+    agent = await agent_manager.get_agent_status(agent_id)
+    if not agent:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return remote_view(agent)
+
+@app.put("/agents/{agent_id}")
+async def update_agent(agent_id: str, request: UpdateAgentRequest):
+    """Reconfigure an agent (blue/green, like the integration layer does locally)"""
+    if agent_id not in agent_manager.agents:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    
+    updates = request.changes()
+    try:
+        await agent_manager.update_agent(agent_id, updates)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to apply update: {str(e)}")
+    return remote_view(agent_manager.agents[agent_id])
+
+@app.delete("/agents/{agent_id}")
+async def delete_agent(agent_id: str):
+    """Stop an agent and forget it"""
+    if not await agent_manager.delete_agent(agent_id):
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return {"status": "deleted", "agent_id": agent_id}
+
+@app.get("/agents/{agent_id}/logs")
+async def get_agent_logs(agent_id: str, tail: int = 100, stream: Optional[str] = None):
+    """Recent output of an agent on this node"""
+    logs = agent_manager.logs.get(agent_id)
+    if agent_id not in agent_manager.agents or logs is None:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return {"agent_id": agent_id, "lines": logs.tail(tail, stream)}
+
+if __name__ == "__main__":
+    import uvicorn
+    
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9100, help="port the daemon listens on")
+    parser.add_argument("--agent-port-base", type=int, default=settings.BASE_AGENT_PORT, help="first port handed to agents on this node")
+    parser.add_argument("--node-id", default=settings.NODE_ID, help="name of this node (default hostname:port)")
+    parser.add_argument("--advertise-host", default=settings.NODE_ADVERTISE_HOST, help="host name the integration layer reaches this node on")
+    parser.add_argument("--max-agents", type=int, default=settings.NODE_MAX_AGENTS, help="agents this node accepts (0 = as many as memory allows)")
+    parser.add_argument("--integration-url", default=None, help="integration layer to register with")
+    args = parser.parse_args()
+    
+    settings.BASE_AGENT_PORT = args.agent_port_base
+    settings.NODE_ID = args.node_id or f"{socket.gethostname()}:{args.port}"
+    settings.NODE_ADVERTISE_HOST = args.advertise_host
+    settings.NODE_MAX_AGENTS = args.max_agents
+    if args.integration_url:
+        integration_url = args.integration_url.rstrip("/")
+        settings.INTEGRATION_URL = integration_url  # Where agents send heartbeats
+    else:
+        settings.HEARTBEAT_INTERVAL = 0  # Nobody to send them to
+    settings.AGENT_NODES = ""  # Agents on a node always run right here
+    settings.AGENT_TRANSPORT = "tcp"  # ... and must be reachable from other machines
+    node_url = f"http://{args.advertise_host}:{args.port}"
+    
+    print(f"🚀 Starting node daemon {settings.NODE_ID} on {node_url}")
+    
+    uvicorn.run(app, host="0.0.0.0", port=args.port, log_level="info")
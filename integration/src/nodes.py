@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# How agents are spread over nodes
+PLACEMENT_SPREAD = "spread"  # Least loaded node first
+PLACEMENT_BINPACK = "binpack"  # Fill the busiest node that still has room, keep others empty
+PLACEMENT_POLICIES = (PLACEMENT_SPREAD, PLACEMENT_BINPACK)
+
+# Node states
+NODE_READY = "ready"
+NODE_UNREACHABLE = "unreachable"
+
+@dataclass
+class AgentNode:
+    """A machine running node_daemon.py, as last reported by the daemon"""
+    id: str
+    url: str
+    status: str = NODE_READY
+    max_agents: int = 0
+    cpu_count: int = 0
+    cpu_percent: float = 0.0
+    memory_total_mb: float = 0.0
+    memory_available_mb: float = 0.0
+    running_agents: int = 0  # As counted by the daemon
+    heartbeat_interval: float = 0.0  # Seconds between heartbeats its agents push to us (0 = none)
+    agent_ids: Set[str] = field(default_factory=set)  # Placed by us, including agents still starting
+    last_seen: Optional[float] = None
+    error_message: Optional[str] = None
+    
+    @property
+    def load(self) -> float:
+        """Share of the node's agent slots in use"""
+        return len(self.agent_ids) / self.max_agents if self.max_agents else 1.0
+    
+    def has_room(self) -> bool:
+        return self.status == NODE_READY and len(self.agent_ids) < self.max_agents
+    
+    def update(self, report: Dict[str, Any]):
+        """Take in a GET /node report"""
+        self.max_agents = report.get("max_agents", self.max_agents)
+        self.cpu_count = report.get("cpu_count", self.cpu_count)
+        self.cpu_percent = report.get("cpu_percent", self.cpu_percent)
+        self.memory_total_mb = report.get("memory_total_mb", self.memory_total_mb)
+        self.memory_available_mb = report.get("memory_available_mb", self.memory_available_mb)
+        self.running_agents = report.get("running_agents", self.running_agents)
+        self.heartbeat_interval = report.get("heartbeat_interval", self.heartbeat_interval)
+        self.status = NODE_READY
+        self.error_message = None
+        self.last_seen = time.time()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "url": self.url,
+            "status": self.status,
+            "max_agents": self.max_agents,
+            "cpu_count": self.cpu_count,
+            "cpu_percent": self.cpu_percent,
+            "memory_total_mb": self.memory_total_mb,
+            "memory_available_mb": self.memory_available_mb,
+            "running_agents": self.running_agents,
+            "heartbeat_interval": self.heartbeat_interval,
+            "agents": sorted(self.agent_ids),
+            "last_seen": self.last_seen,
+            "error_message": self.error_message
+        }
+
+class NodeRegistry:
+    """Node daemons agents can be placed on, with their capacity refreshed in the background.
+    
+    Each daemon is polled for its capacity report (GET /node) every
+    poll_interval seconds; a daemon that can't be reached is skipped by
+    placement until it answers again.
+    """
+    
+    def __init__(self, http, poll_interval: float = 10.0):
+        self.http = http
+        self.poll_interval = poll_interval
+        self.nodes: Dict[str, AgentNode] = {}
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self, urls: List[str]):
+        """Register the configured nodes and start polling them"""
+        for url in urls:
+            try:
+                await self.add(url)
+            except Exception as e:
+                logger.error(f"Failed to register node {url}: {str(e)}")
+        if self._task is None and self.poll_interval > 0:
+            self._task = asyncio.ensure_future(self._run())
+    
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def add(self, url: str) -> AgentNode:
+        """Register a node daemon (again) by asking it for its capacity"""
+        url = url.rstrip("/")
+        response = await self.http.get(url, "/node", timeout=5.0)
+        response.raise_for_status()
+        report = response.json()
+        
+        node = self.nodes.get(report["node_id"])
+        if node is None:
+            node = AgentNode(id=report["node_id"], url=url)
+            self.nodes[node.id] = node
+            logger.info(f"Registered node {node.id} at {url} ({report.get('max_agents')} agent slots)")
+        node.url = url
+        node.update(report)
+        return node
+    
+    def remove(self, node_id: str) -> Optional[AgentNode]:
+        node = self.nodes.pop(node_id, None)
+        if node is not None:
+            self.http.forget(node.url)
+        return node
+    
+    def place(self, agent_id: str, policy: str, exclude: Set[str] = frozenset()) -> Optional[AgentNode]:
+        """Reserve a slot for an agent on the node the policy picks.
+        
+        Synchronous, so concurrent starts can't overfill a node.
+        """
+        candidates = [node for node in self.nodes.values() if node.has_room() and node.id not in exclude]
+        if not candidates:
+            return None
+        
+        if policy == PLACEMENT_BINPACK:
+            node = max(candidates, key=lambda n: (n.load, -n.memory_available_mb))
+        else:
+            node = min(candidates, key=lambda n: (n.load, n.cpu_percent))
+        node.agent_ids.add(agent_id)
+        return node
+    
+    def release(self, node_id: Optional[str], agent_id: str):
+        node = self.nodes.get(node_id) if node_id else None
+        if node is not None:
+            node.agent_ids.discard(agent_id)
+    
+    async def refresh(self):
+        """Poll every node for its capacity once"""
+        await asyncio.gather(*(self._refresh(node) for node in list(self.nodes.values())))
+    
+    async def _refresh(self, node: AgentNode):
+        try:
+            response = await self.http.get(node.url, "/node", timeout=5.0)
+            response.raise_for_status()
+            if node.status != NODE_READY:
+                logger.info(f"Node {node.id} is reachable again")
+            node.update(response.json())
+        except Exception as e:
+            if node.status != NODE_UNREACHABLE:
+                logger.warning(f"Node {node.id} is unreachable: {str(e)}")
+            node.status = NODE_UNREACHABLE
+            node.error_message = str(e)
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Node polling failed: {str(e)}")
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, Tuple
+
+from models import AgentStatus, AgentConfig
+from metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+def replica_bounds(config: AgentConfig) -> Tuple[int, int]:
+    """(min, max) processes for an agent; autoscaling is on when max > min"""
+    low = max(1, config.min_replicas or config.replicas)
+    high = max(low, config.max_replicas or config.replicas)
+    return low, high
+
+def clamp_replicas(config: AgentConfig, count: int) -> int:
+    low, high = replica_bounds(config)
+    return min(high, max(low, count))
+
+@dataclass
+class AgentReplica:
+    """An extra process serving a logical agent (the AgentInstance itself is replica 0).
+    
+    Shaped like an AgentInstance where it matters (url, status, error_message,
+    last_health_check) so it goes through the same readiness checks.
+    """
+    agent_id: str
+    index: int
+    url: str
+    port: int = 0
+    socket_path: Optional[str] = None
+    process: Optional[Any] = None
+    status: AgentStatus = AgentStatus.STARTING
+    error_message: Optional[str] = None
+    last_health_check: Optional[str] = None
+    exited: Optional[asyncio.Future] = None  # Resolved with the return code when the process exits
+    
+    @property
+    def key(self) -> str:
+        """Name of the replica's process in the manager's log pumps"""
+        return f"{self.agent_id}#{self.index}"
+    
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process is not None else None
+
+@dataclass
+class ReplicaStats:
+    """Requests sent to one replica"""
+    in_flight: int = 0  # Counted from the moment the replica is picked
+    requests: int = 0
+    failures: int = 0
+    latency: Histogram = field(default_factory=Histogram)
+    
+    def observe(self, seconds: float, ok: bool):
+        self.requests += 1
+        if ok:
+            self.latency.observe(seconds)
+        else:
+            self.failures += 1
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "latency_p50": self.latency.percentile(50),
+            "latency_p95": self.latency.percentile(95)
+        }
+
+class ReplicaAutoscaler:
+    """Keeps every running agent at its replica count and scales on queue depth.
+    
+    Each tick replaces replicas that exited, then compares the requests
+    outstanding across an agent's replicas with target_queue_depth per
+    replica. Agents scale up as soon as the queue is too deep, and down one
+    replica at a time once it has stayed shallow for scale_down_delay seconds.
+    
+    A scaling that leaves an agent short of replicas (a replica that can't
+    start) counts as a failure. Replicas are only started again after a
+    backoff that doubles with every failure in a row, like the supervisor's
+    restarts; scaling down is never held back.
+    """
+    
+    def __init__(
+        self,
+        agent_manager,
+        interval: float = 5.0,
+        target_queue_depth: float = 4.0,
+        scale_down_delay: float = 60.0,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0
+    ):
+        self.agent_manager = agent_manager
+        self.interval = interval
+        self.target_queue_depth = max(0.1, target_queue_depth)
+        self.scale_down_delay = scale_down_delay
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failures: Dict[str, int] = {}  # Scalings in a row that left the agent short of replicas
+        self._retry_at: Dict[str, float] = {}  # Monotonic time replicas may be started again
+        self._low_since: Dict[str, float] = {}
+        self._scaling: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.ensure_future(self._run())
+            logger.info(f"Replica autoscaler started (interval={self.interval}s)")
+    
+    async def close(self):
+        tasks = list(self._scaling.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        self._scaling.clear()
+    
+    def forget(self, agent_id: str):
+        self._low_since.pop(agent_id, None)
+        self.failures.pop(agent_id, None)
+        self._retry_at.pop(agent_id, None)
+    
+    def retry_in(self, agent_id: str) -> Optional[float]:
+        """Seconds until replicas of a backed-off agent may be started again (None if not backed off)"""
+        retry_at = self._retry_at.get(agent_id)
+        if retry_at is None or retry_at <= time.monotonic():
+            return None
+        return round(retry_at - time.monotonic(), 1)
+    
+    async def _run(self):
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Replica autoscaling failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+    
+    def tick(self):
+        """Decide every agent's replica count and start the scaling in the background"""
+        manager = self.agent_manager
+        for agent_id, agent in manager.agents.items():
+            if agent.status != AgentStatus.RUNNING or agent.host_id or agent.node_id or agent_id in self._scaling:
+                continue
+            
+            low, high = replica_bounds(agent.config)
+            desired = agent.replicas
+            if high > low:
+                queue_depth = manager.queue_depth(agent_id)
+                wanted = min(high, max(low, math.ceil(queue_depth / self.target_queue_depth)))
+                now = time.monotonic()
+                if wanted > desired:
+                    desired = wanted
+                    self._low_since.pop(agent_id, None)
+                elif wanted < desired:
+                    low_since = self._low_since.setdefault(agent_id, now)
+                    if now - low_since >= self.scale_down_delay:
+                        desired -= 1
+                        self._low_since[agent_id] = now
+                else:
+                    self._low_since.pop(agent_id, None)
+            
+            short = manager.live_replicas(agent_id) < agent.replicas
+            if desired != agent.replicas or short:
+                if desired >= agent.replicas and self.retry_in(agent_id) is not None:
+                    continue  # Would start replicas, and recent attempts failed
+                if desired != agent.replicas:
+                    logger.info(f"Scaling agent {agent_id} from {agent.replicas} to {desired} replicas")
+                task = asyncio.ensure_future(manager.scale_agent(agent_id, desired))
+                task.add_done_callback(lambda task, agent_id=agent_id: self._scaled(agent_id, task))
+                self._scaling[agent_id] = task
+    
+    def _scaled(self, agent_id: str, task: asyncio.Task):
+        """Reset the backoff of an agent whose scaling worked, or back off further"""
+        self._scaling.pop(agent_id, None)
+        manager = self.agent_manager
+        agent = manager.agents.get(agent_id)
+        if task.cancelled() or agent is None:
+            return
+        
+        error = task.exception()
+        live = manager.live_replicas(agent_id)
+        if error is None and (agent.status != AgentStatus.RUNNING or live >= agent.replicas):
+            self.failures.pop(agent_id, None)
+            self._retry_at.pop(agent_id, None)
+            return
+        
+        failures = self.failures[agent_id] = self.failures.get(agent_id, 0) + 1
+        delay = min(self.backoff_base * 2 ** (failures - 1), self.backoff_max) * random.uniform(0.9, 1.1)
+        self._retry_at[agent_id] = time.monotonic() + delay
+        reason = f": {str(error)}" if error is not None else ""
+        logger.warning(
+            f"Agent {agent_id} has {live} of {agent.replicas} replicas running after {failures} failed "
+            f"scaling attempt(s){reason}, retrying in {delay:.1f}s"
+        )
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+from metrics import Histogram
+
+class AgentQueueFullError(Exception):
+    """The agent already has as many queries waiting as its queue holds (HTTP 429)"""
+
+class AgentQueueTimeoutError(Exception):
+    """A query waited longer than the queue timeout for the agent to take it (HTTP 503)"""
+
+class AgentRequestQueue:
+    """Bounded admission queue in front of one agent.
+    
+    At most max_concurrency queries are in flight to the agent; up to
+    max_queue more wait in FIFO order for at most timeout seconds. Anything
+    beyond that is turned away immediately, so a burst can't pile up behind
+    a slow agent until every caller hits the request timeout.
+    """
+    
+    def __init__(self, max_concurrency: int, max_queue: int, timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: deque = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_time = Histogram()
+    
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+    
+    def resize(self, max_concurrency: int):
+        """Change the concurrency limit (e.g. when replicas come and go), admitting waiters if it grew"""
+        self.max_concurrency = max_concurrency
+        self._wake()
+    
+    async def acquire(self, timeout: Optional[float] = None):
+        """Wait for a slot; raises AgentQueueFullError or AgentQueueTimeoutError instead of waiting forever.
+        
+        `timeout` (the caller's own deadline) shortens the queue timeout, never extends it.
+        """
+        timeout = self.timeout if timeout is None else max(0.0, min(timeout, self.timeout))
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            self.wait_time.observe(0.0)
+            return
+        
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise AgentQueueFullError(
+                f"{self.active} queries in flight and {len(self._waiters)} queued (limit {self.max_queue})"
+            )
+        
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        started = time.monotonic()
+        try:
+            done, _ = await asyncio.wait({waiter}, timeout=timeout)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        
+        if not done:
+            self._abandon(waiter)
+            self.timed_out += 1
+            raise AgentQueueTimeoutError(f"Query waited {timeout:.1f}s in the agent's queue")
+        
+        self.admitted += 1
+        self.wait_time.observe(time.monotonic() - started)
+    
+    def release(self):
+        self.active -= 1
+        self._wake()
+    
+    def _wake(self):
+        """Hand free slots to the longest-waiting queries"""
+        while self._waiters and self.active < self.max_concurrency:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+    
+    def _abandon(self, waiter: asyncio.Future):
+        if waiter.done():
+            self.release()  # The slot was handed over as we gave up - pass it on
+        else:
+            waiter.cancel()
+            self._waiters.remove(waiter)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "timeout": self.timeout,
+            "in_flight": self.active,
+            "queued": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait_p50": self.wait_time.percentile(50),
+            "wait_p95": self.wait_time.percentile(95),
+            "wait_p99": self.wait_time.percentile(99)
+        }
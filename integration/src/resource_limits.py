@@ -0,0 +1,213 @@
+import logging
+import os
+import resource
+from typing import Dict, Any, List, Optional
+
+import psutil
+
+from models import AgentConfig
+
+logger = logging.getLogger(__name__)
+
+CGROUP_MOUNT = "/sys/fs/cgroup"
+CPU_PERIOD_US = 100000
+
+# Share of a limit at which an agent counts as hitting it, where only usage can be watched
+NEAR_LIMIT = 0.9
+
+def agent_limits(config: AgentConfig, defaults) -> Dict[str, float]:
+    """CPU quota (cores), memory (MB) and fd limits an agent's processes get (0 = unlimited)"""
+    def pick(value, default):
+        return default if value is None else value
+    return {
+        "cpu_quota": pick(config.cpu_quota, defaults.AGENT_CPU_QUOTA),
+        "memory_limit_mb": pick(config.memory_limit_mb, defaults.AGENT_MEMORY_LIMIT_MB),
+        "max_fds": pick(config.max_fds, defaults.AGENT_MAX_FDS)
+    }
+
+def _read_stat(path: str) -> Dict[str, int]:
+    """A cgroup "key value" file (cpu.stat, memory.events) as a dict"""
+    values = {}
+    with open(path) as f:
+        for line in f:
+            key, _, value = line.partition(" ")
+            values[key] = int(value)
+    return values
+
+def _write(path: str, value: str):
+    with open(path, "w") as f:
+        f.write(value)
+
+class ResourceLimiter:
+    """Caps the CPU, memory and file descriptors of agent processes.
+    
+    With cgroup v2 (and write access below cgroup_parent) every limited
+    process gets its own cgroup with cpu.max and memory.max, so a runaway
+    agent is throttled or OOM-killed without touching its neighbours.
+    Otherwise memory falls back to RLIMIT_DATA via prlimit and the CPU quota
+    is only watched, not enforced. The fd limit is always RLIMIT_NOFILE.
+    
+    check() turns cgroup counters (throttled periods, memory.max events,
+    OOM kills) or, without cgroups, usage close to a limit into limit hits.
+    
+    cgroup_parent is only created once an agent gets a CPU or memory limit,
+    so running without limits leaves the host's cgroups alone.
+    """
+    
+    def __init__(self, cgroup_parent: str):
+        self.cgroup_parent = cgroup_parent
+        self._cgroups: Optional[bool] = None if cgroup_parent else False  # None until first needed
+        self._groups: Dict[str, Dict[int, str]] = {}  # agent id -> pid -> cgroup directory
+        self._counters: Dict[str, Dict[str, int]] = {}  # cgroup directory -> last counters seen
+    
+    @property
+    def cgroups(self) -> bool:
+        """Whether limits go through cgroups, setting cgroup_parent up on first use"""
+        if self._cgroups is None:
+            self._cgroups = self._setup_cgroups()
+        return self._cgroups
+    
+    def _setup_cgroups(self) -> bool:
+        """Create cgroup_parent with the cpu and memory controllers delegated to its children"""
+        if not os.path.exists(os.path.join(CGROUP_MOUNT, "cgroup.controllers")):
+            logger.info("cgroup v2 not available, agent limits fall back to setrlimit")
+            return False
+        try:
+            os.makedirs(self.cgroup_parent, exist_ok=True)
+            with open(os.path.join(self.cgroup_parent, "cgroup.controllers")) as f:
+                available = f.read().split()
+            missing = [c for c in ("cpu", "memory") if c not in available]
+            if missing:
+                _write(
+                    os.path.join(os.path.dirname(self.cgroup_parent), "cgroup.subtree_control"),
+                    " ".join(f"+{c}" for c in missing)
+                )
+            _write(os.path.join(self.cgroup_parent, "cgroup.subtree_control"), "+cpu +memory")
+            logger.info(f"Agent limits use cgroup v2 under {self.cgroup_parent}")
+            return True
+        except OSError as e:
+            logger.warning(f"Cannot use cgroups under {self.cgroup_parent} ({str(e)}), agent limits fall back to setrlimit")
+            return False
+    
+    def apply(self, agent_id: str, pid: int, limits: Dict[str, float]) -> Optional[Dict[str, Any]]:
+        """Limit a freshly started agent process; returns what was applied (None without limits)"""
+        if not any(limits.values()):
+            return None
+        
+        process = psutil.Process(pid)
+        mode = "rlimit"
+        if (limits["cpu_quota"] or limits["memory_limit_mb"]) and self.cgroups:
+            try:
+                self._apply_cgroup(agent_id, pid, limits)
+                mode = "cgroup"
+            except OSError as e:
+                logger.warning(f"Failed to put agent {agent_id} (pid {pid}) in a cgroup, using setrlimit: {str(e)}")
+        
+        if mode == "rlimit" and limits["memory_limit_mb"]:
+            memory = int(limits["memory_limit_mb"] * 2 ** 20)
+            process.rlimit(resource.RLIMIT_DATA, (memory, memory))
+        if limits["max_fds"]:
+            fds = int(limits["max_fds"])
+            process.rlimit(resource.RLIMIT_NOFILE, (fds, fds))
+        
+        return {**limits, "enforced_by": mode}
+    
+    def adopt(self, agent_id: str, pid: int, limits: Dict[str, float]) -> Optional[Dict[str, Any]]:
+        """Pick up the limits of a process started by a previous run (rlimits stay with the process)"""
+        if not any(limits.values()):
+            return None
+        # A cgroup left by the previous run means cgroup_parent is set up already
+        path = os.path.join(self.cgroup_parent, f"{agent_id}-{pid}") if self.cgroup_parent else None
+        if path is None or not os.path.isdir(path):
+            return {**limits, "enforced_by": "rlimit"}
+        self._groups.setdefault(agent_id, {})[pid] = path
+        self._counters[path] = self._read_counters(path)
+        return {**limits, "enforced_by": "cgroup"}
+    
+    def _apply_cgroup(self, agent_id: str, pid: int, limits: Dict[str, float]):
+        path = os.path.join(self.cgroup_parent, f"{agent_id}-{pid}")
+        os.makedirs(path, exist_ok=True)
+        try:
+            if limits["cpu_quota"]:
+                _write(os.path.join(path, "cpu.max"), f"{int(limits['cpu_quota'] * CPU_PERIOD_US)} {CPU_PERIOD_US}")
+            if limits["memory_limit_mb"]:
+                _write(os.path.join(path, "memory.max"), str(int(limits["memory_limit_mb"] * 2 ** 20)))
+                try:
+                    _write(os.path.join(path, "memory.swap.max"), "0")  # Hit the limit instead of swapping
+                except OSError:
+                    pass  # No swap accounting
+            _write(os.path.join(path, "cgroup.procs"), str(pid))
+        except OSError:
+            self._remove_cgroup(path)
+            raise
+        self._groups.setdefault(agent_id, {})[pid] = path
+        self._counters[path] = self._read_counters(path)
+    
+    def check(self, agent_id: str, limits: Dict[str, Any], sample: Optional[Dict[str, float]] = None) -> List[str]:
+        """Resources whose limit the agent's processes hit since the last check.
+        
+        Also removes the cgroups of processes that have exited, once their last
+        counters (e.g. an OOM kill) are read.
+        """
+        hit = set()
+        for pid, path in list(self._groups.get(agent_id, {}).items()):
+            try:
+                counters = self._read_counters(path)
+            except OSError:
+                self._forget_cgroup(agent_id, pid)
+                continue
+            previous = self._counters.get(path, {})
+            if counters["nr_throttled"] > previous.get("nr_throttled", 0):
+                hit.add("cpu")
+            if counters["max"] > previous.get("max", 0):
+                hit.add("memory")
+            if counters["oom_kill"] > previous.get("oom_kill", 0):
+                hit.add("oom_kill")
+            self._counters[path] = counters
+            if not psutil.pid_exists(pid):
+                self._forget_cgroup(agent_id, pid)
+        
+        # Without cgroup counters, usage close to the limit is all there is to go by
+        if sample is not None:
+            if limits["enforced_by"] == "rlimit":
+                if limits["cpu_quota"] and sample["cpu_percent"] >= NEAR_LIMIT * limits["cpu_quota"] * 100:
+                    hit.add("cpu")
+                if limits["memory_limit_mb"] and sample["rss_bytes"] >= NEAR_LIMIT * limits["memory_limit_mb"] * 2 ** 20:
+                    hit.add("memory")
+            if limits["max_fds"] and sample["open_fds"] is not None and sample["open_fds"] >= NEAR_LIMIT * limits["max_fds"]:
+                hit.add("fds")
+        return sorted(hit)
+    
+    @staticmethod
+    def _read_counters(path: str) -> Dict[str, int]:
+        cpu = _read_stat(os.path.join(path, "cpu.stat"))
+        memory = _read_stat(os.path.join(path, "memory.events"))
+        return {
+            "nr_throttled": cpu.get("nr_throttled", 0),
+            "max": memory.get("max", 0),
+            "oom_kill": memory.get("oom_kill", 0)
+        }
+    
+    def forget(self, agent_id: str):
+        """Remove the cgroups of a deleted agent"""
+        for pid in list(self._groups.get(agent_id, {})):
+            self._forget_cgroup(agent_id, pid)
+        self._groups.pop(agent_id, None)
+    
+    def _forget_cgroup(self, agent_id: str, pid: int):
+        groups = self._groups.get(agent_id, {})
+        path = groups.pop(pid, None)
+        if not groups:
+            self._groups.pop(agent_id, None)
+        if path is not None:
+            self._counters.pop(path, None)
+            self._remove_cgroup(path)
+    
+    @staticmethod
+    def _remove_cgroup(path: str):
+        try:
+            os.rmdir(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.debug(f"Cgroup {path} not removed yet: {str(e)}")
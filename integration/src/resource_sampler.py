@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+
+import psutil
+
+from models import AgentStatus
+
+logger = logging.getLogger(__name__)
+
+# Per-process figures collected on every sample
+RESOURCE_FIELDS = ("cpu_percent", "rss_bytes", "open_fds", "threads", "ctx_switches_per_s")
+
+class ResourceSeries:
+    """Two fixed-size rings of samples: recent raw points and downsampled history.
+    
+    Every `downsample` raw samples are folded into one coarse point holding the
+    mean and the max of each field, so a long history costs a fixed amount of
+    memory regardless of how long the agent runs.
+    """
+    
+    def __init__(self, capacity: int = 120, downsample: int = 12, coarse_capacity: int = 288):
+        self.raw = deque(maxlen=capacity)
+        self.coarse = deque(maxlen=coarse_capacity)
+        self.downsample = max(1, downsample)
+        self._pending: List[Dict[str, float]] = []
+    
+    def add(self, sample: Dict[str, float]):
+        self.raw.append(sample)
+        self._pending.append(sample)
+        if len(self._pending) >= self.downsample:
+            self.coarse.append(self._fold(self._pending))
+            self._pending = []
+    
+    @property
+    def latest(self) -> Optional[Dict[str, float]]:
+        return self.raw[-1] if self.raw else None
+    
+    @staticmethod
+    def _fold(samples: List[Dict[str, float]]) -> Dict[str, float]:
+        point = {"t": samples[-1]["t"]}
+        for field in RESOURCE_FIELDS:
+            values = [s[field] for s in samples if s.get(field) is not None]
+            point[field] = round(sum(values) / len(values), 3) if values else None
+            point[f"{field}_max"] = max(values) if values else None
+        return point
+
+class ResourceSampler:
+    """Samples CPU, memory, fds, threads and context switches of every agent process.
+    
+    Runs in the background at a fixed cadence. The psutil calls of one sweep
+    run in a worker thread so a large fleet doesn't stall the event loop.
+    Agents sharing a process (multi-tenant hosts) share one series.
+    """
+    
+    def __init__(
+        self,
+        agent_manager,
+        interval: float = 5.0,
+        capacity: int = 120,
+        downsample: int = 12,
+        coarse_capacity: int = 288
+    ):
+        self.agent_manager = agent_manager
+        self.interval = interval
+        self.capacity = capacity
+        self.downsample = downsample
+        self.coarse_capacity = coarse_capacity
+        self.series: Dict[str, ResourceSeries] = {}
+        self._processes: Dict[str, psutil.Process] = {}
+        self._last_ctx: Dict[str, Tuple[int, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.ensure_future(self._run())
+            logger.info(f"Resource sampler started (interval={self.interval}s)")
+    
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def forget(self, key: str):
+        """Drop the history of a deleted agent (or stopped host)"""
+        self.series.pop(key, None)
+        self._processes.pop(key, None)
+        self._last_ctx.pop(key, None)
+    
+    def get_series(self, key: str, resolution: str = "raw") -> List[Dict[str, float]]:
+        series = self.series.get(key)
+        if series is None:
+            return []
+        return list(series.coarse if resolution == "coarse" else series.raw)
+    
+    async def _run(self):
+        while True:
+            try:
+                await self.sample_once()
+            except Exception as e:
+                logger.error(f"Resource sampling failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+    
+    async def sample_once(self):
+        """Sample every running agent process once and refresh the agents' summaries"""
+        targets = self._targets()
+        self._prune(targets)
+        samples = await asyncio.to_thread(self._sample_all, targets)
+        
+        for key, sample in samples.items():
+            series = self.series.get(key)
+            if series is None:
+                series = ResourceSeries(self.capacity, self.downsample, self.coarse_capacity)
+                self.series[key] = series
+            series.add(sample)
+        
+        for agent in self.agent_manager.agents.values():
+            sample = samples.get(agent.host_id or agent.id)
+            if sample is not None:
+                agent.resources = {
+                    "cpu_percent": sample["cpu_percent"],
+                    "rss_mb": round(sample["rss_bytes"] / 2 ** 20, 1),
+                    "open_fds": sample["open_fds"],
+                    "threads": sample["threads"],
+                    "ctx_switches_per_s": sample["ctx_switches_per_s"],
+                    "shared_process": agent.host_id is not None
+                }
+        
+        await self.agent_manager.check_limits(samples)
+    
+    def _targets(self) -> Dict[str, int]:
+        """Series key -> pid of every live agent process (hosts count once)"""
+        targets = {}
+        for agent in self.agent_manager.agents.values():
+            if agent.status in (AgentStatus.RUNNING, AgentStatus.ERROR) and agent.pid:
+                targets[agent.host_id or agent.id] = agent.pid
+        return targets
+    
+    def _prune(self, targets: Dict[str, int]):
+        """Forget processes that are gone; keep history until the agent or host itself is"""
+        for key in list(self._processes):
+            if key not in targets or self._processes[key].pid != targets[key]:
+                self._processes.pop(key, None)
+                self._last_ctx.pop(key, None)
+        known = set(self.agent_manager.agents) | set(self.agent_manager.hosts)
+        for key in list(self.series):
+            if key not in known:
+                del self.series[key]
+    
+    def _sample_all(self, targets: Dict[str, int]) -> Dict[str, Dict[str, float]]:
+        samples = {}
+        for key, pid in targets.items():
+            try:
+                samples[key] = self._sample(key, pid)
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                self._processes.pop(key, None)
+                self._last_ctx.pop(key, None)
+        return samples
+    
+    def _sample(self, key: str, pid: int) -> Dict[str, float]:
+        process = self._processes.get(key)
+        if process is None:
+            process = psutil.Process(pid)
+            process.cpu_percent()  # First call only primes the counter
+            self._processes[key] = process
+        
+        now = time.time()
+        with process.oneshot():
+            cpu_percent = process.cpu_percent()
+            rss = process.memory_info().rss
+            try:
+                open_fds = process.num_fds()
+            except AttributeError:
+                open_fds = None  # Not available on Windows
+            threads = process.num_threads()
+            ctx = process.num_ctx_switches()
+        
+        ctx_total = ctx.voluntary + ctx.involuntary
+        previous = self._last_ctx.get(key)
+        self._last_ctx[key] = (ctx_total, now)
+        ctx_rate = None
+        if previous is not None and now > previous[1]:
+            ctx_rate = round((ctx_total - previous[0]) / (now - previous[1]), 1)
+        
+        return {
+            "t": round(now, 3),
+            "cpu_percent": cpu_percent,
+            "rss_bytes": rss,
+            "open_fds": open_fds,
+            "threads": threads,
+            "ctx_switches_per_s": ctx_rate
+        }
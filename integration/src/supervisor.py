@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from models import AgentStatus
+
+logger = logging.getLogger(__name__)
+
+# Restart policies, per agent (AgentConfig.restart_policy) or fleet-wide
+RESTART_ALWAYS = "always"
+RESTART_ON_FAILURE = "on-failure"
+RESTART_NEVER = "never"
+RESTART_POLICIES = (RESTART_ALWAYS, RESTART_ON_FAILURE, RESTART_NEVER)
+
+class AgentSupervisor:
+    """Watches agent processes exit and restarts them according to a policy.
+    
+    Every started agent (or multi-tenant host) gets a task awaiting its
+    process, so a crash is noticed the moment it happens rather than at the
+    next health probe. Restarts back off exponentially with the number of
+    recent crashes; an agent that crashes crash_loop_limit times within
+    crash_loop_window seconds is left in ERROR instead of being restarted.
+    """
+    
+    def __init__(
+        self,
+        agent_manager,
+        policy: str = RESTART_ON_FAILURE,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        crash_loop_limit: int = 5,
+        crash_loop_window: float = 300.0
+    ):
+        self.agent_manager = agent_manager
+        self.policy = policy if policy in RESTART_POLICIES else RESTART_ON_FAILURE
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.crash_loop_limit = crash_loop_limit
+        self.crash_loop_window = crash_loop_window
+        self.exits: Dict[str, asyncio.Future] = {}  # Resolved with the return code when the process exits
+        self._watchers: Dict[str, asyncio.Task] = {}
+        self._restarts: Dict[str, asyncio.Task] = {}
+        self._crashes: Dict[str, deque] = {}
+    
+    def watch(self, key: str, process) -> asyncio.Future:
+        """Start watching an agent (or host) process; returns its exit future"""
+        previous = self._watchers.pop(key, None)
+        if previous is not None:
+            previous.cancel()
+        exited = asyncio.get_running_loop().create_future()
+        self.exits[key] = exited
+        self._watchers[key] = asyncio.ensure_future(self._watch(key, process, exited))
+        return exited
+    
+    def exit_future(self, agent_id: str) -> Optional[asyncio.Future]:
+        """Future that resolves if the process serving this agent exits"""
+        agent = self.agent_manager.agents.get(agent_id)
+        if agent is None:
+            return None
+        return self.exits.get(agent.host_id or agent_id)
+    
+    def cancel_restart(self, agent_id: str):
+        """Drop a pending restart (the agent is being stopped or deleted)"""
+        task = self._restarts.pop(agent_id, None)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+    
+    def forget(self, key: str):
+        self.cancel_restart(key)
+        watcher = self._watchers.pop(key, None)
+        if watcher is not None:
+            watcher.cancel()
+        self.exits.pop(key, None)
+        self._crashes.pop(key, None)
+    
+    async def close(self):
+        for task in list(self._watchers.values()) + list(self._restarts.values()):
+            task.cancel()
+        self._watchers.clear()
+        self._restarts.clear()
+    
+    async def _watch(self, key: str, process, exited: asyncio.Future):
+        returncode = await process.wait()
+        if not exited.done():
+            exited.set_result(returncode)
+        if self._watchers.get(key) is asyncio.current_task():
+            del self._watchers[key]
+        
+        host = self.agent_manager.hosts.get(key)
+        if host is not None:
+            if host.closing:
+                return
+            host.status = AgentStatus.ERROR
+            host.error_message = f"Host process exited with code {returncode}"
+            logger.error(f"Agent host {key} exited with code {returncode}")
+            for agent_id in list(host.agent_ids):
+                await self._on_agent_exit(agent_id, returncode)
+            return
+        
+        await self._on_agent_exit(key, returncode)
+    
+    async def _on_agent_exit(self, agent_id: str, returncode: int):
+        agent = self.agent_manager.agents.get(agent_id)
+        if agent is None or agent.status in (AgentStatus.STOPPING, AgentStatus.STOPPED, AgentStatus.HIBERNATED):
+            return  # Deleted, stopped or hibernated on purpose
+        
+        agent.status = AgentStatus.ERROR
+        agent.error_message = f"Agent process exited with code {returncode}"
+        logger.error(f"Agent {agent_id} exited with code {returncode}")
+        
+        policy = agent.config.restart_policy or self.policy
+        if policy == RESTART_NEVER or (policy == RESTART_ON_FAILURE and returncode == 0):
+            await self.agent_manager.notify_agent_update(agent)
+            return
+        
+        await self._schedule_restart(agent)
+    
+    async def _schedule_restart(self, agent):
+        """Restart after a backoff that grows with recent crashes, unless the agent is crash-looping"""
+        agent_id = agent.id
+        crashes = self._crashes.setdefault(agent_id, deque())
+        now = time.monotonic()
+        crashes.append(now)
+        while crashes and now - crashes[0] > self.crash_loop_window:
+            crashes.popleft()
+        
+        if len(crashes) >= self.crash_loop_limit:
+            agent.error_message += (
+                f" - crash loop ({len(crashes)} crashes in {self.crash_loop_window:.0f}s), not restarting"
+            )
+            logger.error(f"Agent {agent_id} is crash-looping, giving up on restarts")
+            await self.agent_manager.notify_agent_update(agent)
+            return
+        
+        delay = min(self.backoff_base * 2 ** (len(crashes) - 1), self.backoff_max)
+        delay *= random.uniform(0.9, 1.1)
+        agent.error_message += f" - restarting in {delay:.1f}s"
+        await self.agent_manager.notify_agent_update(agent)
+        
+        self.cancel_restart(agent_id)
+        self._restarts[agent_id] = asyncio.ensure_future(self._restart_later(agent_id, delay))
+    
+    async def _restart_later(self, agent_id: str, delay: float):
+        try:
+            await asyncio.sleep(delay)
+            agent = self.agent_manager.agents.get(agent_id)
+            if agent is None or agent.status != AgentStatus.ERROR:
+                return  # Deleted, stopped or restarted by hand meanwhile
+            
+            agent.restart_count += 1
+            logger.info(f"Restarting agent {agent_id} (restart #{agent.restart_count})")
+            if await self.agent_manager.start_agent(agent_id):
+                await self.agent_manager.notify_agent_update(agent)
+            elif agent.status == AgentStatus.ERROR:
+                # Died again on the way up - counts as another crash
+                await self._schedule_restart(agent)
+        finally:
+            if self._restarts.get(agent_id) is asyncio.current_task():
+                del self._restarts[agent_id]
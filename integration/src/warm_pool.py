@@ -0,0 +1,153 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Line a worker prints once its heavy imports are done
+WORKER_READY_MARKER = b"WORKER_READY"
+
+class WarmAgentPool:
+    """Keeps idle, pre-imported agent worker processes ready to be claimed.
+
+    Each worker runs single/worker.py, which imports LangChain and the agent
+    classes up front and then blocks on stdin. Claiming a worker hands it the
+    agent configuration as one JSON line; the worker then builds its agent and
+    starts serving, announcing readiness like a freshly spawned agent would.
+    """
+
+    def __init__(self, size: int, agent_dir: str, env: Dict[str, str], startup_timeout: float = 60.0):
+        self.size = size
+        self.agent_dir = agent_dir
+        self.env = env
+        self.startup_timeout = startup_timeout
+        self.idle: List[asyncio.subprocess.Process] = []
+        self.spawning = 0
+        self.claims = 0
+        self.misses = 0
+        self._refill_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def start(self):
+        """Start filling the pool in the background"""
+        self._closed = False
+        self._schedule_refill()
+        logger.info(f"Warm agent pool started (size={self.size})")
+
+    async def close(self):
+        """Stop refilling and terminate all idle workers"""
+        self._closed = True
+        if self._refill_task:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._refill_task = None
+
+        idle, self.idle = self.idle, []
+        for process in idle:
+            if process.returncode is None:
+                try:
+                    process.kill()
+                    await process.wait()
+                except ProcessLookupError:
+                    pass
+        logger.info("Warm agent pool closed")
+
+    async def claim(self, overrides: Dict[str, str]) -> Optional[asyncio.subprocess.Process]:
+        """Hand a warm worker its agent configuration, or return None if none is ready"""
+        try:
+            while self.idle:
+                process = self.idle.pop(0)
+                if process.returncode is not None:
+                    continue
+
+                try:
+                    process.stdin.write(json.dumps(overrides).encode() + b"\n")
+                    await process.stdin.drain()
+                    process.stdin.close()
+                except (BrokenPipeError, ConnectionResetError):
+                    continue
+
+                self.claims += 1
+                return process
+
+            self.misses += 1
+            return None
+        finally:
+            self._schedule_refill()
+
+    def get_stats(self) -> Dict:
+        """Pool occupancy and hit/miss counters"""
+        return {
+            "size": self.size,
+            "idle": len(self.idle),
+            "spawning": self.spawning,
+            "claims": self.claims,
+            "misses": self.misses
+        }
+
+    def _schedule_refill(self):
+        if self._closed or self.size <= 0:
+            return
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.ensure_future(self._refill())
+
+    async def _refill(self):
+        """Spawn workers until the pool is back at its configured size"""
+        while not self._closed and len(self.idle) + self.spawning < self.size:
+            missing = self.size - len(self.idle) - self.spawning
+            self.spawning += missing
+            results = await asyncio.gather(
+                *(self._spawn_worker() for _ in range(missing)),
+                return_exceptions=True
+            )
+            self.spawning -= missing
+
+            failed = 0
+            for result in results:
+                if isinstance(result, asyncio.subprocess.Process):
+                    if self._closed:
+                        result.kill()
+                        await result.wait()
+                    else:
+                        self.idle.append(result)
+                else:
+                    failed += 1
+                    if isinstance(result, Exception):
+                        logger.warning(f"Failed to spawn warm agent worker: {str(result)}")
+
+            if failed:
+                # Back off instead of spinning on a broken environment
+                await asyncio.sleep(5)
+
+    async def _spawn_worker(self) -> Optional[asyncio.subprocess.Process]:
+        """Start one worker and wait until its imports are done"""
+        env = os.environ.copy()
+        env.update(self.env)
+
+        process = await asyncio.create_subprocess_exec(
+            "python", "worker.py",
+            env=env,
+            cwd=self.agent_dir,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True  # Claimed workers become agents, which outlive the integration layer
+        )
+
+        try:
+            while True:
+                line = await asyncio.wait_for(process.stdout.readline(), timeout=self.startup_timeout)
+                if not line:
+                    raise RuntimeError(f"worker exited with return code {await process.wait()}")
+                if line.strip().startswith(WORKER_READY_MARKER):
+                    return process
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
@@ -35,10 +35,18 @@ class BaseAgent(ABC):
     - Optionally override other methods for custom behavior
     """
     
-    def __init__(self, agent_id: Optional[str] = None):
-        """Initialize the base agent with common functionality"""
+    def __init__(self, agent_id: Optional[str] = None, overrides: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the base agent with common functionality.
+        
+        overrides replaces individual settings (openai_model, agent_prompt, ...)
+        for this agent only, so one process can host agents configured differently.
+        """
         logger.info(f"Initializing {self.__class__.__name__}")
         
+        # This agent's own copy of the settings
+        self.settings = settings.model_copy(update=overrides or {})
+        
         # Network-specific setup
         self.agent_id = agent_id or self._generate_agent_id()
         self.network_status = "initializing"
@@ -64,11 +72,11 @@ class BaseAgent(ABC):
     
     def _get_agent_name(self) -> str:
         """Get the agent name - can be overridden by subclasses"""
-        return getattr(settings, 'agent_name', self.__class__.__name__)
+        return getattr(self.settings, 'agent_name', self.__class__.__name__)
     
     def _get_agent_description(self) -> str:
         """Get the agent description - can be overridden by subclasses"""
-        return getattr(settings, 'agent_description', f"A specialized {self.__class__.__name__} microservice")
+        return getattr(self.settings, 'agent_description', f"A specialized {self.__class__.__name__} microservice")
     
     def _initialize_llm(self) -> ChatOpenAI:
         """
@@ -76,15 +84,15 @@ class BaseAgent(ABC):
         This is the same for all agents - they all use OpenAI for intelligence.
         """
         # Check if we have an API key
-        if not settings.openai_api_key:
+        if not self.settings.openai_api_key:
             raise ValueError(f"{self.agent_name}: OpenAI API key not provided - check your .env file")
             
-        logger.info(f"Connecting to OpenAI with model: {settings.openai_model}")
+        logger.info(f"Connecting to OpenAI with model: {self.settings.openai_model}")
         
         # Create connection to OpenAI
         return ChatOpenAI(
-            api_key=settings.openai_api_key,
-            model=settings.openai_model,
+            api_key=self.settings.openai_api_key,
+            model=self.settings.openai_model,
             temperature=0.7,  # How creative the responses are
             max_tokens=1000   # Maximum length of responses
         )
@@ -110,6 +118,12 @@ class BaseAgent(ABC):
         Create the complete agent by combining OpenAI + tools + conversation template.
         This is standard across all agents.
         """
+        # Extra instructions configured for this agent (braces escaped for the template)
+        custom_instructions = ""
+        if self.settings.agent_prompt:
+            escaped = self.settings.agent_prompt.replace("{", "{{").replace("}", "}}")
+            custom_instructions = f"\n\n            Additional instructions:\n            {escaped}"
+        
         # Create the conversation template that tells the AI how to behave
         prompt = ChatPromptTemplate.from_messages([
             ("system", f"""You are {self.agent_name}, {self.agent_description}.
@@ -123,7 +137,7 @@ class BaseAgent(ABC):
             3. Return clear, structured results
             4. If you cannot complete a task, explain why clearly
             
-            Be concise, accurate, and focus on getting the job done."""),
+            Be concise, accurate, and focus on getting the job done.{custom_instructions}"""),
             ("human", "{input}"),
             MessagesPlaceholder(variable_name="agent_scratchpad")
         ])
@@ -210,7 +224,7 @@ class BaseAgent(ABC):
             ],
             "status": "active",
             "network_status": self.network_status,
-            "model": settings.openai_model,
+            "model": self.settings.openai_model,
             "capabilities": {
                 "inter_agent_messaging": True,
                 "workflow_execution": True,
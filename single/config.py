@@ -27,9 +27,19 @@ class Settings(BaseSettings):
     # Agent identity settings
     agent_name: str = "SingleAgent"  # What to call your agent
     agent_description: str = "A helpful AI agent that can calculate and analyze text"
+    agent_prompt: str = ""  # Extra instructions added to the agent's system prompt
     
     # Server settings
     port: int = 8000  # Which port the web server runs on (usually 8000)
+    reload: bool = True  # Restart automatically when code changes (the orchestrator turns this off)
+    uds: str = ""  # Serve on this Unix domain socket instead of a TCP port (set by the orchestrator)
+    host_mode: bool = False  # Serve many agents from this one process, added through the /agents API
+    
+    # Orchestrator settings (filled in by the integration layer when it starts us)
+    agent_id: str = ""  # Our id in the orchestrator
+    integration_url: str = ""  # Where to send heartbeats, e.g. http://localhost:8000
+    heartbeat_interval: float = 0  # Seconds between heartbeats (0 = don't send any)
+    max_concurrent_tasks: int = 0  # Tasks processed at once, extra requests wait in line (0 = no limit)
     
     # Future features (not used yet, but ready for multi-agent setup)
     redis_url: str = "redis://localhost:6379"
@@ -1,12 +1,18 @@
 # Main web server file - this creates the API that the chat interface talks to
 # When you visit http://localhost:8000 in your browser, this code handles it
 
+import asyncio
 import logging
+import sys
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+import httpx
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import APIRouter, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, Optional
 
 # Import our agent and settings
 from single_agent import SingleAgent
@@ -34,13 +40,60 @@ app.add_middleware(
 )
 
 # Try to create the agent when the server starts
-try:
-    agent = SingleAgent()
-    logger.info("🤖 Agent initialized successfully!")
-except Exception as e:
-    logger.error(f"❌ Failed to initialize agent: {str(e)}")
-    logger.error("💡 Make sure your .env file has a valid OPENAI_API_KEY")
-    agent = None
+# (in host mode we start empty - agents are added through the /agents API)
+agent = None
+if not settings.host_mode:
+    try:
+        agent = SingleAgent(agent_id=settings.agent_id or None)
+        logger.info("🤖 Agent initialized successfully!")
+    except Exception as e:
+        logger.error(f"❌ Failed to initialize agent: {str(e)}")
+        logger.error("💡 Make sure your .env file has a valid OPENAI_API_KEY")
+
+# LOAD TRACKING - how busy we are, reported to the orchestrator in heartbeats
+class LoadTracker:
+    """Counts requests in flight and waiting, and remembers recent latencies"""
+    
+    def __init__(self, max_concurrent: int = 0, window: int = 200):
+        self.in_flight = 0  # Tasks being processed right now
+        self.queued = 0  # Requests waiting for a free slot
+        self.requests_total = 0
+        self.latencies = deque(maxlen=window)  # Seconds, most recent requests only
+        self._slots = asyncio.Semaphore(max_concurrent) if max_concurrent > 0 else None
+    
+    @asynccontextmanager
+    async def track(self):
+        """Wrap one task: wait for a slot if limited, then time it"""
+        started = time.perf_counter()
+        if self._slots is not None:
+            self.queued += 1
+            try:
+                await self._slots.acquire()
+            finally:
+                self.queued -= 1
+        
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.requests_total += 1
+            self.latencies.append(time.perf_counter() - started)
+            if self._slots is not None:
+                self._slots.release()
+    
+    def latency_percentiles(self) -> dict:
+        """p50/p95/p99 of recent request latencies in milliseconds"""
+        if not self.latencies:
+            return {"p50": None, "p95": None, "p99": None}
+        ordered = sorted(self.latencies)
+        
+        def pick(q):
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+        
+        return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
+
+load = LoadTracker(max_concurrent=settings.max_concurrent_tasks)
 
 # Define what the API requests and responses look like
 class QueryRequest(BaseModel):
@@ -75,6 +128,14 @@ async def health_check():
     """
     Detailed health check - used by the chat interface to see if agent is ready
     """
+    if settings.host_mode:
+        return {
+            "status": "healthy",
+            "mode": "host",
+            "agents": len(hosted_agents),
+            "ready": True
+        }
+    
     if agent is None:
         raise HTTPException(
             status_code=503, 
@@ -104,10 +165,15 @@ async def process_query(request: QueryRequest):
             detail="Agent not ready - check your OpenAI API key in .env file"
         )
     
+    return await answer_query(agent, load, request)
+
+async def answer_query(target: SingleAgent, tracker: LoadTracker, request: QueryRequest) -> QueryResponse:
+    """Run one query through an agent, counting it in that agent's load"""
     try:
         # Send the user's message to the agent and get a response
         # Use the new BaseAgent method process_task instead of process_query
-        result = await agent.process_task(request.query, {"session_id": request.session_id})
+        async with tracker.track():
+            result = await target.process_task(request.query, {"session_id": request.session_id})
         
         # Map BaseAgent response to our API response format
         response = QueryResponse(
@@ -172,6 +238,174 @@ async def get_network_status():
         }
     }
 
+# HOST MODE - One process serving many agents (HOST_MODE=true)
+# Every agent keeps its own BaseAgent (model, prompt, tools) and load counters.
+# Requests are routed by agent id: each agent's API lives under /agents/{agent_id}
+host_router = APIRouter()
+hosted_agents: Dict[str, SingleAgent] = {}
+hosted_load: Dict[str, LoadTracker] = {}
+
+class HostedAgentConfig(BaseModel):
+    """Settings of one agent inside a host process"""
+    name: str
+    prompt: Optional[str] = None
+    model: Optional[str] = None
+    openai_api_key: Optional[str] = None
+
+def get_hosted_agent(agent_id: str) -> SingleAgent:
+    if agent_id not in hosted_agents:
+        raise HTTPException(status_code=404, detail=f"Agent {agent_id} is not hosted here")
+    return hosted_agents[agent_id]
+
+@host_router.get("/agents")
+async def list_hosted_agents():
+    """Every agent this host serves, with its current load"""
+    return {
+        "agents": [
+            {**hosted.get_agent_info(), "in_flight": hosted_load[agent_id].in_flight}
+            for agent_id, hosted in hosted_agents.items()
+        ]
+    }
+
+@host_router.put("/agents/{agent_id}")
+async def add_hosted_agent(agent_id: str, config: HostedAgentConfig):
+    """Create (or replace) an agent in this host"""
+    overrides = {"agent_name": config.name, "agent_prompt": config.prompt or ""}
+    if config.model:
+        overrides["openai_model"] = config.model
+    if config.openai_api_key:
+        overrides["openai_api_key"] = config.openai_api_key
+    
+    try:
+        # Building the LangChain agent is synchronous - keep it off the event loop
+        hosted = await asyncio.to_thread(SingleAgent, agent_id, overrides)
+    except Exception as e:
+        logger.error(f"❌ Failed to initialize agent {agent_id}: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Agent not initialized - {str(e)}")
+    
+    hosted_agents[agent_id] = hosted
+    hosted_load.setdefault(agent_id, LoadTracker(max_concurrent=settings.max_concurrent_tasks))
+    logger.info(f"🤖 Now hosting {config.name} ({agent_id}), {len(hosted_agents)} agents in total")
+    return hosted.get_agent_info()
+
+@host_router.delete("/agents/{agent_id}")
+async def remove_hosted_agent(agent_id: str):
+    """Stop serving an agent"""
+    get_hosted_agent(agent_id)
+    hosted_agents.pop(agent_id)
+    hosted_load.pop(agent_id, None)
+    return {"status": "removed", "agent_id": agent_id}
+
+@host_router.get("/agents/{agent_id}/health")
+async def hosted_agent_health(agent_id: str):
+    return get_hosted_agent(agent_id).get_health_status()
+
+@host_router.get("/agents/{agent_id}/agent/info")
+async def hosted_agent_info(agent_id: str):
+    return get_hosted_agent(agent_id).get_agent_info()
+
+# Both the short path and the standalone agent's path (under the prefix) work
+@host_router.post("/agents/{agent_id}/query", response_model=QueryResponse)
+@host_router.post("/agents/{agent_id}/agent/query", response_model=QueryResponse)
+async def hosted_agent_query(agent_id: str, request: QueryRequest):
+    return await answer_query(get_hosted_agent(agent_id), hosted_load[agent_id], request)
+
+if settings.host_mode:
+    app.include_router(host_router)
+
+# HEARTBEATS - Push our health and load to the orchestrator on a schedule,
+# so it doesn't have to poll every agent to know we're alive
+def build_heartbeat(target: SingleAgent, tracker: LoadTracker) -> dict:
+    """Health status plus load figures, kept small"""
+    heartbeat = target.get_health_status()
+    heartbeat.update({
+        "in_flight": tracker.in_flight,
+        "queue_depth": tracker.queued,
+        "requests_total": tracker.requests_total,
+        "latency_ms": tracker.latency_percentiles(),
+        "timestamp": time.time()
+    })
+    return heartbeat
+
+async def send_heartbeats():
+    """Post a heartbeat (one per agent in host mode) every heartbeat_interval seconds until we shut down"""
+    base_url = settings.integration_url.rstrip('/')
+    async with httpx.AsyncClient(timeout=max(1.0, settings.heartbeat_interval)) as client:
+        while True:
+            if settings.host_mode:
+                targets = [(agent_id, hosted, hosted_load[agent_id]) for agent_id, hosted in list(hosted_agents.items())]
+            else:
+                targets = [(settings.agent_id, agent, load)]
+            
+            for agent_id, target, tracker in targets:
+                url = f"{base_url}/agents/{agent_id}/heartbeat"
+                try:
+                    await client.post(url, json=build_heartbeat(target, tracker))
+                except Exception as e:
+                    logger.debug(f"Heartbeat to {url} failed: {str(e)}")
+            await asyncio.sleep(settings.heartbeat_interval)
+
+heartbeat_task = None
+
+@app.on_event("startup")
+async def start_heartbeats():
+    """Start sending heartbeats if the orchestrator asked for them"""
+    global heartbeat_task
+    if settings.heartbeat_interval > 0 and settings.integration_url and (settings.host_mode or (agent is not None and settings.agent_id)):
+        heartbeat_task = asyncio.create_task(send_heartbeats())
+        logger.info(f"💓 Sending heartbeats to {settings.integration_url} every {settings.heartbeat_interval}s")
+
+# READINESS ANNOUNCEMENT - The orchestrator watches our stdout for these lines
+# instead of polling /health, so it knows the moment we can take requests
+READY_MARKER = "AGENT_READY"
+FAILED_MARKER = "AGENT_FAILED"
+
+def announce_startup():
+    """
+    Tell whoever started us that we are ready (or that we never will be).
+    Called once the server socket is actually listening.
+    """
+    if agent is None and not settings.host_mode:
+        print(f"{FAILED_MARKER} Agent not initialized - check your OpenAI API key", flush=True)
+    else:
+        address = f"uds={settings.uds}" if settings.uds else f"port={settings.port}"
+        print(f"{READY_MARKER} {address}", flush=True)
+
+class AnnouncingServer(uvicorn.Server):
+    """Uvicorn server that announces readiness after it starts listening"""
+    
+    async def startup(self, sockets=None):
+        await super().startup(sockets=sockets)
+        if self.started:
+            announce_startup()
+
+def serve():
+    """Run the web server (with auto-reload only when developing by hand)"""
+    if settings.reload:
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",  # Allow connections from anywhere
+            port=settings.port,  # Use the port from .env file (default 8000)
+            reload=True,  # Restart automatically when code changes
+            log_level=settings.log_level.lower()
+        )
+        return
+    
+    if settings.uds:
+        # Local socket: no TCP port, only reachable from this machine
+        config = uvicorn.Config(app, uds=settings.uds, log_level=settings.log_level.lower())
+    else:
+        config = uvicorn.Config(
+            app,
+            host="0.0.0.0",
+            port=settings.port,
+            log_level=settings.log_level.lower()
+        )
+    server = AnnouncingServer(config)
+    server.run()
+    if not server.started:
+        sys.exit(1)
+
 # This runs the web server when you execute: python main.py
 if __name__ == "__main__":
     print(f"🚀 Starting {settings.agent_name} server...")
@@ -179,10 +413,4 @@ if __name__ == "__main__":
     print(f"📚 API documentation: http://localhost:{settings.port}/docs")
     print(f"❓ Health check: http://localhost:{settings.port}/health")
     
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",  # Allow connections from anywhere
-        port=settings.port,  # Use the port from .env file (default 8000)
-        reload=True,  # Restart automatically when code changes
-        log_level=settings.log_level.lower()
-    )
\ No newline at end of file
+    serve()
\ No newline at end of file
@@ -0,0 +1,65 @@
+# Pre-warmed agent worker - used by the orchestrator's warm pool
+# Importing LangChain and building the agent classes takes seconds, so this
+# worker does all of that up front and then waits (on stdin) to be told which
+# agent to become. Once configured it runs exactly like: python main.py
+
+import json
+import os
+import sys
+
+# The slow imports - done while the worker is idle in the pool
+import config
+import base_agent
+import single_agent
+import tools
+import fastapi
+import fastapi.middleware.cors
+import uvicorn
+import uvicorn.lifespan.on
+import uvicorn.loops.auto
+import uvicorn.protocols.http.auto
+import uvicorn.protocols.websockets.auto
+
+# Tell the orchestrator this worker can be claimed
+WORKER_READY_MARKER = "WORKER_READY"
+
+def warm_up():
+    """
+    Build (and throw away) one agent so the lazy imports inside the OpenAI
+    client and LangChain's first-call caches are paid for before we are claimed.
+    No request is sent to OpenAI, so a placeholder key is enough.
+    """
+    original_key = config.settings.openai_api_key
+    config.settings.openai_api_key = "sk-warm-up-placeholder"
+    try:
+        single_agent.SingleAgent(agent_id="warm-up")
+    except Exception:
+        pass  # Warm-up is best effort - the real agent is built after configuration
+    finally:
+        config.settings.openai_api_key = original_key
+
+def apply_configuration(overrides: dict):
+    """
+    Apply the agent configuration sent by the orchestrator.
+    Settings were already loaded at import time, so reload them in place -
+    every module that imported `settings` sees the new values.
+    """
+    os.environ.update({key: str(value) for key, value in overrides.items()})
+    fresh = config.Settings()
+    for field in type(fresh).model_fields:
+        setattr(config.settings, field, getattr(fresh, field))
+
+if __name__ == "__main__":
+    warm_up()
+    print(WORKER_READY_MARKER, flush=True)
+
+    # Block until the orchestrator claims us (EOF means the pool shut down)
+    line = sys.stdin.readline()
+    if not line.strip():
+        sys.exit(0)
+
+    apply_configuration(json.loads(line))
+
+    # Importing main creates the agent with the new settings
+    import main
+    main.serve()
@@ -0,0 +1,144 @@
+# Agent fork-server ("zygote") - used by the orchestrator's zygote spawner
+# Imports LangChain and the agent classes once, freezes the heap, and then
+# forks one child per agent. Children share the imported modules with the
+# zygote copy-on-write, so each agent only pays for the memory it changes.
+#
+# Protocol (one Unix socket connection per agent):
+#   orchestrator -> zygote: one JSON line {"env": {...}} plus two file
+#                           descriptors (the child's stdout and stderr)
+#   zygote -> orchestrator: {"pid": 1234} once the child is forked, then
+#                           {"pid": 1234, "returncode": 0} when it exits
+
+import gc
+import json
+import os
+import random
+import selectors
+import signal
+import socket
+import sys
+
+# The slow imports and the warm-up agent - shared by every child
+import worker
+
+ZYGOTE_READY_MARKER = "ZYGOTE_READY"
+
+def run_child(request: dict, stdout_fd: int, stderr_fd: int):
+    """Become an agent: wire up the pipes, apply the configuration and serve"""
+    os.setsid()  # Own process group, so signals to the zygote don't hit us
+    os.dup2(stdout_fd, 1)
+    os.dup2(stderr_fd, 2)
+    os.close(stdout_fd)
+    os.close(stderr_fd)
+
+    gc.enable()
+    random.seed()
+
+    worker.apply_configuration(request.get("env", {}))
+
+    import main
+    main.serve()
+
+def serve_forever(socket_path: str):
+    """Accept spawn requests and fork a child for each one"""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(128)
+
+    # SIGCHLD wakes the selector so we can reap children and report exits
+    wakeup_read, wakeup_write = os.pipe()
+    os.set_blocking(wakeup_read, False)
+    os.set_blocking(wakeup_write, False)
+    signal.set_wakeup_fd(wakeup_write)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ, "accept")
+    selector.register(wakeup_read, selectors.EVENT_READ, "sigchld")
+
+    children = {}  # pid -> connection waiting for the exit report
+
+    # Everything imported so far is long-lived: move it out of the GC's reach
+    # so collections in the children don't touch (and copy) shared pages
+    gc.freeze()
+
+    print(ZYGOTE_READY_MARKER, flush=True)
+
+    while True:
+        for key, _ in selector.select():
+            if key.data == "accept":
+                connection, _ = listener.accept()
+                try:
+                    message, fds, _, _ = socket.recv_fds(connection, 65536, 2)
+                    request = json.loads(message.decode())
+                    if len(fds) != 2:
+                        raise ValueError("expected stdout and stderr descriptors")
+                except Exception as e:
+                    connection.sendall(json.dumps({"error": str(e)}).encode() + b"\n")
+                    connection.close()
+                    continue
+
+                sys.stdout.flush()
+                sys.stderr.flush()
+                pid = os.fork()
+                if pid == 0:
+                    # Child: drop everything that belongs to the zygote
+                    signal.set_wakeup_fd(-1)
+                    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                    selector.close()
+                    listener.close()
+                    os.close(wakeup_read)
+                    os.close(wakeup_write)
+                    for other in children.values():
+                        other.close()
+                    connection.close()
+
+                    exit_code = 0
+                    try:
+                        run_child(request, fds[0], fds[1])
+                    except SystemExit as e:
+                        exit_code = e.code if isinstance(e.code, int) else 1
+                    except BaseException:
+                        import traceback
+                        traceback.print_exc()
+                        exit_code = 1
+                    finally:
+                        sys.stdout.flush()
+                        sys.stderr.flush()
+                        os._exit(exit_code)
+
+                for fd in fds:
+                    os.close(fd)
+                children[pid] = connection
+                connection.sendall(json.dumps({"pid": pid}).encode() + b"\n")
+
+            elif key.data == "sigchld":
+                try:
+                    while os.read(wakeup_read, 512):
+                        pass
+                except BlockingIOError:
+                    pass
+
+                # Reap every child that has exited and tell its orchestrator connection
+                while True:
+                    try:
+                        pid, status = os.waitpid(-1, os.WNOHANG)
+                    except ChildProcessError:
+                        break
+                    if pid == 0:
+                        break
+                    connection = children.pop(pid, None)
+                    if connection is not None:
+                        returncode = os.waitstatus_to_exitcode(status)
+                        try:
+                            connection.sendall(json.dumps({"pid": pid, "returncode": returncode}).encode() + b"\n")
+                        except OSError:
+                            pass
+                        connection.close()
+
+if __name__ == "__main__":
+    worker.warm_up()
+    serve_forever(sys.argv[1])